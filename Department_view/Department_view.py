@@ -1,9 +1,11 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
+import os
+import sys
+
+# function.py sits next to this page, which also runs from the multipage app at the repo root
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import access
 import function as fn
 
 # Set page configuration
@@ -88,51 +90,9 @@ st.markdown("""
     }
 </style>
 """, unsafe_allow_html=True)
-np.random.seed(42) 
-# Sample data generation
-def generate_sample_data():
-    # Generate random vendor data
-    vendors = []
-    departments = ["Finance", "Procurement", "Operations", "HR", "IT"]
-    financial_years = ["2021-22", "2022-23", "2023-24"]
-    
-    for i in range(1, 101):
-        vendor_type = "MSME" if np.random.random() > 0.4 else "Non-MSME"
-        submission_date = np.random.choice(pd.date_range('2021-04-01', '2023-12-31'))
-        fy = "2021-22" if submission_date < pd.Timestamp('2022-04-01') else \
-             "2022-23" if submission_date < pd.Timestamp('2023-04-01') else "2023-24"
-        
-        vendors.append({
-            "Vendor ID": f"VEND{i:03d}",
-            "Vendor Name": f"Vendor {i}",
-            "Type": vendor_type,
-            "Department": np.random.choice(departments),
-            "FY": fy,
-            "Submission Date": submission_date,
-            "Pending Amount": round(np.random.uniform(1000, 500000), 2),
-            "Paid Amount": round(np.random.uniform(500, 450000), 2),  # Added paid amount
-            "Bill_Value": round(np.random.uniform(1500, 550000), 2),  # Added bill value
-            "Days Pending": np.random.randint(1, 120),
-            "Stakeholder": np.random.choice(["Finance", "Procurement", "Legal", "Operations", "Management"])
-        })
-    
-    return pd.DataFrame(vendors)
-
-# Load data
-df = generate_sample_data()
-
-# Calculate metrics
-total_bill_pending = df["Pending Amount"].sum()
-count_done = len(df[df["Pending Amount"] == 0])
-msme_count = len(df[df["Type"] == "MSME"])
-non_msme_count = len(df[df["Type"] == "Non-MSME"])
-avg_days_pending = df["Days Pending"].mean()
-
-# Four point summary for days pending
-days_summary = df["Days Pending"].describe()[3:7].to_dict()
-
-# Bottleneck analysis - top stakeholders by average days pending
-bottleneck_data = df.groupby("Stakeholder")["Days Pending"].mean().sort_values(ascending=False).head(4)
+# Data, metrics and indexes from function.py, for the bills this user may see;
+# built once per dataset version, so a refresh shows on the next run
+data = fn.page_data(access.bills())
 
 # Dashboard layout
 st.title("Department View Dashboard")
@@ -141,20 +101,20 @@ st.title("Department View Dashboard")
 col1, col2, col3, col4 = st.columns([1, 1, 1, 2]) 
 
 with col1:
-    fn.KPI_col1()
+    fn.KPI_col1(data)
 
 with col2:
-    fn.KPI_col2()
+    fn.KPI_col2(data)
     
 
 
 
 with col3:
-    fn.KPI_col3()
+    fn.KPI_col3(data)
 
 with col4:
     # Card container for Bottleneck Analysis
-    fn.KPI_col4()
+    fn.KPI_col4(data)
 
 st.markdown("---")  # Horizontal divider
 
@@ -162,13 +122,13 @@ st.markdown("---")  # Horizontal divider
 col5, col6, col7 = st.columns([1, 1, 1.5])
 
 with col5:
-    fn.sec2_col5()
+    fn.sec2_col5(data)
 
 with col6:
-    fn.sec2_col6()
+    fn.sec2_col6(data)
 
 with col7:
-    fn.sec2_col7()
+    fn.sec2_col7(data)
 
 
 
@@ -177,7 +137,22 @@ st.markdown("---")
 col8, col9 = st.columns([1, 1])
 
 with col8:
-    fn.sec3_col8()
+    fn.sec3_col8(data)
 
 with col9:
-    fn.sec3_col9()
\ No newline at end of file
+    fn.sec3_col9(data)
+
+
+
+st.markdown("---")
+
+col10, col11, col12 = st.columns([1, 1, 1])
+
+with col10:
+    fn.sec4_col10(data)
+
+with col11:
+    fn.sec4_col11(data)
+
+with col12:
+    fn.sec4_col12(data)
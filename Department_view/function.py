@@ -4,55 +4,108 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+import os
+import sys
+
+# Shared helpers (fmt, ...) live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fmt
+import versions
+import topn
+import bottlenecks
+import stages
+import data_service
+import holds
+import rollups
+import calendar_dim
+import forecast
+import duplicates
+import cancellations
 
 
 np.random.seed(42) 
 
-######################################            Sample data generation                ################################
+######################################            Data                ################################
 
-def generate_sample_data():
-    # Generate random vendor data
-    vendors = []
-    departments = ["Finance", "Procurement", "Operations", "HR", "IT"]
-    financial_years = ["2021-22", "2022-23", "2023-24"]
-    
-    for i in range(1, 101):
-        vendor_type = "MSME" if np.random.random() > 0.4 else "Non-MSME"
-        submission_date = np.random.choice(pd.date_range('2021-04-01', '2023-12-31'))
-        fy = "2021-22" if submission_date < pd.Timestamp('2022-04-01') else \
-             "2022-23" if submission_date < pd.Timestamp('2023-04-01') else "2023-24"
-        
-        vendors.append({
-            "Vendor ID": f"VEND{i:03d}",
-            "Vendor Name": f"Vendor {i}",
-            "Type": vendor_type,
-            "Department": np.random.choice(departments),
-            "FY": fy,
-            "Submission Date": submission_date,
-            "Pending Amount": round(np.random.uniform(1000, 500000), 2),
-            "Paid Amount": round(np.random.uniform(500, 450000), 2),  # Added paid amount
-            "Bill_Value": round(np.random.uniform(1500, 550000), 2),  # Added bill value
-            "Days Pending": np.random.randint(1, 120),
-            "Stakeholder": np.random.choice(["Finance", "Procurement", "Legal", "Operations", "Management"])
-        })
-    
-    return pd.DataFrame(vendors)
+# Page column names for the shared bills
+DISPLAY_NAMES = {
+    "VENDORID": "Vendor ID",
+    "VENDORNAME": "Vendor Name",
+    "DEPARTMENT": "Department",
+    "BILLNO": "Bill No",
+    "BILLDATE": "Bill Date",
+    "BILLVALUE": "Bill_Value",
+    "RECVDATE": "Submission Date",
+}
+
+
+def page_view(bills):
+    # Shared bills under this page's column names plus its derived columns
+    paid = bills["PAYMENT_DONE"].notna()
+    live = ~paid & bills["CANCELDATE"].isna()
+    as_of = bills[[col for col, _ in stages.PIPELINE if col in bills.columns]].max().max()
+    fy = calendar_dim.date_attribute(bills, "RECVDATE", "fy")
+    return data_service.view(bills, DISPLAY_NAMES).assign(**{
+        "Type": np.where(bills["MSME_VENDOR"] == "Yes", "MSME", "Non-MSME"),
+        "FY": calendar_dim.fy_label(fy).to_numpy(),
+        "Pending Amount": bills["BILLVALUE"].where(live, 0.0),
+        "Paid Amount": bills["BILLVALUE"].where(paid, 0.0),
+        "Days Pending": (bills["PAYMENT_DONE"].fillna(as_of) - bills["RECVDATE"]).dt.days,
+    })
+
+
+def page_data(bills):
+    # Page frame, KPI numbers and the indexes the sections read, once per
+    # dataset version (and access slice); call on every run
+    version = versions.dataset_version(bills)
+    if version is None:
+        return _build_page_data(bills)
+    return _page_data_cached(bills, version)
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _page_data_cached(_bills, version):
+    return _build_page_data(_bills)
+
+
+def _build_page_data(bills):
+    df = page_view(bills)
+    data = {"bills": bills, "df": df}
+
+    # Calculate metrics
+    data["total_bill_pending"] = df["Pending Amount"].sum()
+    data["count_done"] = len(df[df["Pending Amount"] == 0])
+    data["msme_count"] = len(df[df["Type"] == "MSME"])
+    data["non_msme_count"] = len(df[df["Type"] == "Non-MSME"])
+    data["avg_days_pending"] = df["Days Pending"].mean()
 
-# Load data
-df = generate_sample_data()
+    # Four point summary for days pending
+    data["days_summary"] = df["Days Pending"].describe()[3:7].to_dict()
 
-# Calculate metrics
-total_bill_pending = df["Pending Amount"].sum()
-count_done = len(df[df["Pending Amount"] == 0])
-msme_count = len(df[df["Type"] == "MSME"])
-non_msme_count = len(df[df["Type"] == "Non-MSME"])
-avg_days_pending = df["Days Pending"].mean()
+    # Indexes and aggregates below are the shared per-version ones built on the
+    # canonical bills, the same objects the other pages use
 
-# Four point summary for days pending
-days_summary = df["Days Pending"].describe()[3:7].to_dict()
+    # Bottleneck analysis - stages where open bills wait longest on average
+    data["waiting"] = bottlenecks.current(bills)
+    data["bottleneck_data"] = bottlenecks.dwell_summary(data["waiting"])["mean"].head(4)
 
-# Bottleneck analysis - top stakeholders by average days pending
-bottleneck_data = df.groupby("Stakeholder")["Days Pending"].mean().sort_values(ascending=False).head(4)
+    # Hold events (taxation / invoice / payment holds) with encoded remarks
+    data["hold_events"] = holds.events(bills)
+
+    # FY rollup of bill value per department and vendor for the waterfalls
+    data["fy_rollup"] = rollups.rollup(bills, grain="fy", dims=["DEPARTMENT", "VENDORNAME"])
+
+    # Probable duplicate bills and unusual bill values per vendor
+    data["bill_flags"] = duplicates.flags(bills)
+
+    # Cancelled bills newest first, with counts and amounts per department / user
+    data["cancel_index"] = cancellations.index(bills)
+
+    # Expected payment date of the open bills and the pending amount due in the next 30 days
+    data["payment_forecast"] = forecast.predictions(bills)
+    data["pending_next_30"] = forecast.expected_within(data["payment_forecast"], df["Pending Amount"], days=30)
+    return data
 
 
 
@@ -61,20 +114,24 @@ bottleneck_data = df.groupby("Stakeholder")["Days Pending"].mean().sort_values(a
 
 ###################################                   KPI Dashboard                       ##########################################
 
-def KPI_col1():
+def KPI_col1(data):
+    df, total_bill_pending, pending_next_30 = data["df"], data["total_bill_pending"], data["pending_next_30"]
+    paid_bills = int((df["Paid Amount"] > 0).sum())
     st.markdown(f"""
     <div class="kpi-card" style="text-align: center;">
         <div class="kpi-title">Total Bill Pending</div>
-        <div class="kpi-value">₹ 10 Lakh</div>
-        <div class="kpi-subtext"> Paid Bill: 230</div>
-        <div class="kpi-subtext"> Paid Amount: ₹320 Crore</div>
+        <div class="kpi-value">{fmt.inr_short(total_bill_pending)}</div>
+        <div class="kpi-subtext"> Paid Bill: {fmt.count(paid_bills)}</div>
+        <div class="kpi-subtext"> Paid Amount: {fmt.inr_short(df["Paid Amount"].sum())}</div>
+        <div class="kpi-subtext"> Expected in 30 days: {fmt.inr_short(pending_next_30)}</div>
     </div>
     """, unsafe_allow_html=True)
 
 
 
 
-def KPI_col2():
+def KPI_col2(data):
+    msme_count, non_msme_count = data["msme_count"], data["non_msme_count"]
     with st.container():
         st.markdown(f"""
         <div style="
@@ -110,7 +167,8 @@ def KPI_col2():
         
         
 
-def KPI_col3():
+def KPI_col3(data):
+    df = data["df"]
     try:
         # Calculate statistics
         days_stats = df["Days Pending"].describe()
@@ -172,7 +230,8 @@ def KPI_col3():
     except Exception as e:
         st.error(f"Error displaying timeline: {str(e)}")
 
-def KPI_col4():
+def KPI_col4(data):
+    df, bottleneck_data = data["df"], data["bottleneck_data"]
 
     st.subheader("Bottleneck Analysis")
     # Vendor selection
@@ -189,7 +248,7 @@ def KPI_col4():
     fig = px.bar(
         x=bottleneck_data.index,
         y=bottleneck_data.values,
-        labels={'x': 'Stakeholder', 'y': 'Avg Days Pending'},
+        labels={'x': 'Waiting At', 'y': 'Avg Days Pending'},
         color=bottleneck_data.index,
         color_discrete_sequence=px.colors.sequential.Reds_r
     )
@@ -226,11 +285,12 @@ def KPI_col4():
 ############################################     -------  SECTION 2 :   ----------           ##############################################
 
 
-def sec2_col5():
+def sec2_col5(data):
+    waiting = data["waiting"]
     st.markdown("**Stakeholder Processing Time**")
     
-    # Calculate average days by stakeholder
-    stakeholder_days = df.groupby('Stakeholder')['Days Pending'].mean().sort_values(ascending=False)
+    # Average days open bills have been waiting with each holder
+    stakeholder_days = bottlenecks.dwell_summary(waiting, by=bottlenecks.HOLDER)["mean"]
     
     # Create vertical bar chart
     fig1 = px.bar(
@@ -239,7 +299,7 @@ def sec2_col5():
         labels={'value': 'Average Days', 'index': ''},
         color=stakeholder_days.values,
         color_continuous_scale='Blues',
-        text=[f"{x:.1f}d" for x in stakeholder_days.values]  # Add days abbreviation
+        text=fmt.days(stakeholder_days.values, unit="d")  # Add days abbreviation
     )
     
     # Customize layout
@@ -264,10 +324,12 @@ def sec2_col5():
     st.plotly_chart(fig1, use_container_width=True)
 
 
-def sec2_col6():
+def sec2_col6(data):
+    bills = data["bills"]
     st.markdown("**Vendor Bill Analysis**")
     # Horizontal bar graph of vendor bills
-    vendor_bills = df['Vendor Name'].value_counts().sort_values(ascending=True)[-10:]  # Top 10 vendors
+    vendor_index = topn.index(bills)
+    vendor_bills = topn.top(vendor_index, n=10, by="count").iloc[::-1]  # Top 10 vendors
     fig2 = px.bar(
         vendor_bills,
         orientation='h',
@@ -287,40 +349,39 @@ def sec2_col6():
     st.plotly_chart(fig2, use_container_width=True)
 
 
-def sec2_col7():
+def sec2_col7(data):
+    df, cancel_index, bill_flags = data["df"], data["cancel_index"], data["bill_flags"]
     st.markdown("**Cancelled Bill History**")
-    # Filter cancelled bills (assuming a 'Status' column exists)
-    if 'Status' in df.columns:
-        cancelled_bills = df[df['Status'] == 'Cancelled'].head(10)
-    else:
-        # Create sample cancelled bills if no status column exists
-        cancelled_bills = df.sample(5).copy()
-        cancelled_bills['Status'] = 'Cancelled'
-        cancelled_bills['Cancellation Reason'] = np.random.choice(
-            ['Duplicate', 'Incorrect Amount', 'Vendor Request', 'System Error'],
-            size=5
-        )
-    
+    # Newest cancellations from the CANCELDATE index
+    cancelled_bills = df.iloc[cancellations.latest(cancel_index, n=10)]
+    reasons = duplicates.flagged(bill_flags)["REASON"]
+
     # Display cancelled bills table
     st.dataframe(
-        cancelled_bills[[
-            'Vendor Name', 
-            'Pending Amount', 
-            'Days Pending', 
-            'Status',
-            'Cancellation Reason' if 'Cancellation Reason' in cancelled_bills.columns else 'Stakeholder'
-        ]],
-        height=400,
-        use_container_width=True
+        pd.DataFrame({
+            'Vendor Name': cancelled_bills['Vendor Name'],
+            'Bill Value': fmt.inr(cancelled_bills['Bill_Value']),
+            'Cancelled On': fmt.dates(cancelled_bills['CANCELDATE']),
+            'Cancelled By': cancelled_bills['CANCELEDBY'],
+            'Reason': reasons.reindex(cancelled_bills.index).fillna(fmt.MISSING),
+        }),
+        height=300,
+        use_container_width=True,
+        hide_index=True
     )
 
+    by_dept = cancellations.totals(cancel_index, "DEPARTMENT")
+    st.caption(" | ".join(f"{dept}: {fmt.count(row['Cancelled'])} ({fmt.inr_short(row['Amount'])})"
+                          for dept, row in by_dept.iterrows()))
+
 ############################################     -------  SECTION 3 :   ----------           ############################################## 
 
-def sec3_col8():
+def sec3_col8(data):
+    fy_rollup = data["fy_rollup"]
     st.markdown("**Department & FY-wise Trend**")
     
     # Prepare data for waterfall
-    fy_data = df.groupby('FY')['Bill_Value'].sum().reset_index()
+    fy_data = rollups.trend(fy_rollup).rename(columns={'bucket': 'FY', 'value': 'Bill_Value'})
     fy_data['Change'] = fy_data['Bill_Value'].diff().fillna(fy_data['Bill_Value'].iloc[0])
     
     # Create waterfall chart with adjusted margins
@@ -328,7 +389,7 @@ def sec3_col8():
         x=fy_data['FY'],
         y=fy_data['Change'],
         measure=['absolute'] + ['relative']*(len(fy_data)-1),
-        text=[f"₹{x:,.0f}" for x in fy_data['Bill_Value']],
+        text=fmt.inr(fy_data['Bill_Value'], decimals=0),
         connector={"line":{"color":"rgb(63, 63, 63)"}},
     ))
     
@@ -353,7 +414,8 @@ def sec3_col8():
     
     st.plotly_chart(fig_fy, use_container_width=True)
 
-def sec3_col9():
+def sec3_col9(data):
+    df, fy_rollup = data["df"], data["fy_rollup"]
     st.markdown("**Vendor Contribution by Financial Year**")
     
     try:
@@ -367,7 +429,8 @@ def sec3_col9():
         )
         
         # Prepare data for selected vendor
-        vendor_fy_data = df[df['Vendor Name'] == selected_vendor].groupby('FY')['Bill_Value'].sum().reset_index()
+        vendor_fy_data = rollups.trend(fy_rollup, {'VENDORNAME': [selected_vendor]}).rename(
+            columns={'bucket': 'FY', 'value': 'Bill_Value'})
         
         # Check if vendor has multi-year data
         if len(vendor_fy_data) < 2:
@@ -382,7 +445,7 @@ def sec3_col9():
             x=vendor_fy_data['FY'],
             y=vendor_fy_data['Change'],
             measure=['absolute'] + ['relative']*(len(vendor_fy_data)-1),
-            text=[f"₹{x:,.0f}" for x in vendor_fy_data['Bill_Value']],
+            text=fmt.inr(vendor_fy_data['Bill_Value'], decimals=0),
             connector={"line":{"color":"#666","width":1.2}},
             increasing={"marker":{"color":"#4C78A8"}},
             decreasing={"marker":{"color":"#E45756"}},
@@ -414,4 +477,68 @@ def sec3_col9():
         
     except Exception as e:
         st.error(f"Error generating vendor analysis: {str(e)}")
-        st.info("Required columns: 'Vendor Name', 'Bill_Value', 'FY'")
\ No newline at end of file
+        st.info("Required columns: 'Vendor Name', 'Bill_Value', 'FY'")
+
+
+
+############################################     -------  SECTION 4 :   ----------           ##############################################
+
+def sec4_col10(data):
+    hold_events = data["hold_events"]
+    st.markdown("**Holds by Stage**")
+    stage_holds = holds.summary(hold_events, by="stage")
+
+    fig = px.bar(
+        stage_holds,
+        x=stage_holds.index,
+        y="Hold Days",
+        color="Hold Days",
+        color_continuous_scale="Oranges",
+        hover_data=["Holds", "Avg Hold Days"],
+        text=fmt.count(stage_holds["Holds"], unit=" holds")
+    )
+    fig.update_layout(
+        height=350,
+        showlegend=False,
+        coloraxis_showscale=False,
+        margin=dict(l=20, r=20, t=30, b=20),
+        xaxis_title="",
+        yaxis_title="Total Hold Days",
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    fig.update_traces(textposition='outside', width=0.5)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def sec4_col11(data):
+    hold_events = data["hold_events"]
+    st.markdown("**Top Hold Remarks**")
+    stage = st.selectbox(
+        "Stage",
+        ["All Stages"] + list(holds.HOLD_STAGES),
+        key="hold_stage",
+        label_visibility="collapsed"
+    )
+    remarks = holds.top_remarks(hold_events, n=10, stage=None if stage == "All Stages" else stage)
+    st.dataframe(
+        fmt.format_frame(remarks, {"Hold Days": lambda s: fmt.days(s, decimals=0)}),
+        hide_index=True,
+        height=350,
+        use_container_width=True
+    )
+
+
+def sec4_col12(data):
+    hold_events = data["hold_events"]
+    st.markdown("**Holds by Department**")
+    dept_holds = holds.summary(hold_events, by="DEPARTMENT")
+    st.dataframe(
+        fmt.format_frame(dept_holds, {
+            "Holds": fmt.count,
+            "Hold Days": lambda s: fmt.days(s, decimals=0),
+            "Avg Hold Days": fmt.days
+        }),
+        height=350,
+        use_container_width=True
+    )
+
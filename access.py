@@ -0,0 +1,186 @@
+import json
+import os
+import hashlib
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+import data_service
+
+
+# Row-level access to the shared bills.
+# BILLS_ACCESS points at a JSON file granting every user a slice of the bills:
+#
+#   {
+#     "users": {
+#       "cfo@corp": {"all": true},
+#       "hr.head@corp": {"departments": ["HR"]},
+#       "it.head@corp": {"dept_ids": ["D03"]},
+#       "ap.clerk@corp": {"users": ["@accounts-payable", "User7"]}
+#     },
+#     "groups": {"accounts-payable": ["User1", "User2"]},
+#     "default": {}
+#   }
+#
+# "departments" / "dept_ids" match DEPARTMENT / DEPT_ID, "users" matches the
+# INITIATOR or USER_NAME of a bill ("@name" expands a group); a grant sees the
+# union. Unknown users get "default" (nothing when absent). Without
+# BILLS_ACCESS everybody sees all bills, as before.
+#
+# Users with the same grant share one slice frame, cut once per dataset
+# version from precomputed row-id lists and carrying its own version stamp,
+# so every per-version index and aggregate cache works per slice without
+# filtering the full frame per session.
+
+ACCESS_ENV = "BILLS_ACCESS"
+# Identity when there is no Streamlit login: a header set by the reverse proxy,
+# honoured only with BILLS_TRUST_PROXY=1 (any client can send it, so only when
+# the server is reachable through that proxy alone), then this variable
+# (single-user / local runs)
+USER_HEADER = "X-Forwarded-User"
+TRUST_PROXY_ENV = "BILLS_TRUST_PROXY"
+USER_ENV = "BILLS_USER"
+
+# Grant key -> columns whose values it lists
+GRANT_COLUMNS = {
+    "departments": ["DEPARTMENT"],
+    "dept_ids": ["DEPT_ID"],
+    "users": ["INITIATOR", "USER_NAME"],
+}
+ALL = {"all": True}
+
+
+def policy():
+    path = os.environ.get(ACCESS_ENV)
+    if not path:
+        return None
+    return _read_policy(path, os.path.getmtime(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _read_policy(path, mtime):
+    with open(path) as f:
+        return json.load(f)
+
+
+def grant(user, rules=None):
+    # Normalised grant of a user: ALL, or {key: sorted values}
+    rules = policy() if rules is None else rules
+    if rules is None:
+        return ALL
+    entry = rules.get("users", {}).get(user, rules.get("default", {})) if user else rules.get("default", {})
+    if entry.get("all"):
+        return ALL
+    groups = rules.get("groups", {})
+    result = {}
+    for key in GRANT_COLUMNS:
+        values = set()
+        for value in entry.get(key, []):
+            if key == "users" and str(value).startswith("@"):
+                values.update(groups.get(value[1:], []))
+            else:
+                values.add(value)
+        if values:
+            result[key] = sorted(map(str, values))
+    return result
+
+
+def grant_key(g):
+    # Hashable form of a grant
+    if g == ALL:
+        return (("all", True),)
+    return tuple((key, tuple(values)) for key, values in sorted(g.items()))
+
+
+def current_user():
+    try:
+        if st.user.get("is_logged_in"):
+            return st.user.get("email")
+    except Exception:
+        pass
+    try:
+        headers = st.context.headers
+    except Exception:
+        headers = {}
+    return header_user(headers)
+
+
+def header_user(headers):
+    # User named by the trusted proxy's header, else BILLS_USER
+    user = headers.get(USER_HEADER) if os.environ.get(TRUST_PROXY_ENV) == "1" else None
+    return user or os.environ.get(USER_ENV)
+
+
+def postings(df):
+    # {column: {value: sorted row positions}} for the grant columns, once per version
+    version = versions.dataset_version(df)
+    if version is None:
+        return _build_postings(df)
+    return _postings_cached(df, version)
+
+
+def _build_postings(df):
+    result = {}
+    for columns in GRANT_COLUMNS.values():
+        for col in columns:
+            if col not in df.columns or col in result:
+                continue
+            codes, uniques = pd.factorize(df[col].astype(str).where(df[col].notna()))
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            result[col] = {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)}
+    return result
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _postings_cached(_df, version):
+    return _build_postings(_df)
+
+
+def rows(df, g):
+    # Sorted row positions a grant may see
+    index = postings(df)
+    parts = [np.empty(0, dtype=np.intp)]
+    for key, values in g.items():
+        for col in GRANT_COLUMNS[key]:
+            lists = index.get(col, {})
+            parts.extend(lists[v] for v in values if v in lists)
+    return np.unique(np.concatenate(parts))
+
+
+def restrict(df, g):
+    # The bills a grant may see: df itself for ALL, else the shared slice
+    if g == ALL:
+        return df
+    version = versions.dataset_version(df)
+    if version is None:
+        return df.take(rows(df, g))
+    return _slice(df, version, grant_key(g))
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _slice(_df, version, key):
+    part = _df.take(rows(_df, {k: list(v) for k, v in key}))
+    # Own version stamp, so the per-version caches keep slices apart
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+    part.attrs["version"] = f"{version}/{digest}"
+    # Same partitions and change stamps as the full load (data_service.depends)
+    part.attrs["parent"] = version
+    part.attrs["grant"] = digest
+    return part
+
+
+def for_user(df, user):
+    return restrict(df, grant(user))
+
+
+def bills():
+    # The shared bills as the current session's user may see them
+    df = for_user(data_service.bills(), current_user())
+    if len(df) == 0:
+        st.warning("No bills are shared with you. Ask an administrator for access.")
+        st.stop()
+    return df
+
@@ -0,0 +1,159 @@
+import asyncio
+import contextlib
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+import data_service
+import access
+import versions
+import queries
+import telemetry
+
+
+# Local JSON API over the shared bills: python api.py [port]
+#   GET /departments               per-department totals and payment-day quantiles
+#   GET /vendors/{name}/summary    one vendor's KPIs
+#   GET /trends?grain=month&by=    bills / value / avg days per time bucket
+# Filters on every endpoint: department=..&department=.., bill_type=..,
+# msme=Yes|No, paid_from=YYYY-MM-DD, paid_to=YYYY-MM-DD. With BILLS_ACCESS
+# set, answers cover only the bills the user may see (access.py).
+#
+# Loading, access slicing and aggregations run on a bounded thread pool so the
+# event loop keeps serving.
+# Answers are cached per (partitions read and their change stamps, endpoint,
+# arguments), so a refresh only drops answers it can affect, and identical
+# requests arriving while one is being computed wait for that computation
+# instead of starting their own.
+
+WORKERS = int(os.environ.get("BILLS_API_WORKERS", "4"))
+CACHE_ENTRIES = 256
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="api")
+_cache = OrderedDict()
+_in_flight = {}
+
+
+def _filters(params):
+    return {
+        "departments": params.getlist("department"),
+        "bill_types": params.getlist("bill_type"),
+        "msme": params.get("msme"),
+        "paid_from": params.get("paid_from"),
+        "paid_to": params.get("paid_to"),
+    }
+
+
+def _default(value):
+    if isinstance(value, (np.integer, np.floating)):
+        return None if np.isnan(value) else value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(pd.Timestamp(value).date())
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return str(value)
+
+
+def _encode(result):
+    if isinstance(result, pd.DataFrame):
+        result = result.astype(object).where(result.notna(), None).to_dict(orient="records")
+    return json.dumps(result, default=_default).encode()
+
+
+async def _answer(key, compute):
+    # Cached JSON for key; computes at most once however many requests ask
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    if key not in _in_flight:
+        work = asyncio.get_running_loop().run_in_executor(_pool, lambda: _encode(compute()))
+        _in_flight[key] = work
+        work.add_done_callback(lambda done: _finish(key, done))
+    # A cancelled request (client gone) stops waiting; the computation and the
+    # other requests waiting for it carry on
+    return await asyncio.shield(_in_flight[key])
+
+
+def _finish(key, done):
+    # Runs on the event loop when a computation ends, however it ends
+    del _in_flight[key]
+    # Retrieving the exception also avoids "exception never retrieved"
+    if done.cancelled() or done.exception() is not None:
+        return
+    _cache[key] = done.result()
+    if len(_cache) > CACHE_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def _json(body, status=200):
+    return Response(body, status_code=status, media_type="application/json")
+
+
+async def _endpoint(request, name, compute, *args):
+    # Loading / slicing the bills can take a while: on the pool, not the loop
+    user = access.header_user(request.headers)
+    df = await asyncio.get_running_loop().run_in_executor(_pool, lambda: access.for_user(data_service.bills(), user))
+    filters = _filters(request.query_params)
+    try:
+        # Keyed on the stamps of the partitions the filters can read, so answers
+        # about untouched departments / years stay cached across refreshes
+        scope = queries.scope(filters)
+        key = (data_service.depends(df, **scope), name, args, queries.filter_key(filters))
+        started = time.perf_counter()
+        body = await _answer(key, lambda: compute(df, *args, filters))
+        telemetry.record("api", name, key[3], ms=(time.perf_counter() - started) * 1000, rows=len(df),
+                         vendor=args[0] if name == "vendor" else None)
+        return _json(body)
+    except (KeyError, ValueError) as e:
+        return _json(json.dumps({"error": str(e)}).encode(), status=400)
+
+
+async def departments(request):
+    return await _endpoint(request, "departments", lambda df, filters: queries.departments(df, filters))
+
+
+async def vendor_summary(request):
+    vendor = request.path_params["name"]
+    return await _endpoint(request, "vendor", lambda df, name, filters: queries.vendor_summary(df, name, filters), vendor)
+
+
+async def trends(request):
+    grain = request.query_params.get("grain", "month")
+    by = request.query_params.get("by") or None
+    return await _endpoint(request, "trends",
+                           lambda df, grain, by, filters: queries.trends(df, filters, grain=grain, by=by), grain, by)
+
+
+async def health(request):
+    version = versions.dataset_version(await asyncio.get_running_loop().run_in_executor(_pool, data_service.bills))
+    return _json(json.dumps({"status": "ok", "version": version}, default=_default).encode())
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Load the shared bills before the first request
+    await asyncio.get_running_loop().run_in_executor(_pool, data_service.bills)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/departments", departments),
+        Route("/vendors/{name}/summary", vendor_summary),
+        Route("/trends", trends),
+        Route("/health", health),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import sys
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[1]) if len(sys.argv) > 1 else 8600)
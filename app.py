@@ -0,0 +1,18 @@
+import streamlit as st
+import warmup
+
+# Multipage entry point: `streamlit run app.py` (or `python run.py` to warm the
+# data before the server starts). Only the selected page's script runs, so
+# plotly and the page helpers are imported by the pages that use them.
+st.set_page_config(layout="wide", page_title="Bills Analytics")
+
+# Shared bills and indexes load in the background while the page renders
+warmup.start()
+
+pages = st.navigation([
+    st.Page("dash.py", title="Invoice Processing", icon="🧾", default=True),
+    st.Page("Department_view/Department_view.py", title="Department View", icon="🏢", url_path="department_view"),
+    st.Page("deptt.py", title="Department Analytics", icon="📊"),
+    st.Page("vendor.py", title="Vendor Analytics", icon="💰"),
+])
+pages.run()
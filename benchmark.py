@@ -0,0 +1,86 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+import sample_data
+import stages
+import parallel
+import calendar_dim
+import data_service
+
+# Partitioned (parallel.py) vs single-threaded pandas aggregation:
+#   BILLS_WORKERS=8 python benchmark.py [bills] [repeats]
+# Builds demo bills, times the department table, the per-vendor table and the
+# stage means with pandas and partitioned (one worker, threads, processes),
+# and checks that the results match.
+
+
+def pandas_departments(df):
+    grouped = df.groupby("DEPARTMENT", observed=True)
+    table = grouped.agg(
+        vendors=("VENDORNAME", "nunique"),
+        bills=("BILLVALUE", "size"),
+        value=("BILLVALUE", "sum"),
+        avg_days=("TOTAL_DAYS_for_PAYMENT", "mean"),
+    )
+    days = grouped["TOTAL_DAYS_for_PAYMENT"].quantile(list(parallel.QUANTILES)).unstack()
+    days.columns = [f"p{int(q * 100)}_days" for q in parallel.QUANTILES]
+    return table.join(days).reset_index()
+
+
+def pandas_vendors(df):
+    return df.groupby(["DEPARTMENT", "VENDORNAME"], observed=True).agg(
+        value=("BILLVALUE", "sum"),
+        avg_days=("TOTAL_DAYS_for_PAYMENT", "mean"),
+        bills=("BILLNO", "count"),
+        payments=("PAYMENT_DONE", "count"),
+    ).sort_values("value", ascending=False)
+
+
+def pandas_stage_means(df):
+    return stages.stage_means(stages.compute(df))
+
+
+def best(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(n=1_000_000, repeats=3):
+    print(f"Generating {n:,} bills...")
+    # As data_service loads them: canonical, with the <DATE>_DAY day numbers
+    df = sample_data.generate(n=n, vendors=max(n // 50, 10))
+    df = calendar_dim.join(data_service.canonical(df), data_service.CALENDAR_COLUMNS)
+    workers = parallel.WORKERS
+    print(f"{workers} workers\n")
+    cases = [
+        ("department table", pandas_departments, parallel.department_table),
+        ("vendor table", pandas_vendors, parallel.vendor_table),
+        ("stage means", pandas_stage_means, parallel.stage_means),
+    ]
+    print(f"{'aggregate':<18}{'pandas':>10}{'1 worker':>10}{'threads':>10}{'processes':>11}{'speedup':>9}  match")
+    for name, single, partitioned in cases:
+        t_single, expected = best(lambda: single(df), repeats)
+        parallel.WORKERS = 1
+        t_serial, _ = best(lambda: partitioned(df), repeats)
+        parallel.WORKERS = workers
+        t_thread, result = best(lambda: partitioned(df, mode="thread"), repeats)
+        t_process, _ = best(lambda: partitioned(df, mode="process"), repeats)
+        if isinstance(expected, pd.DataFrame):
+            match = np.allclose(expected.select_dtypes("number").to_numpy(dtype=float),
+                                result.loc[expected.index].select_dtypes("number").to_numpy(dtype=float)
+                                if name == "vendor table" else result.select_dtypes("number").to_numpy(dtype=float),
+                                equal_nan=True)
+        else:
+            match = np.allclose(expected.to_numpy(), result.reindex(expected.index).to_numpy())
+        fastest = min(t_serial, t_thread, t_process)
+        print(f"{name:<18}{t_single:>9.3f}s{t_serial:>9.3f}s{t_thread:>9.3f}s{t_process:>10.3f}s"
+              f"{t_single / fastest:>8.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
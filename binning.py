@@ -0,0 +1,146 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+
+
+# Histogram / box-plot summaries without shipping raw rows.
+# At load time every numeric column of interest is bucketed once into a fine
+# histogram per filter cell (one cell = one combination of the dimension
+# values). Any filter selection is then a sum over the selected cells, and
+# chart bins and five-number summaries are read off the summed histogram, so
+# the cost depends on cells x bins, not on how many rows match.
+
+FINE_BINS = 512
+# Integer columns (day counts) with a range up to this get one bin per value,
+# so their quantiles are accurate to within a day
+MAX_EXACT_BINS = 4096
+
+FILTER_DIMS = ["DEPARTMENT", "STATUS", "MSME_VENDOR", "BILLTYPE"]
+
+
+def fine_edges(values):
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([0.0, 1.0])
+    lo, hi = float(values.min()), float(values.max())
+    if np.all(values == np.round(values)) and hi - lo + 1 <= MAX_EXACT_BINS:
+        return np.arange(lo, hi + 2) - 0.5
+    if hi == lo:
+        hi = lo + 1.0
+    return np.linspace(lo, hi, FINE_BINS + 1)
+
+
+def cells(df, dims):
+    # Integer cell id per row plus the dimension values of each cell
+    if not dims:
+        return np.zeros(len(df), dtype=np.int64), pd.DataFrame(index=[0])
+    cell, keys = pd.MultiIndex.from_frame(df[dims].astype(str)).factorize()
+    keys = keys.to_frame(index=False)
+    keys.columns = dims
+    return cell, keys
+
+
+def build_cube(df, value, dims=FILTER_DIMS):
+    dims = [d for d in dims if d in df.columns]
+    values = pd.to_numeric(df[value], errors="coerce").to_numpy(dtype=float)
+    edges = fine_edges(values)
+    nbins = len(edges) - 1
+
+    cell, keys = cells(df, dims)
+    ncell = len(keys)
+
+    valid = ~np.isnan(values)
+    idx = np.clip(np.searchsorted(edges, values[valid], side="right") - 1, 0, nbins - 1)
+    counts = np.bincount(cell[valid] * nbins + idx, minlength=ncell * nbins).reshape(ncell, nbins)
+
+    # Exact per-cell extremes so whiskers are not rounded to bin edges
+    lo = np.full(ncell, np.inf)
+    hi = np.full(ncell, -np.inf)
+    np.minimum.at(lo, cell[valid], values[valid])
+    np.maximum.at(hi, cell[valid], values[valid])
+
+    return {"value": value, "dims": dims, "keys": keys, "edges": edges,
+            "counts": counts, "min": lo, "max": hi}
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _cached_cube(_df, version, value, dims):
+    return build_cube(_df, value, list(dims))
+
+
+def cube(df, value, dims=FILTER_DIMS):
+    # Build once per dataset version; without a version stamp build every time
+    version = versions.dataset_version(df)
+    if version is None:
+        return build_cube(df, value, dims)
+    return _cached_cube(df, version, value, tuple(dims))
+
+
+def cell_mask(cube, filters):
+    # filters: {dimension: selected values}; dimensions not given are not filtered.
+    # Works for any index dict carrying "keys" and "dims" (see topn.py).
+    keys = cube["keys"]
+    mask = np.ones(len(keys), dtype=bool)
+    for dim, selected in filters.items():
+        if dim in cube["dims"]:
+            mask &= keys[dim].isin([str(v) for v in selected]).to_numpy()
+    return mask
+
+
+def _combine(cube, mask):
+    counts = cube["counts"][mask].sum(axis=0)
+    lo = cube["min"][mask].min() if mask.any() else np.inf
+    hi = cube["max"][mask].max() if mask.any() else -np.inf
+    return counts, lo, hi
+
+
+def histogram(cube, filters, bins=20):
+    # (counts, edges) over the range of the selected rows
+    counts, lo, hi = _combine(cube, cell_mask(cube, filters))
+    if counts.sum() == 0:
+        return np.zeros(bins, dtype=np.int64), np.linspace(0, 1, bins + 1)
+    fine = cube["edges"]
+    if hi == lo:
+        hi = lo + 1.0
+    edges = np.linspace(lo, hi, bins + 1)
+    centers = (fine[:-1] + fine[1:]) / 2
+    target = np.clip(np.searchsorted(edges, centers, side="right") - 1, 0, bins - 1)
+    return np.bincount(target, weights=counts, minlength=bins).astype(np.int64), edges
+
+
+def quantiles(counts, edges, qs):
+    # Quantiles from a histogram, interpolating linearly inside each bin
+    total = counts.sum()
+    if total == 0:
+        return np.full(len(qs), np.nan)
+    cum = np.concatenate([[0], np.cumsum(counts)])
+    return np.interp(np.asarray(qs) * total, cum, edges)
+
+
+def five_number(counts, edges, lo, hi):
+    if counts.sum() == 0:
+        return dict.fromkeys(["min", "q1", "median", "q3", "max"], np.nan)
+    q1, median, q3 = quantiles(counts, edges, [0.25, 0.5, 0.75])
+    # Keep the interpolated values inside the exact extremes
+    q1, median, q3 = (float(np.clip(q, lo, hi)) for q in (q1, median, q3))
+    return {"min": float(lo), "q1": q1, "median": median, "q3": q3, "max": float(hi)}
+
+
+def summary(cube, filters):
+    counts, lo, hi = _combine(cube, cell_mask(cube, filters))
+    stats = five_number(counts, cube["edges"], lo, hi)
+    stats["count"] = int(counts.sum())
+    return stats
+
+
+def box_by(cube, filters, group):
+    # Five-number summary of the cube's value for each level of `group`
+    mask = cell_mask(cube, filters)
+    rows = []
+    for level in sorted(cube["keys"].loc[mask, group].unique()):
+        stats = summary(cube, {**filters, group: [level]})
+        if stats["count"]:
+            rows.append({group: level, **stats})
+    return pd.DataFrame(rows, columns=[group, "min", "q1", "median", "q3", "max", "count"])
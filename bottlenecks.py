@@ -0,0 +1,96 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+import stages
+import calendar_dim
+
+
+# Where open bills are waiting, and for how long.
+# For every bill without PAYMENT_DONE the current stage is taken from
+# PENDINGFOR when the workflow system filled it, otherwise it is the stage
+# after the last recorded date; PIPELINE_STAGE is always the latter, a
+# stages.PIPELINE name, for code that needs the stage in pipeline terms
+# (PENDINGFOR is free text in real exports). The holder is ONTABLE / ACTIONBY / USER_NAME,
+# whichever is present first, and the dwell time runs from the later of the
+# last stage date and ACTIONDATE up to the dataset's as-of date. These columns
+# are built once per dataset version; each filter change only groups them.
+
+STAGE = "CURRENT_STAGE"
+PIPELINE_STAGE = "PIPELINE_STAGE"
+HOLDER = "WAITING_WITH"
+DWELL = "DWELL_DAYS"
+
+HOLDER_COLUMNS = ["ONTABLE", "ACTIONBY", "USER_NAME"]
+
+
+def _first_present(df, columns):
+    out = pd.Series(np.nan, index=df.index, dtype=object)
+    for col in columns:
+        if col in df.columns:
+            out = out.fillna(df[col].where(df[col].astype(str).str.strip() != ""))
+    return out
+
+
+def compute(df, as_of=None):
+    present = [(col, name) for col, name in stages.PIPELINE if col in df.columns]
+    result = pd.DataFrame(index=df.index)
+    if not present:
+        return result
+    columns = [col for col, _ in present]
+    names = np.array([name for _, name in present] + ["Payment done"], dtype=object)
+    days, missing = stages.day_matrix(df, columns)
+    k = len(columns)
+
+    last = np.where(missing, -1, np.arange(k)).max(axis=1)
+    last_day = np.take_along_axis(days, np.clip(last, 0, None)[:, None], axis=1)[:, 0].astype(np.float64)
+    last_day[last < 0] = np.nan
+    if "ACTIONDATE" in df.columns:
+        action = calendar_dim.days(df, "ACTIONDATE")
+        action_day = np.where(action == calendar_dim.MISSING_DAY, np.nan, action.astype(np.float64))
+        last_day = np.fmax(last_day, action_day)
+
+    is_open = np.ones(len(df), dtype=bool)
+    if "PAYMENT_DONE" in df.columns:
+        is_open &= missing[:, columns.index("PAYMENT_DONE")]
+    if "CANCELDATE" in df.columns:
+        is_open &= df["CANCELDATE"].isna().to_numpy()
+
+    if as_of is None:
+        as_of = np.nanmax(np.where(missing, np.nan, days.astype(np.float64))) if (~missing).any() else np.nan
+    else:
+        as_of = float(np.datetime64(pd.Timestamp(as_of), "D").astype(np.int64))
+
+    stage = pd.Series(names[np.clip(last + 1, 0, k)], index=df.index)
+    result[PIPELINE_STAGE] = stage.where(is_open).astype("category")
+    if "PENDINGFOR" in df.columns:
+        stage = df["PENDINGFOR"].where(df["PENDINGFOR"].notna() & (df["PENDINGFOR"].astype(str).str.strip() != ""), stage)
+
+    result[STAGE] = stage.where(is_open).astype("category")
+    result[HOLDER] = _first_present(df, HOLDER_COLUMNS).where(is_open).astype("category")
+    result[DWELL] = np.where(is_open, as_of - last_day, np.nan).astype(np.float32)
+    return result
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached(_df, version):
+    return compute(_df)
+
+
+def current(df):
+    # Current stage / holder / dwell days for the full dataset, once per version
+    version = versions.dataset_version(df)
+    if version is None:
+        return compute(df)
+    return _cached(df, version)
+
+
+def dwell_summary(result, by=STAGE, qs=(0.5, 0.9)):
+    # Count, mean and percentiles of dwell days per stage (or holder), worst first
+    open_rows = result[result[DWELL].notna()]
+    grouped = open_rows.groupby(by, observed=True)[DWELL]
+    summary = grouped.agg(["count", "mean"])
+    for q in qs:
+        summary[f"p{int(q * 100)}"] = grouped.quantile(q)
+    return summary.sort_values("mean", ascending=False)
@@ -0,0 +1,185 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+
+# Calendar dimension.
+# One row per day of the financial years the bills fall in, with Indian
+# financial year (April-March), FY quarter, month, ISO week and working-day
+# flag as integer keys. Bill dates join to it by integer day number (days
+# since 1970-01-01), so FY / quarter grouping is an integer groupby and no
+# per-row date comparisons are needed. Day numbers do not depend on the
+# calendar's range, so they stay valid for any subset of the bills and any
+# calendar covering them.
+
+# Saturday and Sunday
+WEEKEND = (5, 6)
+
+# Stored next to each joined date column: <DATE>_DAY = int32 day number
+DAY_SUFFIX = "_DAY"
+EPOCH = np.datetime64("1970-01-01", "D")
+MISSING_DAY = np.iinfo(np.int32).min
+# Calendars kept; they are keyed by whole financial years, so few ever differ
+MAX_CALENDARS = 16
+
+
+def build(start, end, holidays=()):
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D")
+    year = days.year.to_numpy()
+    month = days.month.to_numpy()
+    fy = year - (month < 4)
+    fy_quarter = (month - 4) % 12 // 3 + 1          # Q1 = Apr-Jun
+    iso = days.isocalendar()
+    working = ~np.isin(days.dayofweek, WEEKEND) & ~days.isin(pd.to_datetime(list(holidays)))
+
+    return pd.DataFrame({
+        "date": days,
+        "fy": fy.astype(np.int16),                                   # FY start year, 2023 = 2023-24
+        "fy_quarter": fy_quarter.astype(np.int8),
+        "fy_quarter_key": (fy * 10 + fy_quarter).astype(np.int32),   # 20231 = 2023-24 Q1
+        "month_key": (year * 100 + month).astype(np.int32),          # 202304
+        "week_key": (iso["year"].to_numpy() * 100 + iso["week"].to_numpy()).astype(np.int32),
+        "working_day": working,
+        # Working days up to and including each day, for working-day differences
+        "working_index": np.cumsum(working).astype(np.int32),
+    })
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_CALENDARS)
+def _cached(start_fy, end_fy):
+    return build(pd.Timestamp(start_fy, 4, 1), pd.Timestamp(end_fy + 1, 3, 31))
+
+
+def _fy(date):
+    date = pd.Timestamp(date)
+    return date.year - (date.month < 4)
+
+
+def calendar(start, end):
+    # Shared calendar covering a date range, built once per span of financial
+    # years, so every subset of the bills (filters, slices) reuses one
+    return _cached(_fy(start), _fy(end))
+
+
+def for_frame(df, date_columns):
+    # Calendar covering every date in the given columns
+    lo, hi = [], []
+    for col in date_columns:
+        if col in df.columns:
+            values = pd.to_datetime(df[col], errors="coerce")
+            if values.notna().any():
+                lo.append(values.min())
+                hi.append(values.max())
+    if not lo:
+        today = pd.Timestamp.today()
+        return calendar(today, today)
+    return calendar(min(lo), max(hi))
+
+
+def offsets(calendar, dates):
+    # Integer row of each date in the calendar; -1 for missing or out of range
+    first = np.datetime64(calendar["date"].iloc[0], "D").astype(np.int64)
+    days = pd.to_datetime(dates, errors="coerce")
+    days = np.asarray(days.to_numpy() if hasattr(days, "to_numpy") else days).astype("datetime64[D]")
+    pos = days.astype(np.int64) - first
+    pos[np.isnat(days) | (pos < 0) | (pos >= len(calendar))] = -1
+    return pos.astype(np.int32)
+
+
+def take(calendar, pos, attribute):
+    # Calendar attribute for day offsets (vectorised take); <NA> where pos is -1
+    pos = np.asarray(pos)
+    values = calendar[attribute].to_numpy()[np.clip(pos, 0, None)]
+    if (pos >= 0).all():
+        return values
+    dtype = "boolean" if values.dtype == bool else "Int32"
+    out = pd.array(values, dtype=dtype)
+    out[pos < 0] = pd.NA
+    return out
+
+
+def lookup(calendar, dates, attribute):
+    return take(calendar, offsets(calendar, dates), attribute)
+
+
+def day_numbers(dates):
+    # int32 days since EPOCH; MISSING_DAY for missing dates
+    days = pd.to_datetime(dates, errors="coerce")
+    days = np.asarray(days.to_numpy() if hasattr(days, "to_numpy") else days).astype("datetime64[D]")
+    out = (days - EPOCH).astype(np.int64)
+    out[np.isnat(days)] = MISSING_DAY
+    return out.astype(np.int32)
+
+
+def dates(days):
+    # datetime64 dates of day numbers; NaT for MISSING_DAY
+    days = np.asarray(days)
+    out = (EPOCH + days.astype(np.int64)).astype("datetime64[ns]")
+    out[days == MISSING_DAY] = np.datetime64("NaT")
+    return out
+
+
+def join(df, date_columns):
+    # Adds <DATE>_DAY day numbers for each bill date column; attributes are
+    # then read with attribute(df, calendar, DATE, "fy") without re-parsing dates
+    for col in date_columns:
+        if col in df.columns:
+            df[col + DAY_SUFFIX] = day_numbers(df[col])
+    return df
+
+
+def day_positions(calendar, days):
+    # Calendar rows of day numbers; -1 for missing or out of range
+    first = (np.datetime64(calendar["date"].iloc[0], "D") - EPOCH).astype(np.int64)
+    days = np.asarray(days)
+    pos = days.astype(np.int64) - first
+    pos[(days == MISSING_DAY) | (pos < 0) | (pos >= len(calendar))] = -1
+    return pos.astype(np.int32)
+
+
+def days(df, date_column):
+    # Day numbers of a date column, from <DATE>_DAY when it was joined
+    key = date_column + DAY_SUFFIX
+    return df[key].to_numpy() if key in df.columns else day_numbers(df[date_column])
+
+
+def attribute(df, calendar, date_column, attribute):
+    return take(calendar, day_positions(calendar, days(df, date_column)), attribute)
+
+
+def date_attribute(df, date_column, attribute):
+    # Calendar attribute of a date column, with a calendar covering its days
+    return day_attribute(days(df, date_column), attribute)
+
+
+def day_attribute(values, attribute):
+    # Calendar attribute of day numbers, with a calendar covering them
+    values = np.asarray(values)
+    valid = values[values != MISSING_DAY]
+    if len(valid):
+        cal = calendar(EPOCH + int(valid.min()), EPOCH + int(valid.max()))
+    else:
+        today = pd.Timestamp.today()
+        cal = calendar(today, today)
+    return take(cal, day_positions(cal, values), attribute)
+
+
+def fy_label(fy):
+    # 2023 -> "2023-24"
+    fy = pd.Series(fy, dtype="Int32")
+    return (fy.astype(str) + "-" + ((fy + 1) % 100).astype(str).str.zfill(2)).where(fy.notna())
+
+
+def fy_quarter_label(key):
+    # 20231 -> "2023-24 Q1"
+    key = pd.Series(key, dtype="Int32")
+    return (fy_label(key // 10) + " Q" + (key % 10).astype(str)).where(key.notna())
+
+
+def working_days_between(calendar, start, end):
+    # Working days after start up to and including end; NaN if either is missing
+    a, b = offsets(calendar, start), offsets(calendar, end)
+    idx = calendar["working_index"].to_numpy()
+    out = (idx[np.clip(b, 0, None)] - idx[np.clip(a, 0, None)]).astype(np.float64)
+    out[(a < 0) | (b < 0)] = np.nan
+    return out
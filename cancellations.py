@@ -0,0 +1,83 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+
+
+# Cancelled-bill history.
+# At load the cancelled bills are sorted newest first on CANCELDATE and kept
+# as an array of row positions with their day numbers. "Latest N" reads that
+# array from the top until N bills pass the filter, and a date range is two
+# binary searches, so neither touches the uncancelled bills. Counts and
+# amounts per department and per cancelling user are aggregated at the same
+# time.
+
+DATE = "CANCELDATE"
+BY = "CANCELEDBY"
+VALUE = "BILLVALUE"
+DIMS = ["DEPARTMENT", BY]
+
+
+def build(df, date=DATE, value=VALUE, dims=DIMS):
+    days = pd.to_datetime(df[date], errors="coerce").to_numpy().astype("datetime64[D]") if date in df.columns \
+        else np.full(len(df), np.datetime64("NaT"), dtype="datetime64[D]")
+    cancelled = np.flatnonzero(~np.isnat(days))
+    # Newest first; ties keep load order
+    order = cancelled[np.argsort(-days[cancelled].astype(np.int64), kind="stable")]
+
+    amounts = pd.to_numeric(df[value], errors="coerce") if value in df.columns else pd.Series(0.0, index=df.index)
+    rows = pd.DataFrame({"value": amounts.to_numpy()[order]})
+    totals = {}
+    for dim in dims:
+        if dim in df.columns:
+            rows[dim] = df[dim].to_numpy()[order]
+            totals[dim] = rows.groupby(dim, observed=True)["value"].agg(Cancelled="size", Amount="sum") \
+                .sort_values("Cancelled", ascending=False)
+
+    return {"order": order, "days": days[order].astype(np.int64), "totals": totals}
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached(_df, version, date, value, dims):
+    return build(_df, date, value, list(dims))
+
+
+def index(df, date=DATE, value=VALUE, dims=DIMS):
+    # Cancellation index for the full dataset, built once per version
+    version = versions.dataset_version(df)
+    if version is None:
+        return build(df, date, value, dims)
+    return _cached(df, version, date, value, tuple(dims))
+
+
+def latest(idx, n=10, mask=None, chunk=256):
+    # Row positions of the newest n cancellations whose mask (boolean array
+    # over df rows) is set; scans the sorted index in growing chunks
+    order = idx["order"]
+    if mask is None:
+        return order[:n]
+    found = []
+    start = 0
+    while start < len(order) and sum(len(f) for f in found) < n:
+        block = order[start:start + chunk]
+        found.append(block[mask[block]])
+        start += chunk
+        chunk *= 2
+    return np.concatenate(found)[:n] if found else order[:0]
+
+
+def between(idx, start, end):
+    # Row positions cancelled between start and end (inclusive), newest first
+    days = idx["days"]
+    lo = np.datetime64(pd.Timestamp(start), "D").astype(np.int64)
+    hi = np.datetime64(pd.Timestamp(end), "D").astype(np.int64)
+    # days are descending: search on the negated values
+    first = np.searchsorted(-days, -hi, side="left")
+    last = np.searchsorted(-days, -lo, side="right")
+    return idx["order"][first:last]
+
+
+def totals(idx, dim):
+    # Cancelled count and amount per department / user, precomputed at load
+    return idx["totals"].get(dim, pd.DataFrame(columns=["Cancelled", "Amount"]))
@@ -0,0 +1,166 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+import data_service
+
+
+# Incremental extraction from the bills workflow database.
+# Instead of a manual daily dump, sync() asks the database only for bills
+# received or acted on since the last watermark (the day of the latest
+# RECVDATE / ACTIONDATE already stored; that day is read again, so bills
+# added to it later are not missed), in chunks, over a small connection
+# pool, and upserts them by TRACKINGNO into a Parquet store. data_service reads that
+# store like a dump: point BILLS_DUMP at it and every sync shows up as a new
+# dataset version.
+#
+#   python connector.py SOURCE.db STORE.parquet [--every MINUTES]
+#
+# SQLite is built in; any other DB-API driver works through Pool(connect=...)
+# as long as it takes "?" parameters (or set PARAM).
+
+TABLE = os.environ.get("BILLS_TABLE", "BILLS")
+KEY = "TRACKINGNO"
+WATERMARKS = ["ACTIONDATE", "RECVDATE"]
+CHUNK_ROWS = 50_000
+PARAM = "?"
+
+
+class Pool:
+    # Fixed-size pool of DB-API connections, opened lazily and reused
+    def __init__(self, connect, size=4):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            done = False
+            try:
+                yield conn
+                done = True
+            finally:
+                # Back to the pool only after a clean exit; on any exception,
+                # including GeneratorExit from an abandoned extract(), closed
+                if done:
+                    self._idle.put(conn)
+                else:
+                    conn.close()
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def sqlite_pool(path, size=4):
+    return Pool(lambda: sqlite3.connect(path, check_same_thread=False), size)
+
+
+def _state_path(store):
+    return store + ".state.json"
+
+
+def load_state(store):
+    # {"watermark": ISO date or None, "synced_at": ..., "rows": ...}
+    try:
+        with open(_state_path(store)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"watermark": None}
+
+
+def watermark(value):
+    # ISO date of a watermark (older states stored a full timestamp)
+    return pd.Timestamp(value).date().isoformat()
+
+
+def extract(pool, since=None, table=TABLE, chunk_rows=CHUNK_ROWS):
+    # Chunks of bills changed on or after the day of `since` (all bills when
+    # None). The watermark is bound as a plain date, the source's own format:
+    # a date-only TEXT column compares as a string, and "2024-01-02" sorts
+    # before "2024-01-02 00:00:00", which would skip later bills of that day
+    sql = f"SELECT * FROM {table}"
+    params = []
+    if since is not None:
+        sql += " WHERE " + " OR ".join(f"{col} >= {PARAM}" for col in WATERMARKS)
+        params = [watermark(since)] * len(WATERMARKS)
+    with pool.connection() as conn:
+        for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_rows):
+            yield chunk
+
+
+def _same(stored, fetched):
+    if len(stored) != len(fetched) or list(stored.columns) != list(fetched.columns):
+        return False
+    stored = stored.sort_values(KEY).reset_index(drop=True)
+    fetched = fetched.sort_values(KEY).reset_index(drop=True)
+    try:
+        return stored.equals(fetched.astype(stored.dtypes.to_dict()))
+    except (TypeError, ValueError):
+        return False
+
+
+def sync(pool, store, table=TABLE, chunk_rows=CHUNK_ROWS):
+    # Pull changes since the stored watermark into the Parquet store; returns
+    # the number of changed rows
+    state = load_state(store)
+    changed = [data_service.canonical(c) for c in extract(pool, state["watermark"], table, chunk_rows)]
+    changed = [c for c in changed if len(c)]
+    if not changed:
+        return 0
+    changed = pd.concat(changed, ignore_index=True).drop_duplicates(KEY, keep="last")
+
+    if state["watermark"] is not None and os.path.exists(store):
+        current = pd.read_parquet(store)
+        stored = current[KEY].isin(changed[KEY])
+        # Rows sharing the watermark come back every time; nothing new, no new version
+        if _same(current[stored], changed):
+            return 0
+        bills = pd.concat([current[~stored], changed], ignore_index=True)
+    else:
+        bills = changed
+
+    marks = [pd.to_datetime(changed[col], errors="coerce").max() for col in WATERMARKS if col in changed.columns]
+    marks = [m for m in marks if pd.notna(m)]
+
+    # Write next to the store and rename, so readers never see half a file
+    tmp = store + ".tmp"
+    bills.to_parquet(tmp, index=False)
+    os.replace(tmp, store)
+    state = {
+        "watermark": watermark(max(marks)) if marks else state["watermark"],
+        "synced_at": pd.Timestamp.now().isoformat(sep=" ", timespec="seconds"),
+        "rows": int(len(bills)),
+        "changed": int(len(changed)),
+    }
+    with open(_state_path(store), "w") as f:
+        json.dump(state, f)
+    return len(changed)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sync bills from the workflow database into a Parquet store")
+    parser.add_argument("source", help="SQLite database file")
+    parser.add_argument("store", help="Parquet file to keep up to date (use it as BILLS_DUMP)")
+    parser.add_argument("--every", type=float, help="repeat every N minutes")
+    args = parser.parse_args()
+
+    pool = sqlite_pool(args.source)
+    while True:
+        print(f"{pd.Timestamp.now():%Y-%m-%d %H:%M:%S} synced {sync(pool, args.store):,} changed bills")
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
@@ -1,52 +1,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
+import grid
+import fmt
+import figures
+import binning
+import topn
+import stages
+import access
+import data_service
+import rollups
+import sla
+import duplicates
+import reconcile
 
 # Set up the page
 st.set_page_config(layout="wide", page_title="Invoice Processing Dashboard")
 st.title("Invoice Processing Workflow Analysis")
 
-# Load data function (replace with your actual data loading)
-@st.cache_data
-def load_data():
-    # In a real app, you would load your data here
-    # For demo purposes, we'll create a dummy dataframe
-    data = {
-        "TRACKINGNO": [f"TRK{1000+i}" for i in range(100)],
-        "DOCUMENT_ID": [f"DOC{2000+i}" for i in range(100)],
-        "RECVDATE": pd.date_range(start="2023-01-01", periods=100, freq="D"),
-        "VENDORID": [f"V{3000+i}" for i in range(100)],
-        "VENDORNAME": [f"Vendor {i}" for i in range(100)],
-        "MSME_VENDOR": np.random.choice(["Yes", "No"], 100),
-        "BILLTYPECODE": np.random.choice(["A", "B", "C"], 100),
-        "BILLTYPE": np.random.choice(["Type1", "Type2", "Type3"], 100),
-        "UNIT_ID": np.random.choice(["Unit1", "Unit2", "Unit3"], 100),
-        "BILLNO": [f"BL{4000+i}" for i in range(100)],
-        "BILLDATE": pd.date_range(start="2023-01-01", periods=100, freq="D"),
-        "INITIATOR": [f"User{i}" for i in range(100)],
-        "PONO": [f"PO{5000+i}" for i in range(100)],
-        "BILLVALUE": np.random.uniform(1000, 50000, 100).round(2),
-        "STATUS": np.random.choice(["Approved", "Pending", "Rejected", "Hold"], 100),
-        "ACTIONBY": [f"Approver{i}" for i in range(100)],
-        "REMARK": np.random.choice(["", "Urgent", "Review needed", "Complete"], 100),
-        "GRNNO": [f"GRN{6000+i}" for i in range(100)],
-        "GRNDATE": pd.date_range(start="2023-01-05", periods=100, freq="D"),
-        "DEPARTMENT": np.random.choice(["Finance", "HR", "IT", "Operations"], 100),
-        "CATEGORY": np.random.choice(["Category1", "Category2", "Category3"], 100),
-        "DAYS_Vendor_to_BD": np.random.randint(1, 10, 100),
-        "DAYS_BD_to_SPOC": np.random.randint(1, 5, 100),
-        "DAYS_SPOC_to_User": np.random.randint(1, 7, 100),
-        "TOTAL_DAYS_to_BD": np.random.randint(1, 15, 100),
-        "TOTAL_DAYS_to_SPOC": np.random.randint(5, 20, 100),
-        "TOTAL_DAYS_to_User": np.random.randint(10, 30, 100),
-        "TOTAL_DAYS_for_PAYMENT": np.random.randint(15, 60, 100)
-    }
-    return pd.DataFrame(data)
-
-df = load_data()
+# Bills shared by every page (loaded once per process), restricted to what the user may see
+df = access.bills()
 
 # Sidebar filters
 st.sidebar.header("Filters")
@@ -76,13 +50,22 @@ filtered_df = df[
     (df["BILLTYPE"].isin(bill_type_filter))
 ]
 
+# Histogram/box-plot summaries are read from per-cell bins built once per dataset
+selected_cells = {
+    "DEPARTMENT": department_filter,
+    "STATUS": status_filter,
+    "MSME_VENDOR": selected_msme,
+    "BILLTYPE": bill_type_filter,
+}
+
 # Main dashboard (rest of your code remains the same)
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
     "Overview", 
     "Timeline Analysis", 
     "Vendor Analysis", 
     "Department View", 
-    "Detailed Records"
+    "Detailed Records",
+    "PO View"
 ])
 
 with tab1:
@@ -96,65 +79,63 @@ with tab1:
         st.metric("Avg Processing Time (days)", round(avg_processing_time, 1))
     with col3:
         total_value = filtered_df["BILLVALUE"].sum()
-        st.metric("Total Bill Value", f"${total_value:,.2f}")
+        st.metric("Total Bill Value", fmt.inr(total_value))
     
     # Status distribution
     st.subheader("Status Distribution")
-    fig, ax = plt.subplots()
-    filtered_df["STATUS"].value_counts().plot(kind="bar", ax=ax)
-    st.pyplot(fig)
+    status_counts = filtered_df["STATUS"].value_counts()
+    figures.show(figures.bar(status_counts.index, status_counts.values, hover="%{y:,}"), key="status_counts")
     
     # Bill value distribution
     st.subheader("Bill Value Distribution")
-    fig, ax = plt.subplots()
-    sns.histplot(filtered_df["BILLVALUE"], bins=20, ax=ax)
-    st.pyplot(fig)
+    counts, edges = binning.histogram(binning.cube(df, "BILLVALUE"), selected_cells, bins=20)
+    figures.show(figures.histogram(counts, edges, x_title="BILLVALUE"), key="bill_value_histogram")
 
 with tab2:
     st.header("Timeline Analysis")
     
     # Processing time by stage
     st.subheader("Average Days by Processing Stage")
-    timeline_data = filtered_df[[
-        "DAYS_Vendor_to_BD", "DAYS_BD_to_SPOC", "DAYS_SPOC_to_User",
-        "TOTAL_DAYS_to_BD", "TOTAL_DAYS_to_SPOC", "TOTAL_DAYS_to_User"
-    ]].mean().reset_index()
+    stage_days = stages.durations(df).loc[filtered_df.index]
+    timeline_data = stages.stage_means(stage_days).reset_index()
     timeline_data.columns = ["Stage", "Average Days"]
     
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.barplot(data=timeline_data, x="Stage", y="Average Days", ax=ax)
-    plt.xticks(rotation=45)
-    st.pyplot(fig)
+    figures.show(figures.bar(timeline_data["Stage"], timeline_data["Average Days"],
+                             x_title="Stage", y_title="Average Days", height=500, tickangle=-45), key="stage_timeline")
+    
+    # Stage percentiles by department / vendor
+    breakdown = st.selectbox("Stage percentiles by", ["DEPARTMENT", "VENDORNAME", "BILLTYPE"], key="stage_breakdown")
+    stage_pct = stages.percentiles(stage_days, filtered_df[breakdown], qs=(0.5, 0.9))
+    stage_pct.index = stage_pct.index.set_names([breakdown, "Percentile"])
+    st.dataframe(stage_pct.rename(index={0.5: "p50", 0.9: "p90"}, level="Percentile").round(1),
+                 use_container_width=True)
     
     # Time trends
     st.subheader("Processing Time Trends")
-    time_data = filtered_df.groupby(filtered_df["RECVDATE"].dt.to_period("M"))["TOTAL_DAYS_for_PAYMENT"].mean().reset_index()
-    time_data["RECVDATE"] = time_data["RECVDATE"].astype(str)
+    time_data = rollups.trend(rollups.rollup(df, "RECVDATE", "month"), selected_cells)
+    time_data["RECVDATE"] = time_data["bucket"].dt.strftime("%Y-%m")
     
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.lineplot(data=time_data, x="RECVDATE", y="TOTAL_DAYS_for_PAYMENT", ax=ax)
-    plt.xticks(rotation=45)
-    st.pyplot(fig)
+    figures.show(figures.line(time_data["RECVDATE"], time_data["avg_days"],
+                              x_title="RECVDATE", y_title="TOTAL_DAYS_for_PAYMENT", height=500, tickangle=-45),
+                 key="processing_trend")
 
 with tab3:
     st.header("Vendor Analysis")
     
     # Top vendors by bill count
     st.subheader("Top Vendors by Invoice Count")
-    top_vendors_count = filtered_df["VENDORNAME"].value_counts().head(10).reset_index()
-    top_vendors_count.columns = ["Vendor", "Count"]
+    vendor_index = topn.index(df)
+    top_vendors_count = topn.top(vendor_index, selected_cells, n=10, by="count")
     
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.barplot(data=top_vendors_count, x="Count", y="Vendor", ax=ax)
-    st.pyplot(fig)
+    figures.show(figures.bar(top_vendors_count.index, top_vendors_count.values,
+                             orientation="h", x_title="Count", height=500, hover="%{y:,}"), key="top_vendors_count")
     
     # Top vendors by bill value
     st.subheader("Top Vendors by Bill Value")
-    top_vendors_value = filtered_df.groupby("VENDORNAME")["BILLVALUE"].sum().nlargest(10).reset_index()
+    top_vendors_value = topn.top(vendor_index, selected_cells, n=10, by="value")
     
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.barplot(data=top_vendors_value, x="BILLVALUE", y="VENDORNAME", ax=ax)
-    st.pyplot(fig)
+    figures.show(figures.bar(top_vendors_value.index, top_vendors_value.values,
+                             orientation="h", x_title="BILLVALUE", height=500), key="top_vendors_value")
     
     # MSME vs non-MSME comparison
     st.subheader("MSME vs Non-MSME Comparison")
@@ -162,15 +143,36 @@ with tab3:
     with col1:
         st.write("Average Processing Time")
         msme_time = filtered_df.groupby("MSME_VENDOR")["TOTAL_DAYS_for_PAYMENT"].mean().reset_index()
-        fig, ax = plt.subplots()
-        sns.barplot(data=msme_time, x="MSME_VENDOR", y="TOTAL_DAYS_for_PAYMENT", ax=ax)
-        st.pyplot(fig)
+        figures.show(figures.bar(msme_time["MSME_VENDOR"], msme_time["TOTAL_DAYS_for_PAYMENT"],
+                                 x_title="MSME_VENDOR", y_title="TOTAL_DAYS_for_PAYMENT"), key="msme_days")
     with col2:
         st.write("Average Bill Value")
         msme_value = filtered_df.groupby("MSME_VENDOR")["BILLVALUE"].mean().reset_index()
-        fig, ax = plt.subplots()
-        sns.barplot(data=msme_value, x="MSME_VENDOR", y="BILLVALUE", ax=ax)
-        st.pyplot(fig)
+        figures.show(figures.bar(msme_value["MSME_VENDOR"], msme_value["BILLVALUE"],
+                                 x_title="MSME_VENDOR", y_title="BILLVALUE"), key="msme_value")
+
+    # MSME payment compliance, read from the maintained SLA counts; with
+    # filters set, counted over the filtered bills like the rest of the page
+    st.subheader("MSME 45-Day Payment Compliance")
+    sla_state = sla.current(df)
+    if len(filtered_df) < len(df):
+        sla_state = sla.restrict(sla_state, filtered_df)
+    msme_sla = sla.breach_table(sla_state, by="DEPARTMENT", groups=department_filter, rule="MSME 45 days")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Breaching", fmt.count(msme_sla["Breaching"].sum()),
+                  help="Open MSME bills past their 45-day due date")
+    with col2:
+        st.metric("At Risk", fmt.count(msme_sla["At risk"].sum()),
+                  help=f"Open MSME bills due within {sla.AT_RISK_DAYS} days")
+    with col3:
+        st.metric("Paid Late", fmt.count(msme_sla["Paid late"].sum()))
+    st.dataframe(fmt.format_frame(msme_sla[sla.STATUSES], {c: fmt.count for c in sla.STATUSES}),
+                 use_container_width=True)
+    overdue = sla.at_risk(sla_state, n=20, groups=department_filter, rule="MSME 45 days")
+    st.dataframe(fmt.format_frame(overdue, {"value": fmt.inr, "Due": fmt.dates, "Days Overdue": fmt.days,
+                                             "Days Left": fmt.days}),
+                 use_container_width=True)
 
 with tab4:
     st.header("Department View")
@@ -182,25 +184,24 @@ with tab4:
         "TOTAL_DAYS_for_PAYMENT": "mean"
     }).reset_index()
     dept_metrics.columns = ["Department", "Invoice Count", "Total Value", "Avg Bill Value", "Avg Processing Time"]
-    st.dataframe(dept_metrics.style.format({
-        "Total Value": "${:,.2f}",
-        "Avg Bill Value": "${:,.2f}",
-        "Avg Processing Time": "{:.1f} days"
+    st.dataframe(fmt.format_frame(dept_metrics, {
+        "Total Value": fmt.inr,
+        "Avg Bill Value": fmt.inr,
+        "Avg Processing Time": fmt.days
     }))
     
     # Department comparison charts
     col1, col2 = st.columns(2)
     with col1:
         st.write("Invoice Count by Department")
-        fig, ax = plt.subplots()
-        filtered_df["DEPARTMENT"].value_counts().plot(kind="bar", ax=ax)
-       #st.pyplot(fig)
+        dept_counts = filtered_df["DEPARTMENT"].value_counts()
+        figures.show(figures.bar(dept_counts.index, dept_counts.values, hover="%{y:,}"), key="department_counts")
     with col2:
         st.write("Processing Time by Department")
-        fig, ax = plt.subplots()
-        sns.boxplot(data=filtered_df, x="DEPARTMENT", y="TOTAL_DAYS_for_PAYMENT", ax=ax)
-        plt.xticks(rotation=45)
-        #st.pyplot(fig)
+        dept_box = binning.box_by(binning.cube(df, "TOTAL_DAYS_for_PAYMENT"), selected_cells, "DEPARTMENT")
+        figures.show(figures.box(dept_box["DEPARTMENT"], dept_box["q1"], dept_box["median"], dept_box["q3"],
+                                 dept_box["min"], dept_box["max"], y_title="TOTAL_DAYS_for_PAYMENT", tickangle=-45),
+                     key="department_days")
 
 with tab5:
     st.header("Detailed Records")
@@ -209,17 +210,43 @@ with tab5:
     st.subheader("Invoice Details")
     columns_to_show = st.multiselect(
         "Select columns to display",
-        options=filtered_df.columns,
+        options=data_service.source_columns(filtered_df),
         default=[
             "TRACKINGNO", "VENDORNAME", "DEPARTMENT", "BILLTYPE", 
             "BILLVALUE", "STATUS", "TOTAL_DAYS_for_PAYMENT"
         ]
     )
     
-    st.dataframe(filtered_df[columns_to_show])
+    grid.render_grid(
+        filtered_df,
+        key="records",
+        columns=columns_to_show,
+        formats={
+            "BILLVALUE": fmt.inr,
+            "RECVDATE": fmt.dates,
+            "BILLDATE": fmt.dates,
+            "GRNDATE": fmt.dates,
+        },
+        search_columns=["TRACKINGNO", "VENDORNAME", "DEPARTMENT", "BILLNO", "PONO"],
+        default_sort="BILLVALUE",
+    )
     
+    # Probable duplicates / unusual amounts among the filtered bills
+    with st.expander("Probable duplicates and unusual amounts"):
+        suspects = duplicates.flagged(duplicates.flags(df))
+        suspects = suspects[suspects.index.isin(filtered_df.index)]
+        if suspects.empty:
+            st.info("No probable duplicate or unusual bills in the selection.")
+        else:
+            grid.render_grid(
+                filtered_df.loc[suspects.index, ["TRACKINGNO", "VENDORNAME", "BILLNO", "BILLDATE", "BILLVALUE"]]
+                .assign(Reason=suspects["REASON"]),
+                key="suspects",
+                formats={"BILLVALUE": fmt.inr, "BILLDATE": fmt.dates},
+            )
+
     # Download option
-    csv = filtered_df.to_csv(index=False).encode('utf-8')
+    csv = filtered_df[data_service.source_columns(filtered_df)].to_csv(index=False).encode('utf-8')
     st.download_button(
         "Download Filtered Data",
         csv,
@@ -228,6 +255,44 @@ with tab5:
         key='download-csv'
     )
 
+with tab6:
+    st.header("PO and GRN/SRN Reconciliation")
+
+    po_index = reconcile.index(df)
+    po_table = reconcile.po_summary(po_index, df, rows=filtered_df.index)
+    receipts = po_index["bills"].loc[filtered_df.index]
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Purchase Orders", fmt.count(len(po_table)))
+    with col2:
+        st.metric("Bills without GRN/SRN", fmt.count(int(receipts["MISSING_RECEIPT"].sum())))
+    with col3:
+        st.metric("Median GRN/SRN to Bill", fmt.days(receipts["RECEIPT_TO_BILL_DAYS"].median()))
+
+    grid.render_grid(
+        po_table,
+        key="po_summary",
+        formats={"Billed Value": fmt.inr, "PO Value": fmt.inr, "Avg Receipt-to-Bill Days": fmt.days},
+        search_columns=["PONO"],
+        default_sort="Billed Value",
+        ascending=False,
+    )
+
+    # Bills of one PO in bill-date order with the running billed value
+    selected_po = st.selectbox("Bills of PO", po_table["PONO"], key="po_select")
+    if selected_po is not None:
+        positions = reconcile.po_bills(po_index, selected_po)
+        po_rows = df.iloc[positions]
+        po_rows = po_rows[po_rows.index.isin(filtered_df.index)]
+        grid.render_grid(
+            po_rows[["TRACKINGNO", "VENDORNAME", "BILLNO", "BILLDATE", "BILLVALUE", "GRNNO", "SRNNO"]]
+            .join(po_index["bills"][["CUM_BILLED", "RECEIPT_TO_BILL_DAYS"]]),
+            key="po_bills",
+            formats={"BILLVALUE": fmt.inr, "CUM_BILLED": fmt.inr, "BILLDATE": fmt.dates,
+                     "RECEIPT_TO_BILL_DAYS": fmt.days},
+        )
+
 # Add some styling
 st.markdown("""
 <style>
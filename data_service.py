@@ -0,0 +1,206 @@
+import os
+import threading
+import streamlit as st
+import pandas as pd
+import numpy as np
+import sample_data
+import stages
+import calendar_dim
+import versions
+
+
+# One dataset for every dashboard page.
+# Bills come from the workflow dump at BILLS_DUMP (a pickle of the export, or
+# the Parquet store connector.py keeps in sync with the database) or,
+# when there is none, from the demo generator. Either way they are brought to
+# the canonical schema (the README column names, datetime date columns) once
+# per process and the same frame is handed to every page and session, so the
+# per-version indexes built on it (stages, bottlenecks, rollups, ...) are also
+# built once. Pages must not modify it in place: derive with assign/rename,
+# which share the underlying columns instead of copying them.
+#
+# Every load gets the next version number, and every partition (financial
+# year of RECVDATE x DEPARTMENT) a change stamp: the version in which its rows
+# last changed, found by comparing per-partition row hashes with the previous
+# load. Caches of results that only read some partitions key on
+# depends(df, ...) instead of the version, so a refresh that only touches the
+# current FY leaves the historical-FY results valid.
+
+DUMP_ENV = "BILLS_DUMP"
+DEFAULT_DUMP = r"E:\internship work\Bill Analytics\DUMP_FE_OVERVIEW.pkl"
+# Fraction of the dump to load, for quick looks at a very large export
+FRACTION_ENV = "BILLS_SAMPLE_FRACTION"
+
+# Names used by older exports and pages -> canonical column
+ALIASES = {
+    "Vendor ID": "VENDORID",
+    "Vendor Name": "VENDORNAME",
+    "Department": "DEPARTMENT",
+    "Bill No": "BILLNO",
+    "Bill Date": "BILLDATE",
+    "Bill_Value": "BILLVALUE",
+    "Bill Value": "BILLVALUE",
+    "Submission Date": "RECVDATE",
+    "Status": "STATUS",
+}
+
+DATE_COLUMNS = [col for col, _ in stages.PIPELINE] + [
+    "BILLDATE", "GRNDATE", "SRNDATE", "ACTIONDATE", "CANCELDATE",
+    "TAXATION_HOLD_DATE", "INVOICE_HOLD_DATE", "PAYMENT_HOLD_DATE",
+]
+
+# Date columns joined to the calendar dimension (<DATE>_DAY day numbers):
+# all of them, so stage durations, FY partitions and FY rollups read integers
+CALENDAR_COLUMNS = DATE_COLUMNS
+
+# Change tracking partitions: FY of this date x this column
+PARTITION_DATE = "RECVDATE"
+PARTITION_DIM = "DEPARTMENT"
+# Versions whose partition stamps are kept
+KEEP_VERSIONS = 8
+
+
+def canonical(df):
+    df = df.rename(columns={k: v for k, v in ALIASES.items() if k in df.columns and v not in df.columns})
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    if "TOTAL_DAYS_for_PAYMENT" not in df.columns and {"RECVDATE", "PAYMENT_DONE"} <= set(df.columns):
+        df["TOTAL_DAYS_for_PAYMENT"] = (df["PAYMENT_DONE"] - df["RECVDATE"]).dt.days
+    return df
+
+
+def source():
+    # (dump path, its mtime or None when there is no dump)
+    path = os.environ.get(DUMP_ENV, DEFAULT_DUMP)
+    return path, os.path.getmtime(path) if os.path.exists(path) else None
+
+
+# The current load and the one being replaced
+@st.cache_resource(show_spinner="Loading bills...", max_entries=2)
+def _load(path, mtime, fraction):
+    if mtime is None:
+        df = sample_data.generate()
+    else:
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+        if fraction < 1:
+            df = df.sample(frac=fraction, random_state=42)
+    df = canonical(df)
+    calendar_dim.join(df, CALENDAR_COLUMNS)
+    # Version stamp for the per-dataset caches: the next number on every load
+    df.attrs["version"] = _record(df)
+    # Indexes of older versions are not needed any more
+    versions.drop_versions(df.attrs["version"])
+    return df
+
+
+def bills():
+    # The shared canonical bills frame
+    path, mtime = source()
+    return _load(path, mtime, float(os.environ.get(FRACTION_ENV, "1")))
+
+
+def calendar(df):
+    # Calendar dimension covering the bills' dates
+    return calendar_dim.for_frame(df, CALENDAR_COLUMNS)
+
+
+def source_columns(df):
+    # The bill columns without the joined <DATE>_DAY day numbers, for column
+    # pickers and exports
+    return [col for col in df.columns if not col.endswith(calendar_dim.DAY_SUFFIX)]
+
+
+def view(df, names):
+    # The frame under page-specific column names; a rename shares the data
+    return df.rename(columns=names)
+
+
+@st.cache_resource(show_spinner=False)
+def _history():
+    # Process-wide load history: last version, last partition hashes, and the
+    # partition stamps of recent versions
+    return {"lock": threading.Lock(), "version": 0, "hashes": {}, "stamps": {}}
+
+
+def partition_ids(df):
+    # (financial year or -1, department) of every row
+    fy = calendar_dim.date_attribute(df, PARTITION_DATE, "fy")
+    fy = pd.Series(fy).fillna(-1).astype(int).to_numpy()
+    dim = df[PARTITION_DIM].astype(str).where(df[PARTITION_DIM].notna(), "").to_numpy()
+    return fy, dim
+
+
+def _partition_hashes(df):
+    # {(fy, department): (rows, order-independent sum of row hashes)}; the
+    # day numbers are derived from the dates, so they are left out
+    content = df[source_columns(df)]
+    hashes = pd.util.hash_pandas_object(content, index=False).to_numpy()
+    fy, dim = partition_ids(df)
+    grouped = pd.DataFrame({"fy": fy, "dim": dim, "hash": hashes}).groupby(["fy", "dim"])["hash"]
+    counts, sums = grouped.size(), grouped.sum()
+    return {key: (int(counts[key]), int(sums[key])) for key in counts.index}
+
+
+def _record(df):
+    hashes = _partition_hashes(df)
+    history = _history()
+    with history["lock"]:
+        history["version"] += 1
+        version = history["version"]
+        previous = history["stamps"].get(history.get("last"), {})
+        stamps = {}
+        for key, digest in hashes.items():
+            same = history["hashes"].get(key) == digest and key in previous
+            stamps[key] = previous[key] if same else version
+        history["hashes"] = hashes
+        history["stamps"][version] = stamps
+        history["last"] = version
+        for old in sorted(history["stamps"])[:-KEEP_VERSIONS]:
+            del history["stamps"][old]
+    return version
+
+
+def stamps(df):
+    # {(fy, department): change stamp} of the load df is (a slice of)
+    version = df.attrs.get("parent", versions.dataset_version(df))
+    return _history()["stamps"].get(version, {})
+
+
+def depends(df, departments=None, fy_from=None, fy_to=None):
+    # Cache key for a result reading only the given departments' bills
+    # received in financial years fy_from..fy_to (None: no bound): the
+    # partitions involved and their stamps. Unchanged partitions keep their
+    # stamps, so the key survives refreshes that touch other partitions.
+    partitions = stamps(df)
+    if not partitions:
+        return versions.dataset_version(df)
+    departments = None if departments is None else set(map(str, departments))
+    used = tuple(sorted(
+        (key, stamp) for key, stamp in partitions.items()
+        if (departments is None or key[1] in departments)
+        and (fy_from is None or key[0] >= fy_from) and (fy_to is None or key[0] <= fy_to)
+    ))
+    return (df.attrs.get("grant"), used)
+
+
+def partition_rows(df):
+    # {(fy, department): row positions}, once per version
+    version = versions.dataset_version(df)
+    if version is None:
+        return _build_partition_rows(df)
+    return _partition_rows_cached(df, version)
+
+
+def _build_partition_rows(df):
+    fy, dim = partition_ids(df)
+    codes, keys = pd.factorize(pd.MultiIndex.from_arrays([fy, dim]))
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+    return {keys[i]: order[bounds[i]:bounds[i + 1]] for i in range(len(keys))}
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _partition_rows_cached(_df, version):
+    return _build_partition_rows(_df)
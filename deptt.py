@@ -1,9 +1,19 @@
+import time
 import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import plotly.express as px
 import f
+import fmt
+import figures
+import access
+import queries
+import singleflight
+import precompute
+import telemetry
+
+# Seconds an aggregate is reused for other sessions with the same filters
+SHARED_TTL = 30
 
 # Set page config
 st.set_page_config(
@@ -13,54 +23,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Fixed data loading function
-@st.cache_data
-def load_data():
-    np.random.seed(42)
-    num_rows = 50
-    
-    # Define possible values
-    departments = ['Finance', 'HR', 'IT', 'Operations', 'Marketing', 'Logistics']
-    vendors = [f'Vendor {chr(i)}' for i in range(65, 91)]  # A-Z
-    bill_types = ['Goods', 'Services', 'Consulting', 'Maintenance']
-    statuses = ['Paid', 'Pending', 'Processed']
-    
-    # Generate base data
-    data = {
-        'TRACKINGNO': [f'TR{str(i).zfill(3)}' for i in range(1, num_rows+1)],
-        'DOCUMENT_ID': [f'DOC{str(i).zfill(3)}' for i in range(1, num_rows+1)],
-        'BILLNO': [f'BL{str(i).zfill(3)}' for i in range(1, num_rows+1)],
-        'VENDORNAME': np.random.choice(vendors, num_rows),
-        'DEPARTMENT': np.random.choice(departments, num_rows),
-        'BILLVALUE': np.random.randint(5000, 50000, num_rows),
-        'TOTAL_DAYS_for_PAYMENT': np.random.randint(5, 30, num_rows),
-        'MSME_VENDOR': np.random.choice(['Yes', 'No'], num_rows, p=[0.6, 0.4]),
-        'BILLTYPE': np.random.choice(bill_types, num_rows),
-        'STATUS': np.random.choice(statuses, num_rows)
-    }
-    
-    # Generate bill dates (as datetime objects)
-    base_date = datetime(2023, 1, 1)
-    data['BILLDATE'] = [base_date + timedelta(days=np.random.randint(0, 365)) for _ in range(num_rows)]
-    
-    # Calculate payment dates by adding payment days to bill dates
-    data['PAYMENT_DONE'] = [
-        data['BILLDATE'][i] + timedelta(days=int(data['TOTAL_DAYS_for_PAYMENT'][i]))
-        for i in range(num_rows)
-    ]
-    
-    # Create DataFrame
-    df = pd.DataFrame(data)
-    
-    # Ensure datetime columns have proper type
-    df['BILLDATE'] = pd.to_datetime(df['BILLDATE'])
-    df['PAYMENT_DONE'] = pd.to_datetime(df['PAYMENT_DONE'])
-    
-    return df
-
 # Load the data
 try:
-    df = load_data()
+    df = access.bills()
     st.success("Data loaded successfully!")
 except Exception as e:
     st.error(f"Error loading data: {str(e)}")
@@ -82,19 +47,29 @@ bill_type_filter = st.sidebar.multiselect(
 )
 
 # Apply global filters
-filtered_df = df.copy()
+filters = {
+    "msme": msme_filter,
+    "bill_types": bill_type_filter,
+}
 if len(date_range) == 2:
-    start_date, end_date = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-    filtered_df = filtered_df[
-        (filtered_df['PAYMENT_DONE'] >= start_date) & 
-        (filtered_df['PAYMENT_DONE'] <= end_date)
-    ]
+    filters["paid_from"], filters["paid_to"] = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+filtered_df = queries.filter_rows(df, filters)
+
 
-if msme_filter != 'All':
-    filtered_df = filtered_df[filtered_df['MSME_VENDOR'] == msme_filter]
+grant_key = access.grant_key(access.grant(access.current_user()))
+
+
+def shared(name, compute, *args, scope=None):
+    # Sessions asking for the same aggregate at the same time share one
+    # computation; landing views are usually precomputed under the same key
+    started = time.perf_counter()
+    result = singleflight.do(precompute.key(df, name, filters, *args, scope=scope), compute, ttl=SHARED_TTL)
+    # Department aggregates take the department as their first argument
+    telemetry.record("deptt", name, queries.filter_key(filters), ms=(time.perf_counter() - started) * 1000,
+                     rows=len(filtered_df), result_rows=telemetry.result_rows(result),
+                     department=args[0] if args else None, grant_key=grant_key)
+    return result
 
-if bill_type_filter:
-    filtered_df = filtered_df[filtered_df['BILLTYPE'].isin(bill_type_filter)]
 
 # Main dashboard
 st.title("Department-wise Vendor Payment Analytics")
@@ -105,15 +80,15 @@ st.title("Department-wise Vendor Payment Analytics")
 #     st.metric("Total Vendors", filtered_df['VENDORNAME'].nunique())
 # with col2:
 #     total_payment = filtered_df['BILLVALUE'].sum()
-#     st.metric("Total Payments", f"₹{total_payment:,.2f}")
+#     st.metric("Total Payments", fmt.inr(total_payment))
 # with col3:
 #     avg_days = filtered_df['TOTAL_DAYS_for_PAYMENT'].mean()
-#     st.metric("Avg Payment Days", f"{avg_days:.1f} days")
+#     st.metric("Avg Payment Days", fmt.days(avg_days))
 
 # Tabs
 
 
-tab1= st.tabs(["Department Analysis"])
+tab1, = st.tabs(["Department Analysis"])
 
 
 
@@ -133,128 +108,73 @@ with tab1:
     if selected_dept == 'All Departments':
         st.subheader("Summary Across All Departments")
         
-        # Create consistent color mapping for departments
-        departments = filtered_df['DEPARTMENT'].unique()
-        color_map = {dept: px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)] 
-                    for i, dept in enumerate(departments)}
-        
         # KPI cards
+        summary = shared("totals", lambda: queries.totals(df, filters))
+        dept_table = shared("departments", lambda: queries.departments(df, filters))
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Vendors", filtered_df['VENDORNAME'].nunique())
+            st.metric("Total Vendors", summary["vendors"])
         with col2:
-            total_payment = filtered_df['BILLVALUE'].sum()
-            st.metric("Total Payments", f"₹{total_payment:,.2f}")
+            st.metric("Total Payments", fmt.inr(summary["value"]))
         with col3:
-            avg_days = filtered_df['TOTAL_DAYS_for_PAYMENT'].mean()
-            st.metric("Avg Payment Days", f"{avg_days:.1f} days")
+            st.metric("Avg Payment Days", fmt.days(summary["avg_days"]))
         
-        # Charts with consistent colors
+        # Charts with consistent colors (precomputed with the table)
+        fig1, fig2 = shared("department_charts", lambda: precompute.department_charts(dept_table))
         col1, col2 = st.columns(2)
         
         with col1:
             try:
-                vendor_count = filtered_df.groupby('DEPARTMENT')['VENDORNAME'].nunique().reset_index()
-                fig1 = px.bar(
-                    vendor_count, 
-                    x='DEPARTMENT', 
-                    y='VENDORNAME',
-                    title="Number of Vendors by Department",
-                    labels={'VENDORNAME': 'Vendor Count', 'DEPARTMENT': 'Department'},
-                    color='DEPARTMENT',
-                    color_discrete_map=color_map
-                )
-                st.plotly_chart(fig1, use_container_width=True)
+                figures.show(fig1, key="department_vendor_counts")
             except Exception as e:
                 st.error(f"Error creating vendor count chart: {str(e)}")
         
         with col2:
             try:
-                payment_sum = filtered_df.groupby('DEPARTMENT')['BILLVALUE'].sum().reset_index()
-                payment_sum['Amount'] = payment_sum['BILLVALUE'].apply(lambda x: f"₹{x:,.2f}")
-                
-                fig2 = px.pie(
-                    payment_sum,
-                    values='BILLVALUE',
-                    names='DEPARTMENT',
-                    title="Payment Distribution by Department",
-                    hole=0.3,
-                    color='DEPARTMENT',
-                    color_discrete_map=color_map,
-                    hover_data=['Amount']
-                )
-                
-                fig2.update_traces(
-                    hovertemplate="<b>%{label}</b><br>" +
-                                "Percentage: %{percent}<br>" +
-                                "Amount: %{customdata[0]}<br>" +
-                                "<extra></extra>"
-                )
-                
-                st.plotly_chart(fig2, use_container_width=True)
+                figures.show(fig2, key="department_payments")
             except Exception as e:
                 st.error(f"Error creating payment distribution chart: {str(e)}")
     
     else:
         # Single department view
-        dept_df = filtered_df[filtered_df['DEPARTMENT'] == selected_dept]
+        dept_filters = dict(filters, departments=[selected_dept])
+        dept_summary = shared("totals", lambda: queries.totals(df, dept_filters), selected_dept, scope=dept_filters)
+        all_vendors = shared("department_vendors", lambda: queries.department_vendors(df, selected_dept, filters),
+                             selected_dept, scope=dept_filters)
         
         st.subheader(f"Analysis for {selected_dept} Department")
         
         # Department KPIs
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Vendors", dept_df['VENDORNAME'].nunique())
+            st.metric("Total Vendors", dept_summary["vendors"])
         with col2:
-            st.metric("Total Payments", f"₹{dept_df['BILLVALUE'].sum():,.2f}")
+            st.metric("Total Payments", fmt.inr(dept_summary["value"]))
         with col3:
-            st.metric("Avg Payment Days", f"{dept_df['TOTAL_DAYS_for_PAYMENT'].mean():.1f} days")
+            st.metric("Avg Payment Days", fmt.days(dept_summary["avg_days"]))
         
         # Vendor Payment Distribution Pie Chart
         st.subheader(f"Payment Distribution by Vendor in {selected_dept}")
-        vendor_payments = dept_df.groupby('VENDORNAME')['BILLVALUE'].sum().reset_index()
-        vendor_payments['Amount'] = vendor_payments['BILLVALUE'].apply(lambda x: f"₹{x:,.2f}")
-        
-        fig3 = px.pie(
-            vendor_payments,
-            values='BILLVALUE',
-            names='VENDORNAME',
-            title=f"Vendor Payment Distribution in {selected_dept}",
-            hole=0.3,
-            hover_data=['Amount']
-        )
-        
-        fig3.update_traces(
-            hovertemplate="<b>%{label}</b><br>" +
-                        "Percentage: %{percent}<br>" +
-                        "Amount: %{customdata[0]}<br>" +
-                        "<extra></extra>",
-            textinfo='percent+label'
-        )
-        
-        st.plotly_chart(fig3, use_container_width=True)
+        fig3 = shared("vendor_chart", lambda: precompute.vendor_chart(all_vendors, selected_dept),
+                      selected_dept, scope=dept_filters)
+        figures.show(fig3, key="vendor_payments")
         
         # All vendors in this department
         st.subheader(f"All Vendors in {selected_dept}")
-        all_vendors = dept_df.groupby('VENDORNAME').agg({
-            'BILLVALUE': 'sum',
-            'TOTAL_DAYS_for_PAYMENT': 'mean',
-            'BILLNO': 'count',
-            'PAYMENT_DONE': 'count'
-        }).rename(columns={
-            'BILLVALUE': 'Total Amount',
-            'TOTAL_DAYS_for_PAYMENT': 'Avg Payment Days',
-            'BILLNO': 'Bill Count',
-            'PAYMENT_DONE': 'Payment Done Count'
-        }).sort_values('Total Amount', ascending=False)
+        all_vendors = all_vendors.rename(columns={
+            'value': 'Total Amount',
+            'avg_days': 'Avg Payment Days',
+            'bills': 'Bill Count',
+            'payments': 'Payment Done Count'
+        })
         
         st.dataframe(
-            all_vendors.style.format({
-                'Total Amount': '₹{:,.2f}',
-                'Avg Payment Days': '{:.1f} days',
-                'Bill Count': '{:,.0f}',
-                'Payment Done Count': '{:,.0f} times'
+            fmt.format_frame(all_vendors, {
+                'Total Amount': fmt.inr,
+                'Avg Payment Days': fmt.days,
+                'Bill Count': fmt.count,
+                'Payment Done Count': lambda s: fmt.count(s, unit=' times')
             }),
             use_container_width=True,
             height=min(600, 35 * len(all_vendors))
-        )
\ No newline at end of file
+        )
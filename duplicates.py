@@ -0,0 +1,115 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+
+
+# Probable duplicate and anomalous bills.
+# Bills are matched on hashed keys instead of pairwise comparisons:
+#   - same vendor and same normalised bill number ("BL-0042 " == "bl42")
+#   - same vendor and bill value with bill dates at most WINDOW_DAYS apart;
+#     bills are sorted by (hash(vendor, value), bill date) so candidates are
+#     neighbours and one diff over the sorted arrays finds every chain
+# Bill values are also scored per vendor with a robust z-score (median / MAD
+# of log values) so one-off spikes stand out without a few big bills
+# dragging the mean. Everything is O(n log n) and computed once per version.
+
+COLUMNS = {"vendor": "VENDORID", "bill_no": "BILLNO", "value": "BILLVALUE", "date": "BILLDATE"}
+
+WINDOW_DAYS = 3
+OUTLIER_Z = 3.5
+MIN_VENDOR_BILLS = 5
+
+SAME_NUMBER = "Same bill number"
+SAME_VALUE = "Same value and date"
+OUTLIER = "Unusual bill value"
+
+
+def normalise_bill_no(values):
+    # Upper case, only letters and digits, leading zeros of numeric runs dropped
+    s = pd.Series(values).astype("string").str.upper().str.replace(r"[^0-9A-Z]", "", regex=True)
+    return s.str.replace(r"(?<![0-9])0+(?=[0-9])", "", regex=True)
+
+
+def _hash(*columns):
+    frame = pd.concat([pd.Series(c).reset_index(drop=True) for c in columns], axis=1)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _components(keys, days=None, window=0):
+    # Group id per row for equal keys (and, with days, dates chained within
+    # window); -1 for rows that match nothing
+    order = np.lexsort((days,) + (keys,)) if days is not None else np.argsort(keys, kind="stable")
+    k = keys[order]
+    same = k[1:] == k[:-1]
+    if days is not None:
+        d = days[order]
+        same &= (d[1:] - d[:-1]) <= window
+    starts = np.concatenate([[True], ~same])
+    group = np.cumsum(starts) - 1
+    size = np.bincount(group)
+    group = np.where(size[group] > 1, group, -1)
+    out = np.empty(len(keys), dtype=np.int64)
+    out[order] = group
+    return out
+
+
+def detect(df, columns=COLUMNS, window=WINDOW_DAYS, z=OUTLIER_Z):
+    vendor = df[columns["vendor"]].astype("string").str.strip().str.upper().to_numpy()
+    value = pd.to_numeric(df[columns["value"]], errors="coerce").round(2).to_numpy()
+    out = pd.DataFrame(index=df.index)
+
+    # Same vendor + bill number
+    if columns.get("bill_no") in df.columns:
+        bill_no = normalise_bill_no(df[columns["bill_no"]]).to_numpy()
+        by_number = _components(_hash(vendor, bill_no))
+        by_number[pd.isna(bill_no)] = -1
+    else:
+        by_number = np.full(len(df), -1)
+
+    # Same vendor + value, dates within the window
+    if columns.get("date") in df.columns:
+        dates = pd.to_datetime(df[columns["date"]], errors="coerce").to_numpy().astype("datetime64[D]")
+        days = dates.astype(np.int64)
+        by_value = _components(_hash(vendor, value), days, window)
+        by_value[np.isnat(dates) | np.isnan(value)] = -1
+    else:
+        by_value = np.full(len(df), -1)
+
+    out["DUPLICATE_GROUP"] = np.where(by_number >= 0, by_number, np.where(by_value >= 0, by_value + len(df), -1))
+    out["DUPLICATE_REASON"] = np.select([by_number >= 0, by_value >= 0], [SAME_NUMBER, SAME_VALUE], "")
+
+    # Robust z-score of log bill value within each vendor
+    log_value = pd.Series(np.log1p(np.clip(value, 0, None)), index=df.index)
+    keys = pd.Series(vendor, index=df.index)
+    grouped = log_value.groupby(keys)
+    median = grouped.transform("median")
+    mad = (log_value - median).abs().groupby(keys).transform("median")
+    n = grouped.transform("count")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = 0.6745 * (log_value - median) / mad.replace(0, np.nan)
+    out["VALUE_ZSCORE"] = score.where(n >= MIN_VENDOR_BILLS).astype(np.float32)
+    out["VALUE_OUTLIER"] = (out["VALUE_ZSCORE"].abs() > z).to_numpy()
+    return out
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached(_df, version, columns, window, z):
+    return detect(_df, dict(columns), window, z)
+
+
+def flags(df, columns=COLUMNS, window=WINDOW_DAYS, z=OUTLIER_Z):
+    # Duplicate groups and value outliers for the full dataset, once per version
+    version = versions.dataset_version(df)
+    if version is None:
+        return detect(df, columns, window, z)
+    return _cached(df, version, tuple(sorted(columns.items())), window, z)
+
+
+def flagged(result):
+    # Rows that are a probable duplicate or an outlier, with one reason each;
+    # duplicate groups stay together
+    rows = result[(result["DUPLICATE_GROUP"] >= 0) | result["VALUE_OUTLIER"]]
+    reason = rows["DUPLICATE_REASON"].where(rows["DUPLICATE_REASON"] != "", OUTLIER)
+    return rows.assign(REASON=reason).sort_values(["DUPLICATE_GROUP", "VALUE_ZSCORE"], ascending=[False, False])
@@ -3,21 +3,24 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import plotly.express as px
-import f
+import fmt
 
 
 
 def tab2_Col1(vendor_data):
+    total_amount = vendor_data['BILLVALUE'].sum()
+    paid_amount = vendor_data[vendor_data['STATUS'] == 'Paid']['BILLVALUE'].sum()
+    inprogress_amount = vendor_data[vendor_data['STATUS'] == 'In Progress']['BILLVALUE'].sum()
     
     st.markdown("""
             <div style='margin-bottom: -20px;'>
                 <div style='font-size: 0.9em;'>Total Amount</div>
-                <div style='font-size: 1.3em; font-weight: bold;'>₹{:,}</div>
+                <div style='font-size: 1.3em; font-weight: bold;'>{}</div>
             </div>
-            """.format(total_amount), unsafe_allow_html=True)
+            """.format(fmt.inr(total_amount)), unsafe_allow_html=True)
     with st.expander(" ", expanded=False):
-        st.caption(f"✅ Paid: ₹ paid_amount")
-        st.caption(f"🔄 In Progress: ₹ inprogress_amount")
+        st.caption(f"✅ Paid: {fmt.inr(paid_amount)}")
+        st.caption(f"🔄 In Progress: {fmt.inr(inprogress_amount)}")
     
     st.write("FY wise Expense for that Vendor")
 
@@ -35,9 +38,9 @@ def tab2_Col2(vendor_data,filtered_df):
     st.markdown("""
             <div style='margin-bottom: -20px;'>
                 <div style='font-size: 0.9em;'>Total Bills</div>
-                <div style='font-size: 1.3em; font-weight: bold;'>{:,}</div>
+                <div style='font-size: 1.3em; font-weight: bold;'>{}</div>
             </div>
-            """.format(total_bills), unsafe_allow_html=True)
+            """.format(fmt.count(total_bills)), unsafe_allow_html=True)
     with st.expander(" ", expanded=False):
         st.caption(f"✅ Paid: {paid_bills}")
         st.caption(f"🔄 In Progress: {inprogress_bills}")
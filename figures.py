@@ -0,0 +1,127 @@
+import streamlit as st
+import numpy as np
+
+
+# Lightweight chart specs.
+# Charts are built as plain Plotly figure dicts from data that is already
+# aggregated, and rendered in the browser by st.plotly_chart. Nothing is
+# rasterised on the server and no figure objects stay alive between reruns.
+# Specs are cached on a hash of their (small) inputs, which are turned into
+# plain lists first so the cache key never depends on pandas objects.
+
+MAX_ENTRIES = 512
+
+
+def _values(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64) or values.dtype == object:
+        return values.astype(str).tolist()
+    return values.tolist()
+
+
+def _layout(title=None, x_title=None, y_title=None, height=None, tickangle=None, **extra):
+    layout = {
+        "margin": {"l": 20, "r": 20, "t": 40 if title else 20, "b": 20},
+        "showlegend": False,
+        "xaxis": {"title": {"text": x_title}, "automargin": True},
+        "yaxis": {"title": {"text": y_title}, "automargin": True},
+    }
+    if title:
+        layout["title"] = {"text": title}
+    if height:
+        layout["height"] = height
+    if tickangle is not None:
+        layout["xaxis"]["tickangle"] = tickangle
+    layout.update(extra)
+    return layout
+
+
+def bar(labels, values, orientation="v", title=None, x_title=None, y_title=None,
+        height=None, tickangle=None, hover="%{y:,.2f}", colors=None):
+    return _bar(_values(labels), _values(values), orientation, title, x_title, y_title,
+                height, tickangle, hover, None if colors is None else list(colors))
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _bar(labels, values, orientation, title, x_title, y_title, height, tickangle, hover, colors=None):
+    if orientation == "h":
+        trace = {"type": "bar", "orientation": "h", "x": values, "y": labels,
+                 "hovertemplate": "%{y}: " + hover.replace("%{y", "%{x") + "<extra></extra>"}
+        layout = _layout(title, x_title, y_title, height, tickangle)
+        layout["yaxis"]["autorange"] = "reversed"
+    else:
+        trace = {"type": "bar", "x": labels, "y": values,
+                 "hovertemplate": "%{x}: " + hover + "<extra></extra>"}
+        layout = _layout(title, x_title, y_title, height, tickangle)
+    if colors is not None:
+        trace["marker"] = {"color": colors}
+    return {"data": [trace], "layout": layout}
+
+
+def pie(labels, values, amounts, title=None, colors=None, textinfo=None, height=None):
+    # Donut with the share and the formatted amount of each slice on hover
+    return _pie(_values(labels), _values(values), _values(amounts), title,
+                None if colors is None else list(colors), textinfo, height)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _pie(labels, values, amounts, title, colors, textinfo, height):
+    trace = {"type": "pie", "labels": labels, "values": values, "hole": 0.3,
+             "customdata": [[amount] for amount in amounts],
+             "hovertemplate": "<b>%{label}</b><br>Percentage: %{percent}<br>"
+                              "Amount: %{customdata[0]}<br><extra></extra>"}
+    if colors is not None:
+        trace["marker"] = {"colors": colors}
+    if textinfo:
+        trace["textinfo"] = textinfo
+    return {"data": [trace], "layout": _layout(title, height=height, showlegend=True)}
+
+
+def line(x, y, title=None, x_title=None, y_title=None, height=None, tickangle=None):
+    return _line(_values(x), _values(y), title, x_title, y_title, height, tickangle)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _line(x, y, title, x_title, y_title, height, tickangle):
+    trace = {"type": "scatter", "mode": "lines+markers", "x": x, "y": y}
+    return {"data": [trace], "layout": _layout(title, x_title, y_title, height, tickangle)}
+
+
+def histogram(counts, edges, title=None, x_title=None, y_title="Count", height=None):
+    # Bars drawn from precomputed bin counts; the browser never sees raw rows
+    return _histogram(_values(counts), _values(edges), title, x_title, y_title, height)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _histogram(counts, edges, title, x_title, y_title, height):
+    edges = np.asarray(edges, dtype=float)
+    trace = {
+        "type": "bar",
+        "x": ((edges[:-1] + edges[1:]) / 2).tolist(),
+        "y": counts,
+        "width": np.diff(edges).tolist(),
+        "customdata": np.column_stack([edges[:-1], edges[1:]]).tolist(),
+        "hovertemplate": "%{customdata[0]:,.0f} – %{customdata[1]:,.0f}: %{y}<extra></extra>",
+    }
+    layout = _layout(title, x_title, y_title, height, bargap=0.02)
+    return {"data": [trace], "layout": layout}
+
+
+def box(labels, q1, median, q3, lower, upper, title=None, x_title=None, y_title=None,
+        height=None, tickangle=None):
+    # Box plot from precomputed five-number summaries (see binning.box_by)
+    return _box(_values(labels), _values(q1), _values(median), _values(q3), _values(lower),
+                _values(upper), title, x_title, y_title, height, tickangle)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _box(labels, q1, median, q3, lower, upper, title, x_title, y_title, height, tickangle):
+    trace = {"type": "box", "x": labels, "q1": q1, "median": median, "q3": q3,
+             "lowerfence": lower, "upperfence": upper}
+    return {"data": [trace], "layout": _layout(title, x_title, y_title, height, tickangle)}
+
+
+def show(spec, key, **kwargs):
+    # key: unique per call site; two identical specs on a page would otherwise
+    # get the same element id
+    st.plotly_chart(spec, use_container_width=True, key=key, **kwargs)
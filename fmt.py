@@ -0,0 +1,169 @@
+import threading
+import numpy as np
+import pandas as pd
+import versions
+
+
+# Vectorised display formatting.
+# Every formatter takes a Series/array (or a scalar) and returns strings for the
+# whole column in one pass instead of calling a Python lambda per cell.
+
+MISSING = "-"
+LAKH = 1e5
+CRORE = 1e7
+# Largest |value| * 10**decimals held in int64; beyond it digits use Python ints
+_MAX_INT64 = 2.0 ** 63
+
+# A digit followed by groups of two and a final group of three: 1,23,45,678
+_INDIAN_GROUPS = r"(\d)(?=(?:\d{2})*\d{3}$)"
+_WESTERN_GROUPS = r"(\d)(?=(?:\d{3})+$)"
+
+
+def _as_series(values):
+    if np.ndim(values) == 0:
+        return pd.Series([values]), True
+    if isinstance(values, pd.Series):
+        return values, False
+    return pd.Series(values), False
+
+
+def _result(strings, scalar):
+    return strings.iloc[0] if scalar else strings
+
+
+def _number(s, decimals, indian):
+    x = pd.to_numeric(s, errors="coerce").to_numpy(dtype=float)
+    missing = ~np.isfinite(x)
+    x = np.where(missing, 0.0, x)
+
+    scale = 10 ** decimals
+    cents = np.rint(np.abs(x) * scale)
+    if (cents < _MAX_INT64).all():
+        cents = cents.astype(np.int64)
+    else:
+        cents = np.array([int(c) for c in cents], dtype=object)
+    whole = pd.Series(cents // scale, index=s.index).astype(str)
+    whole = whole.str.replace(_INDIAN_GROUPS if indian else _WESTERN_GROUPS, r"\1,", regex=True)
+
+    sign = np.where((x < 0) & (cents > 0), "-", "")
+    out = sign + whole
+    if decimals > 0:
+        frac = pd.Series(cents % scale, index=s.index).astype(str).str.zfill(decimals)
+        out = out + "." + frac
+    return out.where(~missing, MISSING), missing
+
+
+def number(values, decimals=0, indian=True):
+    s, scalar = _as_series(values)
+    out, _ = _number(s, decimals, indian)
+    return _result(out, scalar)
+
+
+def inr(values, decimals=2, symbol="₹"):
+    # ₹12,34,567.89
+    s, scalar = _as_series(values)
+    out, missing = _number(s, decimals, True)
+    negative = out.str.startswith("-")
+    out = np.where(negative, "-" + symbol + out.str[1:], symbol + out)
+    out = pd.Series(out, index=s.index).where(~missing, MISSING)
+    return _result(out, scalar)
+
+
+def inr_short(values, decimals=2, symbol="₹"):
+    # ₹10 Lakh / ₹3.2 Crore, trailing zeros dropped
+    s, scalar = _as_series(values)
+    x = pd.to_numeric(s, errors="coerce")
+    size = x.abs()
+    # The unit is picked after rounding, so 99,999.999 is ₹1 Lakh, not ₹1,00,000
+    scale = 10 ** decimals
+    crore = (size >= CRORE) | (np.rint(size / LAKH * scale) / scale >= CRORE / LAKH)
+    lakh = (size >= LAKH) | (np.rint(size * scale) / scale >= LAKH)
+    divisor = np.select([crore, lakh], [CRORE, LAKH], 1.0)
+    unit = np.select([crore, lakh], [" Crore", " Lakh"], "")
+
+    scaled, missing = _number(x / divisor, decimals, True)
+    scaled = scaled.str.replace(r"\.?0+$", "", regex=True) if decimals > 0 else scaled
+    negative = scaled.str.startswith("-")
+    out = np.where(negative, "-" + symbol + scaled.str[1:], symbol + scaled) + unit
+    out = pd.Series(out, index=s.index).where(~missing, MISSING)
+    return _result(out, scalar)
+
+
+def days(values, decimals=1, unit=" days"):
+    s, scalar = _as_series(values)
+    out, missing = _number(s, decimals, True)
+    out = (out + unit).where(~missing, MISSING)
+    return _result(out, scalar)
+
+
+def count(values, unit=""):
+    return days(values, decimals=0, unit=unit)
+
+
+def dates(values, format="%Y-%m-%d"):
+    s, scalar = _as_series(values)
+    out = pd.to_datetime(s, errors="coerce").dt.strftime(format)
+    out = out.astype(object).where(out.notna(), MISSING)
+    return _result(out, scalar)
+
+
+def format_frame(df, formats, cached=False):
+    # Copy of df with the given columns replaced by their display strings.
+    # cached=True is only for rows of the loaded dataset (see column below),
+    # never for aggregates whose values change with the filters.
+    out = df.copy()
+    for col, formatter in formats.items():
+        if col in out.columns:
+            out[col] = column(df, col, formatter) if cached else formatter(df[col])
+    return out
+
+
+####################################          Per-version cache          ####################################
+
+# Formatted columns of the loaded dataset are cached by the version stamp that
+# the loader puts in df.attrs["version"]. Subsets (filters, pages) keep the
+# stamp, so only rows not seen before for that version get formatted. The
+# columns of older versions are dropped when a newer one loads (versions.py).
+
+_cache = {}
+MAX_CACHED_COLUMNS = 64
+# Sessions run on their own threads; formatting happens outside the lock
+_lock = threading.Lock()
+
+
+@versions.on_drop
+def _drop_columns(current):
+    # Formatted columns of superseded versions
+    with _lock:
+        for key in [key for key in _cache if not versions.of_version(key[0], current)]:
+            del _cache[key]
+
+
+def column(df, name, formatter):
+    version = versions.dataset_version(df)
+    if version is None or not df.index.is_unique:
+        return formatter(df[name])
+
+    key = (version, name, formatter)
+    with _lock:
+        cached = _cache.get(key)
+    if cached is None:
+        cached = formatter(df[name])
+        with _lock:
+            if key not in _cache and len(_cache) >= MAX_CACHED_COLUMNS:
+                _cache.pop(next(iter(_cache)))
+            _cache[key] = cached
+        return cached.reindex(df.index)
+
+    hit = cached.reindex(df.index)
+    todo = hit.isna().to_numpy()
+    if todo.any():
+        fresh = formatter(df[name][todo])
+        with _lock:
+            # Not re-added if evicted meanwhile; rows another session added
+            # meanwhile are kept once
+            current = _cache.get(key)
+            if current is not None:
+                _cache[key] = pd.concat([current, fresh[~fresh.index.isin(current.index)]])
+        hit[todo] = fresh.to_numpy()
+    return hit
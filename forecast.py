@@ -0,0 +1,156 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+import stages
+import bottlenecks
+
+
+# Payment-date forecast for open bills.
+# Trained on the stage durations of bills that reached PAYMENT_DONE. For an
+# open bill the expected remaining time is the mean residual time of the stage
+# it is waiting in, given the days already spent there (empirical survival
+# curve), plus the average contribution of every later stage. Statistics are
+# kept per group with a fallback chain (vendor -> department + bill type ->
+# department -> everyone) so small groups borrow from larger ones. All open
+# bills are scored together with array lookups, once per dataset version.
+
+LEVELS = [["VENDORNAME"], ["DEPARTMENT", "BILLTYPE"], ["DEPARTMENT"], []]
+MIN_SAMPLES = 20
+# Durations are packed with the group code into one sortable integer
+SCALE = 1 << 20
+
+
+def _group_codes(df, columns):
+    if not columns:
+        return np.zeros(len(df), dtype=np.int64), pd.Index([0])
+    codes, uniques = pd.MultiIndex.from_frame(df[columns].astype(str)).factorize()
+    return codes.astype(np.int64), uniques
+
+
+def train(df, levels=LEVELS):
+    durations = stages.durations(df).drop(columns=stages.TOTAL, errors="ignore")
+    names = list(durations.columns)
+    done = durations[names[-1]].notna().to_numpy() if names else np.zeros(len(df), dtype=bool)
+    history = durations[done]
+    train_df = df[done]
+
+    model = {"stages": names, "levels": []}
+    for columns in levels:
+        if any(c not in df.columns for c in columns):
+            continue
+        codes, uniques = _group_codes(train_df, columns)
+        ngroups = len(uniques)
+        count = np.bincount(codes, minlength=ngroups)
+
+        # Average days each stage adds, skipped stages counting as 0
+        contrib = np.column_stack([
+            np.bincount(codes, weights=np.nan_to_num(history[s].to_numpy(dtype=float)), minlength=ngroups)
+            for s in names
+        ]) / np.maximum(count, 1)[:, None]
+        # Sum over the stages after each stage
+        later = np.cumsum(contrib[:, ::-1], axis=1)[:, ::-1] - contrib
+
+        # Sorted (group, duration) per stage for mean residual life lookups
+        residual = []
+        for s in names:
+            d = history[s].to_numpy(dtype=float)
+            ok = ~np.isnan(d)
+            packed = np.sort(codes[ok] * SCALE + np.minimum(d[ok], SCALE - 1).astype(np.int64))
+            values = (packed % SCALE).astype(np.float64)
+            suffix = np.concatenate([np.cumsum(values[::-1])[::-1], [0.0]])
+            residual.append((packed, suffix))
+
+        model["levels"].append({"columns": columns, "groups": uniques, "count": count,
+                                "contrib": contrib, "later": later, "residual": residual})
+    return model
+
+
+def _lookup_codes(df, level):
+    if not level["columns"]:
+        return np.zeros(len(df), dtype=np.int64)
+    keys = pd.MultiIndex.from_frame(df[level["columns"]].astype(str))
+    return level["groups"].get_indexer(keys).astype(np.int64)
+
+
+def _mean_residual(level, stage, codes, elapsed):
+    # E[D - t | D > t] for each bill's group and elapsed days t; NaN if no data
+    packed, suffix = level["residual"][stage]
+    lo = np.searchsorted(packed, codes * SCALE + np.floor(elapsed).astype(np.int64), side="right")
+    hi = np.searchsorted(packed, (codes + 1) * SCALE, side="left")
+    left = hi - lo
+    total = suffix[lo] - suffix[hi]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(left > 0, total / left - elapsed, np.nan)
+
+
+def score(model, df, waiting=None):
+    # Expected remaining days and payment date for every open bill
+    if waiting is None:
+        waiting = bottlenecks.current(df)
+    names = model["stages"]
+    out = pd.DataFrame(index=df.index)
+    out["REMAINING_DAYS"] = np.nan
+    if not names or not model["levels"]:
+        out["EXPECTED_PAYMENT"] = pd.NaT
+        return out
+
+    is_open = waiting[bottlenecks.DWELL].notna().to_numpy()
+    # The stage from the timestamps, not PENDINGFOR: that is free text in real
+    # exports and would match none of the trained stage names
+    stage_pos = pd.Index(names).get_indexer(waiting[bottlenecks.PIPELINE_STAGE].astype(object))
+    elapsed = np.nan_to_num(waiting[bottlenecks.DWELL].to_numpy(dtype=float))
+    remaining = np.full(len(df), np.nan)
+
+    # First level (most specific) with enough history decides
+    for level in model["levels"]:
+        codes = _lookup_codes(df, level)
+        enough = (codes >= 0) & (level["count"][np.clip(codes, 0, None)] >= MIN_SAMPLES)
+        todo = is_open & np.isnan(remaining) & enough & (stage_pos >= 0)
+        if not todo.any():
+            continue
+        for s in np.unique(stage_pos[todo]):
+            rows = todo & (stage_pos == s)
+            current = _mean_residual(level, s, codes[rows], elapsed[rows])
+            # Past everything seen for this stage: assume it is about to move on
+            current = np.where(np.isnan(current), 0.0, current)
+            remaining[rows] = current + level["later"][codes[rows], s]
+
+    out["REMAINING_DAYS"] = remaining.astype(np.float32)
+    # Open bills waiting in a stage with no trained durations (a dump without
+    # the stage's date column) stay unscored; counted for the caller
+    out.attrs["unmapped"] = int((is_open & (stage_pos < 0)).sum())
+    as_of = pd.to_datetime(df[[c for c, _ in stages.PIPELINE if c in df.columns]].max(axis=1).max())
+    out["EXPECTED_PAYMENT"] = as_of + pd.to_timedelta(np.ceil(remaining), unit="D")
+    out.attrs["as_of"] = as_of
+    return out
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached(_df, version, levels):
+    model = train(_df, [list(level) for level in levels])
+    return score(model, _df)
+
+
+def predictions(df, levels=LEVELS):
+    # Scored open bills for the dataset, trained and scored once per version
+    version = versions.dataset_version(df)
+    if version is None:
+        return score(train(df, levels), df)
+    return _cached(df, version, tuple(tuple(level) for level in levels))
+
+
+def expected_within(predictions, values, days=30):
+    # Sum of values of the open bills expected to be paid within `days` of the as-of date
+    as_of = predictions.attrs.get("as_of")
+    if as_of is None:
+        return 0.0
+    due = (predictions["EXPECTED_PAYMENT"] <= as_of + pd.Timedelta(days=days)).to_numpy()
+    return float(np.nansum(np.asarray(values, dtype=float)[due]))
+
+
+def cash_flow(predictions, values, freq="W"):
+    # Expected payments (sum of values) per period of expected payment date
+    frame = pd.DataFrame({"date": predictions["EXPECTED_PAYMENT"], "value": values}).dropna()
+    return frame.groupby(frame["date"].dt.to_period(freq))["value"].sum()
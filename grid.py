@@ -0,0 +1,106 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import fmt
+
+
+# Server-side paginated grid.
+# Search, sort and slicing all run against the dataframe here; only the rows
+# of the visible page are formatted and shipped to the browser, so the payload
+# stays the same size no matter how many bills match the filters.
+
+PAGE_SIZES = [25, 50, 100, 200]
+
+
+def search_mask(df, query, columns):
+    # Case-insensitive substring match over the given text columns
+    mask = np.zeros(len(df), dtype=bool)
+    for col in columns:
+        if col in df.columns:
+            mask |= df[col].astype(str).str.contains(query, case=False, regex=False, na=False).to_numpy()
+    return mask
+
+
+def sorted_positions(series, ascending, stop):
+    # Positions of the first `stop` rows in sort order. For the early pages of a
+    # numeric/date column a partial selection is enough, no full sort needed.
+    n = len(series)
+    if stop < n // 4 and (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)):
+        ranked = series.reset_index(drop=True)
+        top = ranked.nsmallest(stop) if ascending else ranked.nlargest(stop)
+        # nsmallest/nlargest drop NaN; pad with them at the end like sort_values does
+        positions = top.index.to_numpy()
+        if len(positions) < stop:
+            missing = np.flatnonzero(ranked.isna().to_numpy())[:stop - len(positions)]
+            positions = np.concatenate([positions, missing])
+        return positions
+    order = series.reset_index(drop=True).sort_values(ascending=ascending, kind="stable", na_position="last")
+    return order.index.to_numpy()[:stop]
+
+
+def search(df, query, search_columns=None):
+    if not query:
+        return df
+    cols = search_columns if search_columns is not None else df.select_dtypes(include=["object", "string"]).columns
+    return df[search_mask(df, query, cols)]
+
+
+def page_slice(df, sort_by=None, ascending=True, page=1, page_size=50):
+    # Rows of the requested page, in sort order
+    total = len(df)
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total)
+    if start >= total:
+        return df.iloc[0:0]
+
+    if sort_by is not None and sort_by in df.columns:
+        positions = sorted_positions(df[sort_by], ascending, stop)[start:stop]
+        return df.iloc[positions]
+    return df.iloc[start:stop]
+
+
+def render_grid(df, key, columns=None, formats=None, search_columns=None,
+                default_sort=None, ascending=False, page_size=50, height=None):
+    columns = list(columns) if columns is not None else list(df.columns)
+
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        query = st.text_input("Search", key=f"{key}_search", placeholder="Search records...")
+    with col2:
+        sort_options = ["(none)"] + columns
+        sort_index = sort_options.index(default_sort) if default_sort in sort_options else 0
+        sort_by = st.selectbox("Sort by", sort_options, index=sort_index, key=f"{key}_sort")
+    with col3:
+        order = st.selectbox("Order", ["Descending", "Ascending"],
+                             index=1 if ascending else 0, key=f"{key}_order")
+    with col4:
+        size = st.selectbox("Rows", PAGE_SIZES,
+                            index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1,
+                            key=f"{key}_size")
+
+    # Filter first so the page selector knows its bounds
+    matched = search(df, query, search_columns)
+    total = len(matched)
+    pages = max(1, -(-total // size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+
+    page_df = page_slice(
+        matched,
+        sort_by=None if sort_by == "(none)" else sort_by,
+        ascending=order == "Ascending",
+        page=int(page),
+        page_size=size,
+    )
+    page_df = page_df[columns]
+
+    if formats:
+        page_df = fmt.format_frame(page_df, formats, cached=True)
+
+    if height:
+        st.dataframe(page_df, use_container_width=True, height=height)
+    else:
+        st.dataframe(page_df, use_container_width=True)
+    first = (int(page) - 1) * size + 1 if total else 0
+    st.caption(f"Showing {first:,}–{min(int(page) * size, total):,} of {total:,} records")
@@ -0,0 +1,121 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+
+
+# Hold analysis over the TAXATION / INVOICE / PAYMENT hold columns.
+# At ingest the three groups of hold columns are stacked into one long table
+# of hold events (bill, stage, remark code, hold days). Remarks are normalised
+# and dictionary-encoded once, so grouping by remark is an integer bincount
+# instead of hashing the free text on every rerun.
+
+# stage -> (date, remark, days) columns
+HOLD_STAGES = {
+    "Taxation": ("TAXATION_HOLD_DATE", "TAXATION_HOLD_REMARK", "TAXATION_HOLD_DAYS"),
+    "Invoice": ("INVOICE_HOLD_DATE", "INVOICE_HOLD_REMARK", "INVOICE_HOLD_DAYS"),
+    "Payment": ("PAYMENT_HOLD_DATE", "PAYMENT_HOLD_REMARK", "PAYMENT_HOLD_DAYS"),
+}
+
+NO_REMARK = "(no remark)"
+
+
+def normalise_remarks(remarks):
+    # Codes into a vocabulary of cleaned remarks. Only the distinct raw strings
+    # are cleaned, then mapped back through their factorize codes.
+    raw_codes, raw = pd.factorize(remarks, sort=False)
+    clean = (pd.Series(raw, dtype=object).astype(str)
+             .str.lower()
+             .str.replace(r"[^0-9a-z]+", " ", regex=True)
+             .str.strip())
+    clean = clean.where(clean != "", NO_REMARK)
+    clean_codes, vocabulary = pd.factorize(clean, sort=True)
+    lookup = np.append(clean_codes, -1)
+    codes = lookup[raw_codes]
+    # Missing remarks share the (no remark) entry
+    if (codes < 0).any():
+        if NO_REMARK not in vocabulary:
+            vocabulary = vocabulary.append(pd.Index([NO_REMARK]))
+        codes = np.where(codes < 0, vocabulary.get_loc(NO_REMARK), codes)
+    labels = pd.Index(vocabulary).str.capitalize()
+    return codes.astype(np.int32), labels
+
+
+def build_events(df, dims=("DEPARTMENT", "VENDORNAME")):
+    parts = []
+    for stage, (date_col, remark_col, days_col) in HOLD_STAGES.items():
+        if not any(c in df.columns for c in (date_col, remark_col, days_col)):
+            continue
+        held = np.zeros(len(df), dtype=bool)
+        if date_col in df.columns:
+            held |= df[date_col].notna().to_numpy()
+        if remark_col in df.columns:
+            held |= (df[remark_col].notna() & (df[remark_col].astype(str).str.strip() != "")).to_numpy()
+        days = (pd.to_numeric(df[days_col], errors="coerce") if days_col in df.columns
+                else pd.Series(np.nan, index=df.index))
+        held |= (days > 0).to_numpy()
+
+        rows = df.index[held]
+        parts.append(pd.DataFrame({
+            "row": rows,
+            "stage": stage,
+            "remark": df.loc[held, remark_col].to_numpy() if remark_col in df.columns else None,
+            "days": days[held].to_numpy(dtype=np.float32),
+        }))
+
+    if not parts:
+        return {"events": pd.DataFrame(columns=["row", "stage", "remark_code", "days"]),
+                "remarks": pd.Index([])}
+
+    events = pd.concat(parts, ignore_index=True)
+    codes, labels = normalise_remarks(events.pop("remark"))
+    events["remark_code"] = codes
+    events["stage"] = pd.Categorical(events["stage"], categories=list(HOLD_STAGES))
+    for col in dims:
+        if col in df.columns:
+            events[col] = pd.Categorical(df.loc[events["row"], col].to_numpy())
+    return {"events": events, "remarks": labels}
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached(_df, version, dims):
+    return build_events(_df, dims)
+
+
+def events(df, dims=("DEPARTMENT", "VENDORNAME")):
+    # Hold events of the full dataset, built once per dataset version
+    version = versions.dataset_version(df)
+    if version is None:
+        return build_events(df, dims)
+    return _cached(df, version, tuple(dims))
+
+
+def _select(holds, rows):
+    ev = holds["events"]
+    return ev if rows is None else ev[ev["row"].isin(rows)]
+
+
+def summary(holds, by="stage", rows=None):
+    # Hold count, total and average hold days per stage or one of the event dims.
+    # rows limits the bills considered (e.g. filtered_df.index).
+    ev = _select(holds, rows)
+    if by not in ev.columns:
+        return pd.DataFrame(columns=["Holds", "Hold Days", "Avg Hold Days"])
+    grouped = ev.groupby(by, observed=True)["days"]
+    out = pd.DataFrame({"Holds": grouped.size(), "Hold Days": grouped.sum(), "Avg Hold Days": grouped.mean()})
+    return out.sort_values("Hold Days", ascending=False)
+
+
+def top_remarks(holds, n=10, stage=None, rows=None):
+    # Most frequent normalised remarks with their total hold days
+    ev = _select(holds, rows)
+    if stage is not None:
+        ev = ev[ev["stage"] == stage]
+    nvocab = len(holds["remarks"])
+    codes = ev["remark_code"].to_numpy().astype(np.int64)
+    counts = np.bincount(codes, minlength=nvocab)
+    days = np.bincount(codes, weights=np.nan_to_num(ev["days"].to_numpy(dtype=float)), minlength=nvocab)
+    top = np.flatnonzero(counts)
+    top = top[np.lexsort((top, -counts[top]))][:n]
+    return pd.DataFrame({"Remark": holds["remarks"][top], "Holds": counts[top], "Hold Days": days[top]})
@@ -0,0 +1,285 @@
+import os
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import pandas as pd
+import numpy as np
+import calendar_dim
+import stages
+
+
+# Partitioned aggregation on several cores.
+# Only the columns an aggregate reads are taken from the bills, as plain
+# numpy arrays: group codes (factorized once), values and payment days, or
+# the joined <DATE>_DAY day numbers. The rows are split into ranges (one per
+# financial year, or equal row ranges), every range is reduced to small
+# mergeable partials with integer bincounts (sums, counts, distinct pairs,
+# fixed-bin day histograms), and the partials are added up. Payment days
+# are whole numbers, so the per-day histograms give the same quantiles as
+# pandas (linear interpolation) without sorting any raw values.
+#
+# mode="thread" (default) runs the ranges on one persistent thread pool; the
+# numpy work releases the GIL for most of its time. mode="process" copies
+# the arrays into one shared-memory block and runs the ranges on a persistent
+# forkserver (spawn on Windows) process pool, so the multithreaded server is
+# never forked and no frame is pickled.
+#
+# The bincount reductions are faster than the pandas groupby / quantile path
+# on one core already; benchmark.py compares them on the real or demo bills.
+
+DAYS = "TOTAL_DAYS_for_PAYMENT"
+QUANTILES = (0.25, 0.5, 0.75, 0.9)
+# Histogram range for payment days; longer waits are counted in the last bin
+MAX_DAYS = 3650
+# Largest department x vendor space counted with a presence mask (bytes)
+MAX_MASK = 64_000_000
+WORKERS = int(os.environ.get("BILLS_WORKERS", os.cpu_count() or 1))
+MODE = os.environ.get("BILLS_PARALLEL_MODE", "thread")
+
+_threads = None
+_processes = None
+
+
+def partitions(df, by="row", n=None):
+    # (row order or None, [(start, stop)]): one range per financial year over
+    # the rows sorted by year, or n equal ranges in frame order
+    if by == "fy" and "RECVDATE" in df.columns:
+        fy = pd.Series(calendar_dim.date_attribute(df, "RECVDATE", "fy")).fillna(-1).to_numpy()
+        order = np.argsort(fy, kind="stable")
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(fy[order])) + 1, [len(df)]])
+    else:
+        order = None
+        n = n or (WORKERS * 2 if WORKERS > 1 else 1)
+        bounds = np.linspace(0, len(df), n + 1).astype(np.int64)
+    return order, [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a] or [(0, 0)]
+
+
+def _take(values, order):
+    values = np.asarray(values)
+    return values if order is None else values[order]
+
+
+def _thread_pool():
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="partition")
+    return _threads
+
+
+def _process_pool():
+    global _processes
+    if _processes is None:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        _processes = ProcessPoolExecutor(max_workers=WORKERS, mp_context=context)
+    return _processes
+
+
+def _share(arrays):
+    # The arrays copied into one shared-memory block, and where each one is
+    layout, offset = {}, 0
+    for name, values in arrays.items():
+        layout[name] = (offset, values.shape, values.dtype.str)
+        offset += values.nbytes
+    block = SharedMemory(create=True, size=max(offset, 1))
+    for name, values in arrays.items():
+        start, shape, dtype = layout[name]
+        np.ndarray(shape, dtype, buffer=block.buf, offset=start)[...] = values
+    return block, layout
+
+
+def _run_shared(job):
+    # In a pool process: the task on the shared arrays of one range
+    task, name, layout, start, stop, args = job
+    block = SharedMemory(name=name)
+    try:
+        arrays = {key: np.ndarray(shape, dtype, buffer=block.buf, offset=offset)
+                  for key, (offset, shape, dtype) in layout.items()}
+        result = task(arrays, start, stop, *args)
+        del arrays
+        return result
+    finally:
+        block.close()
+
+
+def map_partitions(arrays, task, ranges, *args, mode=None):
+    # task(arrays, start, stop, *args) for every row range, in range order;
+    # results must not reference the arrays
+    mode = mode or MODE
+    if len(ranges) <= 1 or WORKERS == 1:
+        return [task(arrays, start, stop, *args) for start, stop in ranges]
+    if mode == "process":
+        block, layout = _share(arrays)
+        try:
+            jobs = [(task, block.name, layout, start, stop, args) for start, stop in ranges]
+            return list(_process_pool().map(_run_shared, jobs))
+        finally:
+            block.close()
+            block.unlink()
+    return list(_thread_pool().map(lambda r: task(arrays, r[0], r[1], *args), ranges))
+
+
+# ---- partials -------------------------------------------------------------
+
+def _distinct(keys, size):
+    # Sorted distinct keys in [0, size): a presence mask when small enough,
+    # which is linear instead of a sort
+    if size > MAX_MASK:
+        return np.unique(keys)
+    seen = np.zeros(size, dtype=bool)
+    seen[keys] = True
+    return np.flatnonzero(seen)
+
+
+def _department_partial(a, start, stop, ndept, nvendor, width):
+    dept = a["dept"][start:stop]
+    ok = dept >= 0
+    dept = dept[ok]
+    value = a["value"][start:stop][ok]
+    days = a["days"][start:stop][ok]
+    vendor = a["vendor"][start:stop][ok]
+    timed = ~np.isnan(days)
+    sums = np.stack([
+        np.bincount(dept, minlength=ndept),
+        np.bincount(dept, weights=np.nan_to_num(value), minlength=ndept),
+        np.bincount(dept[timed], weights=days[timed], minlength=ndept),
+        np.bincount(dept[timed], minlength=ndept),
+    ])
+    named = vendor >= 0
+    pairs = _distinct(dept[named].astype(np.int64) * nvendor + vendor[named], ndept * nvendor)
+    bins = np.clip(np.round(days[timed]), 0, width - 1).astype(np.int64)
+    histograms = np.bincount(dept[timed] * width + bins, minlength=ndept * width).reshape(ndept, width)
+    return sums, pairs, histograms
+
+
+def _vendor_partial(a, start, stop, npairs):
+    pair = a["pair"][start:stop]
+    ok = pair >= 0
+    pair = pair[ok]
+    days = a["days"][start:stop][ok]
+    timed = ~np.isnan(days)
+    return np.stack([
+        np.bincount(pair, weights=np.nan_to_num(a["value"][start:stop][ok]), minlength=npairs),
+        np.bincount(pair, weights=a["bills"][start:stop][ok], minlength=npairs),
+        np.bincount(pair, weights=a["payments"][start:stop][ok], minlength=npairs),
+        np.bincount(pair[timed], weights=days[timed], minlength=npairs),
+        np.bincount(pair[timed], minlength=npairs),
+    ])
+
+
+def _stage_partial(a, start, stop, k):
+    # Duration sums / counts per stage, as stages.compute measures them (from
+    # the last recorded stage), one contiguous day-number column at a time
+    prev = a["day0"][start:stop].astype(np.int64)
+    has_prev = prev != calendar_dim.MISSING_DAY
+    sums, counts = np.zeros(k - 1), np.zeros(k - 1, dtype=np.int64)
+    for j in range(1, k):
+        day = a[f"day{j}"][start:stop]
+        seen = day != calendar_dim.MISSING_DAY
+        duration = day - prev
+        ok = seen & has_prev & (duration >= 0)
+        sums[j - 1] = np.sum(duration, where=ok)
+        counts[j - 1] = np.count_nonzero(ok)
+        prev = np.where(seen, day, prev)
+        has_prev |= seen
+    return sums, counts
+
+
+# ---- merges ---------------------------------------------------------------
+
+def histogram_quantile(counts, q):
+    # Quantile with pandas' linear interpolation from whole-day counts
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    cumulative = np.cumsum(counts)
+    h = (total - 1) * q
+    lo = np.searchsorted(cumulative, np.floor(h), side="right")
+    hi = np.searchsorted(cumulative, np.ceil(h), side="right")
+    return lo + (hi - lo) * (h - np.floor(h))
+
+
+def _days(df):
+    return pd.to_numeric(df[DAYS], errors="coerce").to_numpy(dtype=float)
+
+
+def department_table(df, by="row", mode=None, quantiles=QUANTILES):
+    # Same columns as queries.departments, from partition partials
+    order, ranges = partitions(df, by)
+    dept, departments = pd.factorize(df["DEPARTMENT"])
+    vendor, vendors = pd.factorize(df["VENDORNAME"])
+    days = _days(df)
+    longest = np.nanmax(days) if (~np.isnan(days)).any() else 0
+    width = int(np.clip(longest, 0, MAX_DAYS)) + 1
+    arrays = {
+        "dept": _take(dept, order),
+        "vendor": _take(vendor, order),
+        "value": _take(pd.to_numeric(df["BILLVALUE"], errors="coerce").to_numpy(dtype=float), order),
+        "days": _take(days, order),
+    }
+    partials = map_partitions(arrays, _department_partial, ranges, len(departments), len(vendors), width, mode=mode)
+    sums = sum(p[0] for p in partials)
+    pairs = _distinct(np.concatenate([p[1] for p in partials]), len(departments) * len(vendors))
+    histograms = sum(p[2] for p in partials)
+
+    table = pd.DataFrame({
+        "vendors": np.bincount(pairs // max(len(vendors), 1), minlength=len(departments)),
+        "bills": sums[0].astype(int),
+        "value": sums[1],
+        "avg_days": sums[2] / np.where(sums[3] == 0, np.nan, sums[3]),
+    }, index=pd.Index(departments, name="DEPARTMENT"))
+    for q in quantiles:
+        table[f"p{int(q * 100)}_days"] = [histogram_quantile(counts, q) for counts in histograms]
+    return table.sort_index().reset_index()
+
+
+def vendor_table(df, by="row", mode=None):
+    # Per (department, vendor): value, bills, payments made, average payment days
+    order, ranges = partitions(df, by)
+    dept, departments = pd.factorize(df["DEPARTMENT"])
+    vendor, vendors = pd.factorize(df["VENDORNAME"])
+    named = (dept >= 0) & (vendor >= 0)
+    pair = np.full(len(df), -1, dtype=np.int64)
+    keys = dept[named].astype(np.int64) * len(vendors) + vendor[named]
+    size = len(departments) * len(vendors)
+    if size > MAX_MASK:
+        pair[named], pairs = pd.factorize(keys, sort=True)
+    else:
+        # Dense codes by lookup in the (department, vendor) space, no hashing
+        pairs = _distinct(keys, size)
+        lookup = np.empty(size, dtype=np.int64)
+        lookup[pairs] = np.arange(len(pairs))
+        pair[named] = lookup[keys]
+    arrays = {
+        "pair": _take(pair, order),
+        "value": _take(pd.to_numeric(df["BILLVALUE"], errors="coerce").to_numpy(dtype=float), order),
+        "bills": _take(df["BILLNO"].notna().to_numpy(dtype=float), order),
+        "payments": _take(df["PAYMENT_DONE"].notna().to_numpy(dtype=float), order),
+        "days": _take(_days(df), order),
+    }
+    sums = sum(map_partitions(arrays, _vendor_partial, ranges, len(pairs), mode=mode))
+    pairs = np.asarray(pairs)
+    index = pd.MultiIndex.from_arrays(
+        [departments.take(pairs // max(len(vendors), 1)), vendors.take(pairs % max(len(vendors), 1))],
+        names=["DEPARTMENT", "VENDORNAME"],
+    )
+    return pd.DataFrame({
+        "value": sums[0],
+        "avg_days": sums[3] / np.where(sums[4] == 0, np.nan, sums[4]),
+        "bills": sums[1].astype(int),
+        "payments": sums[2].astype(int),
+    }, index=index).sort_values("value", ascending=False)
+
+
+def stage_means(df, by="row", mode=None):
+    # Average days per stage; the partitions' sums and counts added up
+    present = [(col, name) for col, name in stages.PIPELINE if col in df.columns]
+    if len(present) < 2:
+        return pd.Series(dtype=float)
+    order, ranges = partitions(df, by)
+    # The joined <DATE>_DAY columns as they are, no day matrix
+    arrays = {f"day{j}": _take(calendar_dim.days(df, col), order) for j, (col, _) in enumerate(present)}
+    partials = map_partitions(arrays, _stage_partial, ranges, len(present), mode=mode)
+    total = sum(p[0] for p in partials)
+    count = sum(p[1] for p in partials)
+    return pd.Series(total / np.where(count == 0, np.nan, count), index=[name for _, name in present[1:]]).dropna()
@@ -0,0 +1,137 @@
+import pandas as pd
+from plotly.colors import qualitative
+import data_service
+import access
+import queries
+import figures
+import fmt
+import singleflight
+import topn
+import telemetry
+
+
+# Landing-view precomputation.
+# After every load of new bills (warmup's watcher runs it) the aggregates the
+# department page opens with are computed ahead of time into the shared
+# results, under the keys the page looks up: "All Departments" totals, table
+# and charts, and every department's totals, vendor table and vendor chart.
+# The charts are figures.py specs built on the server from those aggregates,
+# so a precomputed view renders without any further work. The plan covers the
+# default filters and the views users opened most often in the last 30 days
+# (telemetry.py), most frequent first, so morning sessions find them ready.
+
+# Seconds a precomputed result is kept; keys carry the partition stamps, so a
+# refresh never serves a stale one
+KEEP = 12 * 3600
+# Most frequent (grant, filters, department) views precomputed beyond the defaults
+MAX_VIEWS = 50
+# Queries that tell which view of the department page was opened
+VIEW_QUERIES = ["departments", "department_vendors"]
+
+
+def default_filters(df):
+    # The department page's sidebar before anything is changed
+    paid = df["PAYMENT_DONE"]
+    return {
+        "msme": "All",
+        "bill_types": list(df["BILLTYPE"].unique()),
+        "paid_from": pd.Timestamp(paid.min().date()),
+        "paid_to": pd.Timestamp(paid.max().date()),
+    }
+
+
+def key(df, name, filters, *args, scope=None):
+    # Shared-result key of a department page aggregate; scope: the filters
+    # the result reads when narrower than filters
+    scope = filters if scope is None else scope
+    return singleflight.key(df, name, queries.filter_key(filters), *args, scope=queries.scope(scope))
+
+
+def department_charts(table):
+    # "All Departments" vendor-count bar and payment pie from
+    # queries.departments, one colour per department on both
+    palette = qualitative.Plotly
+    colors = [palette[i % len(palette)] for i in range(len(table))]
+    return (
+        figures.bar(table["DEPARTMENT"], table["vendors"], title="Number of Vendors by Department",
+                    x_title="Department", y_title="Vendor Count", hover="%{y:,}", colors=colors),
+        figures.pie(table["DEPARTMENT"], table["value"], fmt.inr(table["value"]),
+                    title="Payment Distribution by Department", colors=colors),
+    )
+
+
+def vendor_chart(vendors, department):
+    # A department's vendor payment pie from queries.department_vendors
+    return figures.pie(vendors.index, vendors["value"], fmt.inr(vendors["value"]),
+                       title=f"Vendor Payment Distribution in {department}", textinfo="percent+label")
+
+
+def jobs(df, filters, department=None):
+    # (key, compute) of the aggregates and charts one view of the department
+    # page shows, in order; a chart reads its aggregate's shared result
+    if department is None:
+        table = key(df, "departments", filters)
+        compute = lambda: queries.departments(df, filters)
+        return [
+            (key(df, "totals", filters), lambda: queries.totals(df, filters)),
+            (table, compute),
+            (key(df, "department_charts", filters),
+             lambda: department_charts(singleflight.do(table, compute, ttl=KEEP))),
+        ]
+    dept_filters = dict(filters, departments=[department])
+    vendors = key(df, "department_vendors", filters, department, scope=dept_filters)
+    compute = lambda: queries.department_vendors(df, department, filters)
+    return [
+        (key(df, "totals", filters, department, scope=dept_filters), lambda: queries.totals(df, dept_filters)),
+        (vendors, compute),
+        (key(df, "vendor_chart", filters, department, scope=dept_filters),
+         lambda: vendor_chart(singleflight.do(vendors, compute, ttl=KEEP), department)),
+    ]
+
+
+def plan(df):
+    # [(grant, filters, department)], most frequent first, then the default
+    # views of everything not seen yet
+    observed = [
+        (_grant(g), _filters(f), d)
+        for g, f, d, _ in telemetry.views("deptt", VIEW_QUERIES, top=MAX_VIEWS)
+    ]
+    defaults = default_filters(df)
+    departments = sorted(df["DEPARTMENT"].dropna().unique().tolist())
+    views = observed + [(access.ALL, defaults, None)] + [(access.ALL, defaults, d) for d in departments]
+    result, done = [], set()
+    for g, filters, department in views:
+        marker = (access.grant_key(g), queries.filter_key(filters), department)
+        if marker not in done:
+            done.add(marker)
+            result.append((g, filters, department))
+    return result
+
+
+def _grant(key):
+    # access.grant_key() back to a grant
+    if key is None:
+        return access.ALL
+    g = {name: list(values) if isinstance(values, tuple) else values for name, values in key}
+    return access.ALL if g == access.ALL else g
+
+
+def _filters(key):
+    # queries.filter_key() back to filters; dates stay strings, which the
+    # queries parse
+    return {name: list(value) if isinstance(value, tuple) else value for name, value in key}
+
+
+def run(df=None):
+    # Precompute the planned views (and the top-vendor index of every slice
+    # involved); returns the number of views
+    df = data_service.bills() if df is None else df
+    views = plan(df)
+    for g, filters, department in views:
+        part = access.restrict(df, g)
+        if len(part) == 0:
+            continue
+        topn.index(part)
+        for k, compute in jobs(part, filters, department):
+            singleflight.do(k, compute, ttl=KEEP)
+    return len(views)
@@ -0,0 +1,147 @@
+import pandas as pd
+import numpy as np
+import rollups
+import parallel
+
+
+# Aggregations behind the department and vendor pages, as plain functions of
+# the bills frame and a filter dict, so the dashboards and the JSON API
+# (api.py) compute the same numbers. Results are frames / dicts of plain
+# values; formatting stays with the caller.
+#
+# Filters (all optional):
+#   departments, bill_types: lists of values
+#   msme: "Yes" / "No"
+#   paid_from, paid_to: PAYMENT_DONE range (anything pd.Timestamp accepts)
+
+QUANTILES = (0.25, 0.5, 0.75, 0.9)
+FAST_DAYS = 10
+# From this many rows the department / vendor tables are built from
+# parallel.py partition partials (faster than groupby even on one worker)
+PARALLEL_MIN_ROWS = 500_000
+
+
+def filter_key(filters):
+    # Hashable, order-independent form of a filter dict (cache / coalescing key)
+    items = []
+    for key, value in sorted((filters or {}).items()):
+        if value is None or (isinstance(value, (list, tuple, set)) and not value):
+            continue
+        items.append((key, tuple(sorted(map(str, value))) if isinstance(value, (list, tuple, set)) else str(value)))
+    return tuple(items)
+
+
+def scope(filters):
+    # Partitions a filtered result can read, as data_service.depends arguments
+    filters = filters or {}
+    result = {}
+    if filters.get("departments"):
+        result["departments"] = list(filters["departments"])
+    if filters.get("paid_to") is not None:
+        # Bills are received before they are paid: nothing from later years
+        paid_to = pd.Timestamp(filters["paid_to"])
+        result["fy_to"] = paid_to.year - (paid_to.month < 4)
+    return result
+
+
+def filter_rows(df, filters=None):
+    filters = filters or {}
+    mask = np.ones(len(df), dtype=bool)
+    if filters.get("departments"):
+        mask &= df["DEPARTMENT"].isin(filters["departments"]).to_numpy()
+    if filters.get("bill_types"):
+        mask &= df["BILLTYPE"].isin(filters["bill_types"]).to_numpy()
+    if filters.get("msme") in ("Yes", "No"):
+        mask &= (df["MSME_VENDOR"] == filters["msme"]).to_numpy()
+    if filters.get("paid_from") is not None:
+        mask &= (df["PAYMENT_DONE"] >= pd.Timestamp(filters["paid_from"])).to_numpy()
+    if filters.get("paid_to") is not None:
+        mask &= (df["PAYMENT_DONE"] <= pd.Timestamp(filters["paid_to"])).to_numpy()
+    return df if mask.all() else df[mask]
+
+
+def departments(df, filters=None):
+    # One row per department: vendors, bills, value and payment-day stats
+    rows = filter_rows(df, filters)
+    if len(rows) >= PARALLEL_MIN_ROWS:
+        return parallel.department_table(rows)
+    grouped = rows.groupby("DEPARTMENT", observed=True)
+    table = grouped.agg(
+        vendors=("VENDORNAME", "nunique"),
+        bills=("BILLVALUE", "size"),
+        value=("BILLVALUE", "sum"),
+        avg_days=("TOTAL_DAYS_for_PAYMENT", "mean"),
+    )
+    days = grouped["TOTAL_DAYS_for_PAYMENT"].quantile(list(QUANTILES)).unstack()
+    days.columns = [f"p{int(q * 100)}_days" for q in QUANTILES]
+    return table.join(days).reset_index()
+
+
+def department_vendors(df, department, filters=None):
+    # One row per vendor of a department: value, average days, bills, payments made
+    rows = filter_rows(df, filters)
+    rows = rows[rows["DEPARTMENT"] == department]
+    if len(rows) >= PARALLEL_MIN_ROWS:
+        return parallel.vendor_table(rows).droplevel("DEPARTMENT")
+    return rows.groupby("VENDORNAME", observed=True).agg(
+        value=("BILLVALUE", "sum"),
+        avg_days=("TOTAL_DAYS_for_PAYMENT", "mean"),
+        bills=("BILLNO", "count"),
+        payments=("PAYMENT_DONE", "count"),
+    ).sort_values("value", ascending=False)
+
+
+def totals(df, filters=None):
+    # Headline numbers of the department page
+    rows = filter_rows(df, filters)
+    return {
+        "vendors": int(rows["VENDORNAME"].nunique()),
+        "bills": int(len(rows)),
+        "value": float(rows["BILLVALUE"].sum()),
+        "avg_days": _float(rows["TOTAL_DAYS_for_PAYMENT"].mean()),
+    }
+
+
+def vendor_summary(df, vendor, filters=None):
+    # KPIs of one vendor: amounts and bills by status, payment-day quantiles
+    rows = filter_rows(df, filters)
+    rows = rows[rows["VENDORNAME"] == vendor]
+    status = rows["STATUS"]
+    days = rows["TOTAL_DAYS_for_PAYMENT"]
+    summary = {
+        "vendor": vendor,
+        "bills": int(len(rows)),
+        "value": float(rows["BILLVALUE"].sum()),
+        "paid_bills": int((status == "Paid").sum()),
+        "paid_value": float(rows["BILLVALUE"][status == "Paid"].sum()),
+        "in_progress_bills": int((status == "In Progress").sum()),
+        "in_progress_value": float(rows["BILLVALUE"][status == "In Progress"].sum()),
+        "fast_payments": int((days <= FAST_DAYS).sum()),
+        "departments": sorted(rows["DEPARTMENT"].dropna().unique().tolist()),
+    }
+    for q in QUANTILES:
+        summary[f"p{int(q * 100)}_days"] = _float(days.quantile(q)) if days.notna().any() else None
+    return summary
+
+
+def trends(df, filters=None, grain="month", by=None, date_col="RECVDATE"):
+    # Bills, value and average payment days per time bucket from the shared
+    # rollups; filters on departments / bill types / MSME map to rollup dims.
+    # The rollups have no payment-date dimension, so a paid_from / paid_to
+    # range is applied to the bills first and those are bucketed directly
+    paid = {key: (filters or {}).get(key) for key in ("paid_from", "paid_to")}
+    if any(value is not None for value in paid.values()):
+        table = rollups.build(filter_rows(df, paid), date_col=date_col, grain=grain)
+    else:
+        table = rollups.rollup(df, date_col=date_col, grain=grain)
+    dims = {}
+    for key, col in (("departments", "DEPARTMENT"), ("bill_types", "BILLTYPE")):
+        if (filters or {}).get(key):
+            dims[col] = filters[key]
+    if (filters or {}).get("msme") in ("Yes", "No"):
+        dims["MSME_VENDOR"] = [filters["msme"]]
+    return rollups.trend(table, dims, by=by)
+
+
+def _float(value):
+    return None if pd.isna(value) else float(value)
@@ -0,0 +1,128 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+
+
+# PO and GRN/SRN reconciliation.
+# Bills are factorised once per dataset version on PONO and on the receipt
+# number (GRNNO, or SRNNO for services). Bills are then stored sorted by
+# (PO, BILLDATE) with the start offset of every PO, so one PO's bills are a
+# slice and the running billed value per PO is a single cumsum. Per-PO and
+# per-receipt totals are bincounts over the codes and are mapped back to the
+# bills with array takes, no merges.
+
+PO = "PONO"
+RECEIPTS = [("GRNNO", "GRNDATE"), ("SRNNO", "SRNDATE")]
+BILL_DATE = "BILLDATE"
+VALUE = "BILLVALUE"
+# Ordered value on the PO when the dump has it
+PO_VALUE = "POVALUE"
+
+
+def _blank(series):
+    return series.isna() | (series.astype(str).str.strip() == "")
+
+
+def _days(values):
+    d = pd.to_datetime(values, errors="coerce").to_numpy().astype("datetime64[D]")
+    return np.where(np.isnat(d), np.nan, d.astype(np.int64).astype(np.float64))
+
+
+def build(df):
+    n = len(df)
+    value = pd.to_numeric(df[VALUE], errors="coerce").fillna(0.0).to_numpy() if VALUE in df.columns else np.zeros(n)
+    bill_day = _days(df[BILL_DATE]) if BILL_DATE in df.columns else np.full(n, np.nan)
+
+    # PO codes, -1 for bills without a PO
+    has_po = ~_blank(df[PO]).to_numpy() if PO in df.columns else np.zeros(n, dtype=bool)
+    po_codes, po_values = pd.factorize(df[PO].where(has_po) if PO in df.columns else pd.Series([np.nan] * n),
+                                       sort=True)
+
+    # First receipt present per bill (GRN before SRN), its date and kind
+    receipt = pd.Series(np.nan, index=df.index, dtype=object)
+    receipt_day = np.full(n, np.nan)
+    kind = np.full(n, "", dtype=object)
+    for no_col, date_col in RECEIPTS:
+        if no_col not in df.columns:
+            continue
+        take = receipt.isna().to_numpy() & ~_blank(df[no_col]).to_numpy()
+        receipt[take] = no_col[:3] + ":" + df[no_col][take].astype(str)
+        if date_col in df.columns:
+            receipt_day[take] = _days(df[date_col])[take]
+        kind[take] = no_col[:3]
+    receipt_codes, receipt_values = pd.factorize(receipt)
+
+    # Sorted by (PO, bill date); PO offsets into the sort order
+    order = np.lexsort((np.nan_to_num(bill_day, nan=np.inf), po_codes))
+    sorted_codes = po_codes[order]
+    starts = np.searchsorted(sorted_codes, np.arange(len(po_values) + 1))
+    on_po = sorted_codes >= 0
+    running = np.cumsum(np.where(on_po, value[order], 0.0))
+    # Subtract the running total reached before each PO's first bill
+    before = np.concatenate([[0.0], running])[starts[np.clip(sorted_codes, 0, None)]]
+    cum_billed = np.full(n, np.nan)
+    cum_billed[order[on_po]] = (running - before)[on_po]
+
+    bills = pd.DataFrame(index=df.index)
+    bills["PO_CODE"] = po_codes.astype(np.int32)
+    bills["CUM_BILLED"] = cum_billed
+    bills["RECEIPT"] = receipt.to_numpy()
+    bills["RECEIPT_KIND"] = kind
+    bills["RECEIPT_TO_BILL_DAYS"] = (bill_day - receipt_day).astype(np.float32)
+    bills["MISSING_RECEIPT"] = has_po & receipt.isna().to_numpy()
+    receipt_bills = np.bincount(receipt_codes[receipt_codes >= 0], minlength=len(receipt_values))
+    bills["RECEIPT_BILLS"] = np.where(receipt_codes >= 0, receipt_bills[np.clip(receipt_codes, 0, None)], 0)
+
+    return {"bills": bills, "po_values": po_values, "order": order, "starts": starts, "value": value}
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached(_df, version):
+    return build(_df)
+
+
+def index(df):
+    # Reconciliation index for the full dataset, built once per version
+    version = versions.dataset_version(df)
+    if version is None:
+        return build(df)
+    return _cached(df, version)
+
+
+def po_summary(idx, df, rows=None):
+    # One row per PO: bills, billed value, bills without receipt, lag stats.
+    # rows limits the bills counted (e.g. the filtered index)
+    bills = idx["bills"] if rows is None else idx["bills"].loc[rows]
+    codes = bills["PO_CODE"].to_numpy()
+    keep = codes >= 0
+    codes = codes[keep]
+    m = len(idx["po_values"])
+    pos = df.index.get_indexer(bills.index[keep])
+    lag = bills["RECEIPT_TO_BILL_DAYS"].to_numpy(dtype=float)[keep]
+    has_lag = ~np.isnan(lag)
+
+    count = np.bincount(codes, minlength=m)
+    summary = pd.DataFrame({
+        PO: idx["po_values"],
+        "Bills": count,
+        "Billed Value": np.bincount(codes, weights=idx["value"][pos], minlength=m),
+        "Missing GRN/SRN": np.bincount(codes, weights=bills["MISSING_RECEIPT"].to_numpy()[keep], minlength=m).astype(int),
+        "Avg Receipt-to-Bill Days": np.bincount(codes[has_lag], weights=lag[has_lag], minlength=m)
+        / np.maximum(np.bincount(codes[has_lag], minlength=m), 1),
+    })
+    summary.loc[np.bincount(codes[has_lag], minlength=m) == 0, "Avg Receipt-to-Bill Days"] = np.nan
+    if PO_VALUE in df.columns:
+        ordered = pd.to_numeric(df[PO_VALUE], errors="coerce").groupby(idx["bills"]["PO_CODE"]).max()
+        summary["PO Value"] = ordered.reindex(np.arange(m)).to_numpy()
+        summary["Over Billed"] = summary["Billed Value"] > summary["PO Value"]
+    return summary[count > 0].reset_index(drop=True)
+
+
+def po_bills(idx, po):
+    # Positions (into df) of one PO's bills in bill-date order: a slice of the index
+    code = idx["po_values"].searchsorted(po)
+    if code >= len(idx["po_values"]) or idx["po_values"][code] != po:
+        return np.array([], dtype=np.int64)
+    return idx["order"][idx["starts"][code]:idx["starts"][code + 1]]
@@ -0,0 +1,124 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import binning
+import calendar_dim
+import versions
+import data_service
+
+
+# Time-bucketed rollups for trend and waterfall charts.
+# Bills are summed once per dataset version into (time bucket x dimensions)
+# rows: bill count, BILLVALUE, and payment-day sum/count/min/max. Charts then
+# filter and group a few hundred rollup rows instead of scanning every bill.
+# Rollups are assembled from one piece per financial year of RECVDATE, cached
+# on that year's partition stamps (data_service.depends), so after a refresh
+# only the years that changed are summed again.
+
+GRAINS = ["day", "week", "month", "fy_quarter", "fy"]
+
+# Financial-year grains group on integer calendar keys and get their
+# "2023-24" / "2023-24 Q1" labels only after aggregation
+FY_GRAINS = {
+    "fy": ("fy", calendar_dim.fy_label),
+    "fy_quarter": ("fy_quarter_key", calendar_dim.fy_quarter_label),
+}
+
+
+def bucket(days, grain):
+    # Bucket of every calendar_dim day number: the period start date, or the
+    # integer FY key
+    days = np.asarray(days)
+    if grain == "day":
+        return calendar_dim.dates(days)
+    if grain == "week":
+        # Day 0 (1970-01-01) was a Thursday; weeks start on Monday
+        return calendar_dim.dates(np.where(days == calendar_dim.MISSING_DAY, days, days - (days + 3) % 7))
+    if grain == "month":
+        return calendar_dim.dates(days).astype("datetime64[M]").astype("datetime64[ns]")
+    if grain in FY_GRAINS:
+        return calendar_dim.day_attribute(days, FY_GRAINS[grain][0])
+    raise ValueError(f"Unknown grain: {grain}")
+
+
+def build(df, date_col="RECVDATE", grain="month", dims=binning.FILTER_DIMS,
+          value="BILLVALUE", days="TOTAL_DAYS_for_PAYMENT"):
+    dims = [d for d in dims if d in df.columns]
+    # From the joined <DATE>_DAY day numbers, no date parsing
+    frame = pd.DataFrame({"bucket": bucket(calendar_dim.days(df, date_col), grain)}, index=df.index)
+    for d in dims:
+        frame[d] = df[d]
+    frame["value"] = pd.to_numeric(df[value], errors="coerce") if value in df.columns else np.nan
+    frame["days"] = pd.to_numeric(df[days], errors="coerce") if days in df.columns else np.nan
+
+    grouped = frame.groupby(["bucket"] + dims, observed=True, dropna=True)
+    table = grouped.agg(
+        bills=("value", "size"),
+        value=("value", "sum"),
+        days_sum=("days", "sum"),
+        days_count=("days", "count"),
+        days_min=("days", "min"),
+        days_max=("days", "max"),
+    ).reset_index()
+    if grain in FY_GRAINS:
+        table["bucket"] = FY_GRAINS[grain][1](table["bucket"]).to_numpy()
+    return table
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _cached(_df, version, date_col, grain, dims, value, days):
+    return assemble(_df, date_col, grain, list(dims), value, days)
+
+
+def assemble(df, date_col="RECVDATE", grain="month", dims=binning.FILTER_DIMS,
+             value="BILLVALUE", days="TOTAL_DAYS_for_PAYMENT"):
+    # build() from per-FY pieces, reusing the pieces of unchanged years
+    by_fy = {}
+    for (fy, _), positions in data_service.partition_rows(df).items():
+        by_fy.setdefault(fy, []).append(positions)
+    pieces = []
+    for fy, positions in sorted(by_fy.items()):
+        token = data_service.depends(df, fy_from=fy, fy_to=fy)
+        pieces.append(_piece(df, np.sort(np.concatenate(positions)), token, fy,
+                             date_col, grain, tuple(dims), value, days))
+    if len(pieces) == 1:
+        return pieces[0]
+    # A bucket can span two years (weeks, or dates other than RECVDATE)
+    keys = ["bucket"] + [d for d in dims if d in df.columns]
+    return pd.concat(pieces, ignore_index=True).groupby(keys, observed=True, dropna=True).agg(
+        bills=("bills", "sum"),
+        value=("value", "sum"),
+        days_sum=("days_sum", "sum"),
+        days_count=("days_count", "sum"),
+        days_min=("days_min", "min"),
+        days_max=("days_max", "max"),
+    ).reset_index()
+
+
+@st.cache_resource(show_spinner=False, max_entries=256)
+def _piece(_df, _positions, token, fy, date_col, grain, dims, value, days):
+    return build(_df.take(_positions), date_col, grain, list(dims), value, days)
+
+
+def rollup(df, date_col="RECVDATE", grain="month", dims=binning.FILTER_DIMS,
+           value="BILLVALUE", days="TOTAL_DAYS_for_PAYMENT"):
+    version = versions.dataset_version(df)
+    if version is None:
+        return build(df, date_col, grain, dims, value, days)
+    return _cached(df, version, date_col, grain, tuple(dims), value, days)
+
+
+def trend(table, filters=None, by=None):
+    # Per-bucket totals of the rows matching filters ({dimension: values}),
+    # optionally split by one more dimension
+    rows = table
+    for dim, selected in (filters or {}).items():
+        if dim in rows.columns:
+            rows = rows[rows[dim].isin(selected)]
+    keys = ["bucket"] + ([by] if by else [])
+    out = rows.groupby(keys, observed=True)[["bills", "value", "days_sum", "days_count"]].sum()
+    out["days_min"] = rows.groupby(keys, observed=True)["days_min"].min()
+    out["days_max"] = rows.groupby(keys, observed=True)["days_max"].max()
+    out["avg_days"] = out["days_sum"] / out["days_count"].replace(0, np.nan)
+    return out.reset_index()
@@ -0,0 +1,24 @@
+import os
+import sys
+from streamlit.web import bootstrap
+import warmup
+
+# Starts the multipage app with the data warm-up already running in the server
+# process, so the bills and indexes are built before (or while) the first
+# session connects: python run.py [--server.port 8501 ...]
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def flag_options(argv):
+    # "--server.port 8502" -> {"server_port": 8502}, as `streamlit run` passes them
+    options = {}
+    for key, value in zip(argv[::2], argv[1::2]):
+        options[key.lstrip("-").replace(".", "_")] = int(value) if value.isdigit() else value
+    return options
+
+
+if __name__ == "__main__":
+    warmup.start()
+    options = flag_options(sys.argv[1:])
+    bootstrap.load_config_options(options)
+    bootstrap.run(APP, False, [], options)
@@ -0,0 +1,119 @@
+import pandas as pd
+import numpy as np
+import stages
+
+
+# Helpers for the demo datasets the dashboards generate when no dump is loaded
+
+# Approval rounds that many bills never go through
+OPTIONAL_STAGES = {
+    "FH_APP_DATE", "SPOC_RECV_AFTER_FH_APP", "SPOC_RECV_FOR_UH_APP", "UH_APP_DATE",
+    "SPOC_RECV_AFTER_UH_APP", "HR_RECV_DATE", "HR_APP_DATE", "SPOC_RECV_AFTER_HR_APP",
+}
+
+APPROVERS = [f"Approver{i}" for i in range(1, 13)]
+
+
+def workflow_dates(df, open_bill, max_step=5):
+    # Fill the pipeline date columns: each stage 0-max_step days after the one
+    # before, optional approvals skipped for about half the bills, and open
+    # bills stopping somewhere before PAYMENT_DONE. Starts from RECVDATE.
+    n = len(df)
+    open_bill = np.asarray(open_bill, dtype=bool)
+    stop_at = np.where(open_bill, np.random.randint(1, len(stages.PIPELINE), n), len(stages.PIPELINE))
+    current = pd.to_datetime(df["RECVDATE"])
+    for j, (col, _) in enumerate(stages.PIPELINE[1:], start=1):
+        current = current + pd.to_timedelta(np.random.randint(0, max_step + 1, n), unit="D")
+        skipped = (np.random.rand(n) < 0.5) if col in OPTIONAL_STAGES else np.zeros(n, dtype=bool)
+        df[col] = current.where(~skipped & (j < stop_at))
+
+    df["ACTIONBY"] = np.random.choice(APPROVERS, n)
+    df["ACTIONDATE"] = df[[col for col, _ in stages.PIPELINE]].max(axis=1)
+    return df
+
+
+HOLD_REMARKS = [
+    "GST number mismatch", "GST Number mismatch.", "PO not released", "po not  released",
+    "Awaiting GRN", "awaiting grn", "TDS certificate pending", "Bank details missing",
+    "Duplicate invoice", "Amount mismatch with PO",
+]
+
+
+def hold_columns(df, rate=0.2):
+    # TAXATION/INVOICE/PAYMENT hold date, remark and days for about `rate` of
+    # the bills that reached each stage. Remarks come with the spelling and
+    # spacing variants real dumps have.
+    n = len(df)
+    for prefix, start in (("TAXATION", "TAXATION_RECV_DATE"), ("INVOICE", "RECV_FOR_INV_PROCESS"),
+                          ("PAYMENT", "RECV_FOR_PAYMENT")):
+        reached = pd.to_datetime(df[start]) if start in df.columns else pd.Series(pd.NaT, index=df.index)
+        held = reached.notna() & (np.random.rand(n) < rate)
+        days = np.random.randint(1, 16, n)
+        df[f"{prefix}_HOLD_DATE"] = reached.where(held)
+        df[f"{prefix}_HOLD_REMARK"] = pd.Series(np.random.choice(HOLD_REMARKS, n), index=df.index).where(held)
+        df[f"{prefix}_HOLD_DAYS"] = pd.Series(days, index=df.index).where(held)
+    return df
+
+
+DEPARTMENTS = ["Finance", "HR", "IT", "Operations", "Procurement", "Marketing"]
+BILL_TYPES = {"A": "Goods", "B": "Services", "C": "Consulting", "D": "Maintenance"}
+
+
+def generate(n=2000, vendors=80, seed=42):
+    # Demo bills in the dump's schema: workflow dates, holds, GRN/SRN
+    # receipts, a few resubmitted (duplicate) bills and cancellations
+    np.random.seed(seed)
+    vendor_no = np.random.randint(0, vendors, n)
+    msme = np.random.choice(["Yes", "No"], vendors, p=[0.6, 0.4])
+    type_code = np.random.choice(list(BILL_TYPES), n)
+    recv = pd.Timestamp("2021-04-01") + pd.to_timedelta(np.random.randint(0, 1000, n), unit="D")
+
+    df = pd.DataFrame({
+        "TRACKINGNO": [f"TRK{100000 + i}" for i in range(n)],
+        "DOCUMENT_ID": [f"DOC{200000 + i}" for i in range(n)],
+        "RECVDATE": recv,
+        "VENDORID": np.array([f"V{3000 + v}" for v in range(vendors)])[vendor_no],
+        "VENDORNAME": np.array([f"Vendor {v + 1}" for v in range(vendors)])[vendor_no],
+        "MSME_VENDOR": msme[vendor_no],
+        "BILLTYPECODE": type_code,
+        "BILLTYPE": pd.Series(type_code).map(BILL_TYPES).to_numpy(),
+        "UNIT_ID": np.random.choice(["Unit1", "Unit2", "Unit3"], n),
+        "BILLNO": [f"BL-{4000 + i:05d}" for i in range(n)],
+        "BILLDATE": recv - pd.to_timedelta(np.random.randint(0, 10, n), unit="D"),
+        "INITIATOR": np.random.choice([f"User{i}" for i in range(1, 31)], n),
+        # About four bills per purchase order
+        "PONO": [f"PO{5000 + i // 4}" for i in np.random.permutation(n)],
+        "BILLVALUE": np.random.lognormal(10, 1, n).round(2),
+        "REMARK": np.random.choice(["", "Urgent", "Review needed", "Complete"], n),
+        "DEPARTMENT": np.random.choice(DEPARTMENTS, n),
+        "CATEGORY": np.random.choice(["Category1", "Category2", "Category3"], n),
+    })
+    df["DEPT_ID"] = df["DEPARTMENT"].map({d: f"D{i + 1:02d}" for i, d in enumerate(DEPARTMENTS)})
+
+    # Goods are received against a GRN, services against an SRN; some have neither
+    receipt_date = df["BILLDATE"] - pd.to_timedelta(np.random.randint(0, 20, n), unit="D")
+    has_receipt = np.random.rand(n) < 0.9
+    goods = (df["BILLTYPE"] != "Services").to_numpy()
+    df["GRNNO"] = pd.Series([f"GRN{6000 + i}" for i in range(n)]).where(goods & has_receipt)
+    df["GRNDATE"] = receipt_date.where(goods & has_receipt)
+    df["SRNNO"] = pd.Series([f"SRN{7000 + i}" for i in range(n)]).where(~goods & has_receipt)
+    df["SRNDATE"] = receipt_date.where(~goods & has_receipt)
+
+    # A few bills submitted twice, with the bill number typed differently
+    resubmitted = df.sample(max(n // 100, 1)).copy()
+    resubmitted["TRACKINGNO"] = [f"TRK{900000 + i}" for i in range(len(resubmitted))]
+    resubmitted["BILLNO"] = resubmitted["BILLNO"].str.replace("-", "").str.lower()
+    df = pd.concat([df, resubmitted], ignore_index=True)
+    n = len(df)
+
+    df = workflow_dates(df, open_bill=np.random.rand(n) < 0.35)
+    df = hold_columns(df)
+
+    # The resubmitted copies and a few others were cancelled after submission
+    cancelled = (df.index >= n - len(resubmitted)) | (np.random.rand(n) < 0.03)
+    df["CANCELDATE"] = (df["RECVDATE"] + pd.to_timedelta(np.random.randint(1, 30, n), unit="D")).where(cancelled)
+    df["CANCELEDBY"] = pd.Series(np.random.choice(APPROVERS, n), index=df.index).where(cancelled)
+
+    df["STATUS"] = np.select([cancelled, df["PAYMENT_DONE"].notna().to_numpy()], ["Cancelled", "Paid"], "In Progress")
+    df["TOTAL_DAYS_for_PAYMENT"] = (df["PAYMENT_DONE"] - df["RECVDATE"]).dt.days
+    return df
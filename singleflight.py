@@ -0,0 +1,80 @@
+import threading
+import time
+import versions
+import data_service
+
+
+# Single-flight execution for page computations.
+# Streamlit runs each session's script in its own thread, so at month-end
+# many sessions ask for the same aggregate at the same moment. do(key, fn)
+# runs fn for the first caller; callers with the same key arriving while it
+# runs wait for it and get the same result (or exception). With ttl the
+# result is also kept that many seconds, so a burst landing just after the
+# computation finished is still served from it. Shared results are read-only.
+# Nothing is kept when fn fails. If the first caller is interrupted instead
+# (a BaseException such as Streamlit stopping or rerunning its script), the
+# waiting callers are not: one of them runs fn again.
+
+_lock = threading.Lock()
+_calls = {}
+_recent = {}
+
+# Computations run vs. requests served from another caller's computation
+stats = {"computed": 0, "shared": 0}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def key(df, name, *args, scope=None):
+    # Key of a computation over df: dataset version, name and arguments. With
+    # scope (data_service.depends arguments) the version is replaced by the
+    # stamps of the partitions read, so unrelated refreshes keep the key.
+    version = versions.dataset_version(df) if scope is None else data_service.depends(df, **scope)
+    return (version, name) + args
+
+
+def do(key, fn, ttl=0.0):
+    while True:
+        now = time.monotonic()
+        with _lock:
+            recent = _recent.get(key)
+            if recent is not None and recent[0] > now:
+                stats["shared"] += 1
+                return recent[1]
+            call = _calls.get(key)
+            leader = call is None
+            if leader:
+                call = _calls[key] = _Call()
+            else:
+                stats["shared"] += 1
+
+        if leader:
+            break
+        call.done.wait()
+        if call.error is None:
+            return call.result
+        if isinstance(call.error, Exception):
+            raise call.error
+        # The first caller was interrupted, not failed: go again
+
+    try:
+        call.result = fn()
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            del _calls[key]
+            stats["computed"] += 1
+            if call.error is None and ttl > 0:
+                now = time.monotonic()
+                for stale in [k for k, (expires, _) in _recent.items() if expires <= now]:
+                    del _recent[stale]
+                _recent[key] = (now + ttl, call.result)
+        call.done.set()
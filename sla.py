@@ -0,0 +1,227 @@
+import threading
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+
+
+# Payment SLA / MSME 45-day compliance.
+# Every bill gets a due date from the first matching rule and one status:
+# paid on time, paid late, open, open at risk (due within AT_RISK_DAYS) or
+# open and breaching. Per department/vendor status counts are kept in a state
+# that is updated incrementally on refresh: only bills whose key fields
+# changed are re-classified, and moving the as-of date only re-counts the
+# open bills that crossed a due or at-risk boundary.
+
+# Evaluated in order, first match wins; a rule without "column" matches all
+RULES = [
+    {"name": "MSME 45 days", "column": "MSME_VENDOR", "values": ["Yes", "MSME"], "days": 45},
+    {"name": "Standard 90 days", "days": 90},
+]
+
+START = "RECVDATE"
+PAID = "PAYMENT_DONE"
+KEY = "TRACKINGNO"
+GROUPS = ["DEPARTMENT", "VENDORNAME"]
+AT_RISK_DAYS = 7
+
+STATUSES = ["Paid on time", "Paid late", "Open", "At risk", "Breaching"]
+PAID_ON_TIME, PAID_LATE, OPEN, AT_RISK, BREACHING = range(len(STATUSES))
+
+# Columns whose change means a bill has to be re-classified
+TRACKED = [START, PAID, "MSME_VENDOR", "BILLVALUE", "CANCELDATE"] + GROUPS
+
+
+def _days(values):
+    d = pd.to_datetime(values, errors="coerce").to_numpy().astype("datetime64[D]")
+    return np.where(np.isnat(d), np.nan, d.astype(np.int64).astype(np.float64))
+
+
+def due_days(df, rules=RULES):
+    # (rule index, SLA days) per bill
+    masks, days = [], []
+    for rule in rules:
+        if "column" in rule and rule["column"] in df.columns:
+            masks.append(df[rule["column"]].isin(rule["values"]).to_numpy())
+        elif "column" not in rule:
+            masks.append(np.ones(len(df), dtype=bool))
+        else:
+            masks.append(np.zeros(len(df), dtype=bool))
+        days.append(rule["days"])
+    rule_index = np.select(masks, np.arange(len(rules)), -1)
+    return rule_index, np.where(rule_index >= 0, np.asarray(days)[np.clip(rule_index, 0, None)], np.nan)
+
+
+def status(due, paid, as_of, at_risk_days=AT_RISK_DAYS):
+    # Vectorised status codes; -1 where there is no due date
+    is_paid = ~np.isnan(paid)
+    out = np.select(
+        [np.isnan(due), is_paid & (paid <= due), is_paid, as_of > due, as_of > due - at_risk_days],
+        [-1, PAID_ON_TIME, PAID_LATE, BREACHING, AT_RISK],
+        OPEN,
+    )
+    return out.astype(np.int8)
+
+
+def classify(df, as_of, rules=RULES):
+    # Per-bill SLA frame indexed like df
+    rule_index, sla = due_days(df, rules)
+    due = _days(df[START]) + sla if START in df.columns else np.full(len(df), np.nan)
+    paid = _days(df[PAID]) if PAID in df.columns else np.full(len(df), np.nan)
+    if "CANCELDATE" in df.columns:
+        due[df["CANCELDATE"].notna().to_numpy()] = np.nan
+
+    out = pd.DataFrame(index=df.index)
+    for col in GROUPS:
+        out[col] = df[col].to_numpy() if col in df.columns else "All"
+    out["rule"] = rule_index.astype(np.int8)
+    out["due"] = due
+    out["paid"] = paid
+    out["value"] = pd.to_numeric(df["BILLVALUE"], errors="coerce").to_numpy() if "BILLVALUE" in df.columns else 0.0
+    out["status"] = status(due, paid, as_of)
+    return out
+
+
+def as_of_day(df):
+    # Latest date in the data: the snapshot's "today"
+    days = [np.nanmax(_days(df[c])) for c in (START, PAID, "ACTIONDATE") if c in df.columns and df[c].notna().any()]
+    return float(max(days)) if days else float(np.datetime64("today", "D").astype(np.int64))
+
+
+def _fingerprint(df):
+    cols = [c for c in TRACKED if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+def _count(bills):
+    # Status counts and amounts per group and rule; only the (group, rule)
+    # combinations that have bills, not their cartesian product
+    known = bills[bills["status"] >= 0]
+    grouped = known.groupby(GROUPS + ["rule", "status"], dropna=False)
+    counts = grouped.size().unstack(fill_value=0)
+    amounts = grouped["value"].sum().unstack(fill_value=0.0)
+    counts = counts.reindex(columns=range(len(STATUSES)), fill_value=0)
+    amounts = amounts.reindex(columns=range(len(STATUSES)), fill_value=0.0)
+    counts.columns = STATUSES
+    amounts.columns = [f"{c} amount" for c in STATUSES]
+    return pd.concat([counts, amounts], axis=1)
+
+
+def _apply(counts, rows, sign):
+    # Add (sign=1) or remove (sign=-1) the rows' contributions to counts
+    rows = rows[rows["status"] >= 0]
+    if rows.empty:
+        return counts
+    delta = _count(rows) * sign
+    return counts.add(delta, fill_value=0)
+
+
+def new_state():
+    return {"version": None, "as_of": None, "bills": None, "fingerprint": None, "counts": None,
+            "lock": threading.Lock()}
+
+
+def refresh(state, df, as_of=None, rules=RULES):
+    as_of = as_of_day(df) if as_of is None else float(np.datetime64(pd.Timestamp(as_of), "D").astype(np.int64))
+    keys = df[KEY] if KEY in df.columns else pd.Series(df.index, index=df.index)
+    keyed = df.set_axis(pd.Index(keys, name=KEY))
+    keyed = keyed[~keyed.index.duplicated(keep="last")]
+    fingerprint = pd.Series(_fingerprint(keyed), index=keyed.index)
+
+    if state["bills"] is None:
+        state["bills"] = classify(keyed, as_of, rules)
+        state["counts"] = _count(state["bills"])
+    else:
+        bills, counts = state["bills"], state["counts"]
+        old = state["fingerprint"]
+
+        # Bills that disappeared or whose tracked fields changed
+        removed = old.index.difference(fingerprint.index)
+        common = fingerprint.index.intersection(old.index)
+        changed = common[fingerprint[common].to_numpy() != old[common].to_numpy()]
+        added = fingerprint.index.difference(old.index)
+
+        stale = removed.append(changed)
+        counts = _apply(counts, bills.loc[stale], -1)
+        bills = bills.drop(stale)
+
+        # Open bills crossing a due / at-risk boundary because as-of moved
+        if as_of != state["as_of"]:
+            open_rows = bills[np.isnan(bills["paid"].to_numpy()) & (bills["status"] >= 0)]
+            new_status = status(open_rows["due"].to_numpy(), open_rows["paid"].to_numpy(), as_of)
+            moved = open_rows[new_status != open_rows["status"].to_numpy()]
+            if len(moved):
+                counts = _apply(counts, moved, -1)
+                bills.loc[moved.index, "status"] = new_status[new_status != open_rows["status"].to_numpy()]
+                counts = _apply(counts, bills.loc[moved.index], 1)
+
+        fresh = classify(keyed.loc[changed.append(added)], as_of, rules)
+        counts = _apply(counts, fresh, 1)
+        state["bills"] = pd.concat([bills, fresh])
+        state["counts"] = counts
+
+    state["fingerprint"] = fingerprint
+    state["as_of"] = as_of
+    return state
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _shared_state(scope):
+    return new_state()
+
+
+def current(df):
+    # SLA snapshot of df. The maintained state is kept per scope (all bills,
+    # or one access grant's slice) and brought up to date when that scope's
+    # dataset version changes; callers get its frames as they were under the
+    # lock, which later refreshes replace instead of modifying.
+    state = _shared_state(df.attrs.get("grant"))
+    version = versions.dataset_version(df)
+    with state["lock"]:
+        if version is None or state["version"] != version:
+            refresh(state, df)
+            state["version"] = version
+        return {key: state[key] for key in ("version", "as_of", "bills", "counts")}
+
+
+def restrict(state, df):
+    # The snapshot limited to the bills of df, a filtered subset of the frame
+    # it was built from; counts are re-derived from those bills only
+    keys = df[KEY] if KEY in df.columns else df.index
+    bills = state["bills"][state["bills"].index.isin(keys)]
+    return dict(state, bills=bills, counts=_count(bills))
+
+
+def rule_index(name):
+    return next(i for i, rule in enumerate(RULES) if rule["name"] == name)
+
+
+def breach_table(state, by="DEPARTMENT", groups=None, rule=None):
+    # Status counts/amounts per department or vendor, optionally limited to
+    # some values of `by` and one rule; read from the maintained counts, no bill scan
+    counts = state["counts"]
+    if rule is not None:
+        counts = counts[counts.index.get_level_values("rule") == rule_index(rule)]
+    table = counts.groupby(level=by).sum()
+    if groups is not None:
+        table = table[table.index.isin(groups)]
+    return table
+
+
+def at_risk(state, n=20, statuses=(AT_RISK, BREACHING), groups=None, by="DEPARTMENT", rule=None):
+    # Open bills at risk / breaching, most overdue first
+    bills = state["bills"]
+    rows = bills[bills["status"].isin(statuses)]
+    if rule is not None:
+        rows = rows[rows["rule"] == rule_index(rule)]
+    if groups is not None:
+        rows = rows[rows[by].isin(groups)]
+    rows = rows.nsmallest(n, "due")
+    out = rows[GROUPS + ["value"]].copy()
+    out["Due"] = pd.to_datetime(rows["due"], unit="D")
+    # At-risk bills are not overdue yet: days left until due instead
+    out["Days Overdue"] = (state["as_of"] - rows["due"]).clip(lower=0)
+    out["Days Left"] = (rows["due"] - state["as_of"]).clip(lower=0)
+    out["Status"] = np.asarray(STATUSES)[rows["status"].to_numpy()]
+    out["Rule"] = [RULES[i]["name"] for i in rows["rule"]]
+    return out
@@ -0,0 +1,102 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import versions
+import calendar_dim
+
+
+# Stage durations computed from the workflow timestamps.
+# Every date column of the approval pipeline is turned into integer day
+# numbers in one datetime64 matrix. For each stage the duration is counted
+# from the last stage the bill actually passed through, so skipped stages
+# (no UH/HR approval, ...) do not produce gaps and missing dates stay missing.
+
+# (date column, stage name) in workflow order
+PIPELINE = [
+    ("RECVDATE", "Received"),
+    ("BD_RECEIVING_DATE", "BD"),
+    ("SPOC_RECEIVING_DATE", "SPOC"),
+    ("USER_RECEIVING_DATE", "User"),
+    ("HOD_APP_DATE", "HOD approval"),
+    ("FH_APP_DATE", "FH approval"),
+    ("SPOC_RECV_AFTER_FH_APP", "SPOC after FH"),
+    ("SPOC_RECV_FOR_UH_APP", "SPOC for UH"),
+    ("UH_APP_DATE", "UH approval"),
+    ("SPOC_RECV_AFTER_UH_APP", "SPOC after UH"),
+    ("HR_RECV_DATE", "HR received"),
+    ("HR_APP_DATE", "HR approval"),
+    ("SPOC_RECV_AFTER_HR_APP", "SPOC after HR"),
+    ("TAXATION_RECV_DATE", "Taxation received"),
+    ("TAXATION_APP_DATE", "Taxation approval"),
+    ("RECV_FOR_INV_PROCESS", "Invoice processing"),
+    ("INVOICE_PROCESSED_DATE", "Invoice processed"),
+    ("RECV_FOR_PAYMENT", "Payment received"),
+    ("PAYMENT_DONE", "Payment done"),
+]
+
+TOTAL = "Total"
+
+
+def day_matrix(df, columns):
+    # (rows x stages) int64 day numbers and the matching missing mask
+    days = np.empty((len(df), len(columns)), dtype=np.int64)
+    for j, col in enumerate(columns):
+        # Joined <DATE>_DAY day numbers when present
+        days[:, j] = calendar_dim.days(df, col)
+    missing = days == calendar_dim.MISSING_DAY
+    return days, missing
+
+
+def compute(df, pipeline=PIPELINE):
+    # float32 frame of stage durations (days), one column per reached stage
+    # plus TOTAL (first to last recorded date). NaN where a stage has no date.
+    present = [(col, name) for col, name in pipeline if col in df.columns]
+    if len(present) < 2:
+        return pd.DataFrame(index=df.index)
+    columns = [col for col, _ in present]
+    days, missing = day_matrix(df, columns)
+    n, k = days.shape
+
+    # Column of the last recorded stage at or before each position
+    last = np.where(missing, -1, np.arange(k))
+    last = np.maximum.accumulate(last, axis=1)
+    prev = np.concatenate([np.full((n, 1), -1), last[:, :-1]], axis=1)
+
+    prev_days = np.take_along_axis(days, np.clip(prev, 0, None), axis=1)
+    durations = (days - prev_days).astype(np.float32)
+    # Nothing to measure from, no date, or dates out of order
+    durations[(prev < 0) | missing | (durations < 0)] = np.nan
+
+    first = np.where(missing[:, 0], np.nan, days[:, 0].astype(np.float64))
+    end = np.take_along_axis(days, np.clip(last[:, -1:], 0, None), axis=1)[:, 0]
+    total = np.where(last[:, -1] > 0, end - first, np.nan).astype(np.float32)
+
+    result = pd.DataFrame(durations[:, 1:], index=df.index, columns=[name for _, name in present[1:]])
+    result[TOTAL] = total
+    return result
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached(_df, version):
+    return compute(_df)
+
+
+def durations(df):
+    # Stage durations for the full dataset, computed once per dataset version
+    version = versions.dataset_version(df)
+    if version is None:
+        return compute(df)
+    return _cached(df, version)
+
+
+def stage_means(result):
+    # Average days per stage, stages nobody reached left out
+    return result.drop(columns=TOTAL, errors="ignore").mean().dropna()
+
+
+def percentiles(result, keys, qs=(0.5, 0.9)):
+    # Per-group stage percentiles: index (group, quantile), one column per stage.
+    # keys is any column aligned with result (DEPARTMENT, VENDORNAME, FY, ...)
+    keys = pd.Series(np.asarray(keys), index=result.index, name=getattr(keys, "name", None))
+    return result.groupby(keys, observed=True).quantile(list(qs))
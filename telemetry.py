@@ -0,0 +1,178 @@
+import atexit
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+
+# Query telemetry.
+# Pages and the API record what was asked (page, query name, filter
+# signature, department / vendor, the user's access grant), how long it took
+# and how many rows it read and returned. Recording is an append to an
+# in-memory buffer; a background thread writes the buffer to a local SQLite
+# file every few seconds. Only SAMPLE_RATE of the queries are kept, each
+# weighted 1 / SAMPLE_RATE, so counts estimate real usage at a fraction of
+# the writes.
+#
+#   python telemetry.py [--days 7] [--top 20]
+#
+# prints the most frequent and the slowest queries; precompute.py reads the
+# most opened department views from the same store.
+
+STORE_ENV = "BILLS_TELEMETRY"
+DEFAULT_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telemetry.db")
+SAMPLE_RATE = float(os.environ.get("BILLS_TELEMETRY_SAMPLE", "0.2"))
+FLUSH_SECONDS = 5
+
+COLUMNS = ["at", "page", "name", "access", "filters", "department", "vendor", "rows", "result_rows", "ms", "weight"]
+
+_lock = threading.Lock()
+_buffer = []
+_writer = None
+
+
+def store():
+    return os.environ.get(STORE_ENV, DEFAULT_STORE)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS queries ({', '.join(COLUMNS)})")
+    conn.execute("CREATE INDEX IF NOT EXISTS queries_page_name ON queries (page, name, at)")
+    return conn
+
+
+def signature(key):
+    # JSON of a hashable filter / grant key (queries.filter_key, access.grant_key)
+    return json.dumps(key, default=str)
+
+
+def record(page, name, filter_key=(), ms=None, rows=None, result_rows=None,
+           department=None, vendor=None, grant_key=None, rate=None):
+    # Queue one query, if sampled
+    rate = SAMPLE_RATE if rate is None else rate
+    if rate <= 0 or random.random() >= rate:
+        return
+    row = (time.time(), page, name, signature(grant_key), signature(filter_key), department, vendor,
+           rows, result_rows, ms, 1 / rate)
+    global _writer
+    with _lock:
+        _buffer.append(row)
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="telemetry", daemon=True)
+            _writer.start()
+
+
+def result_rows(result):
+    # Rows in a query result: frame / series length, 1 for a scalar or dict
+    return len(result) if hasattr(result, "shape") else 1
+
+
+def flush():
+    with _lock:
+        rows = _buffer[:]
+        del _buffer[:]
+    if not rows:
+        return 0
+    conn = _connect(store())
+    try:
+        with conn:
+            conn.executemany(f"INSERT INTO queries VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def _write_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except sqlite3.Error:
+            # Telemetry must never break a page; the rows are dropped
+            pass
+
+
+atexit.register(lambda: flush() if _buffer else None)
+
+
+def load(days=None, page=None, path=None):
+    # Recorded queries as a frame, optionally only the last `days` / one page
+    path = path or store()
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COLUMNS)
+    sql, params = "SELECT * FROM queries WHERE 1 = 1", []
+    if days is not None:
+        sql += " AND at >= ?"
+        params.append(time.time() - days * 86400)
+    if page is not None:
+        sql += " AND page = ?"
+        params.append(page)
+    conn = _connect(path)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+SIGNATURE = ["page", "name", "filters", "department", "vendor"]
+
+
+def frequent(queries, top=20):
+    # Estimated count and latency per query signature, most frequent first
+    if queries.empty:
+        return pd.DataFrame(columns=SIGNATURE + ["count", "avg_ms", "p95_ms", "avg_rows"])
+    grouped = queries.fillna({"department": "", "vendor": ""}).groupby(SIGNATURE)
+    table = pd.DataFrame({
+        "count": grouped["weight"].sum(),
+        "avg_ms": grouped["ms"].mean(),
+        "p95_ms": grouped["ms"].quantile(0.95),
+        "avg_rows": grouped["rows"].mean(),
+    })
+    return table.sort_values("count", ascending=False).head(top).reset_index()
+
+
+def slowest(queries, top=20):
+    # Signatures by 95th percentile latency, slowest first
+    return frequent(queries, top=len(queries) or 1).sort_values("p95_ms", ascending=False).head(top)
+
+
+def views(page, names, days=30, top=50):
+    # [(grant key, filter key, department, count)] of the most frequent views
+    # of a page, a view being identified by the queries named `names`
+    queries = load(days=days, page=page)
+    queries = queries[queries["name"].isin(names)]
+    if queries.empty:
+        return []
+    counts = queries.fillna({"department": ""}).groupby(["access", "filters", "department"])["weight"].sum()
+    return [
+        (_key(g), _key(f), d or None, count)
+        for (g, f, d), count in counts.sort_values(ascending=False).head(top).items()
+    ]
+
+
+def _key(text):
+    # signature() back to the nested tuples it was made from
+    def tuples(value):
+        return tuple(tuples(v) for v in value) if isinstance(value, list) else value
+    return tuples(json.loads(text))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Most frequent and slowest dashboard queries")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    recorded = load(days=args.days)
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_colwidth", 80)
+    print(f"{len(recorded):,} sampled queries in the last {args.days:g} days ({store()})\n")
+    print("Most frequent")
+    print(frequent(recorded, args.top).to_string(index=False))
+    print("\nSlowest (95th percentile)")
+    print(slowest(recorded, args.top).to_string(index=False))
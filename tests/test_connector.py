@@ -0,0 +1,68 @@
+import sqlite3
+import pandas as pd
+import pytest
+import connector
+
+
+def _source(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS BILLS (TRACKINGNO TEXT, RECVDATE TEXT, ACTIONDATE TEXT, BILLVALUE REAL)")
+    conn.executemany("INSERT INTO BILLS VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_sync_picks_up_bills_added_later_on_the_watermark_day(tmp_path):
+    source, store = str(tmp_path / "source.db"), str(tmp_path / "bills.parquet")
+    pool = connector.sqlite_pool(source)
+    _source(source, [("T1", "2024-01-01", "2024-01-01", 10.0), ("T2", "2024-01-02", "2024-01-02", 20.0)])
+    assert connector.sync(pool, store) == 2
+    assert connector.load_state(store)["watermark"] == "2024-01-02"
+
+    _source(source, [("T3", "2024-01-02", "2024-01-02", 30.0)])
+    assert connector.sync(pool, store) > 0
+    assert sorted(pd.read_parquet(store)["TRACKINGNO"]) == ["T1", "T2", "T3"]
+
+    # Nothing new: no new version of the store
+    assert connector.sync(pool, store) == 0
+
+
+def test_old_timestamp_watermark_is_read_as_its_day():
+    assert connector.watermark("2024-01-02 00:00:00") == "2024-01-02"
+
+
+class _Conn:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_closes_connection_of_abandoned_generator():
+    made = []
+    pool = connector.Pool(lambda: made.append(_Conn()) or made[-1], size=1)
+
+    def rows():
+        with pool.connection():
+            yield 1
+            yield 2
+
+    gen = rows()
+    next(gen)
+    gen.close()
+    assert made[0].closed
+    # The slot was released: the next caller gets a connection
+    with pool.connection() as conn:
+        assert conn is made[1]
+
+
+def test_pool_reuses_connection_after_clean_exit():
+    pool = connector.Pool(_Conn, size=1)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError
+    assert first.closed
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+import fmt
+
+
+@pytest.mark.parametrize("value, expected", [
+    (99_999.99, "₹99,999.99"),
+    (99_999.999, "₹1 Lakh"),
+    (1e5, "₹1 Lakh"),
+    (12_34_567, "₹12.35 Lakh"),
+    (99_99_999.99, "₹1 Crore"),
+    (99_99_999.999, "₹1 Crore"),
+    (1e7, "₹1 Crore"),
+    (-99_999.999, "-₹1 Lakh"),
+    (0.004, "₹0"),
+    (np.nan, fmt.MISSING),
+    (np.inf, fmt.MISSING),
+])
+def test_inr_short_picks_the_unit_after_rounding(value, expected):
+    assert fmt.inr_short(value) == expected
+
+
+def test_inr_short_whole_units():
+    assert fmt.inr_short(99_999.6, decimals=0) == "₹1 Lakh"
+    assert fmt.inr_short(99_999.4, decimals=0) == "₹99,999"
+
+
+def test_values_beyond_int64_cents_keep_their_digits():
+    assert fmt.inr(1e17) == "₹1,00,00,00,00,00,00,00,000.00"
+    assert fmt.inr(-1e20) == "-₹10,00,00,00,00,00,00,00,00,000.00"
+    assert fmt.number(pd.Series([9.3e16, 1.0])).tolist() == ["93,00,00,00,00,00,00,000", "1"]
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import forecast
+import sample_data
+import stages
+
+
+def _bills(n=600, seed=0):
+    np.random.seed(seed)
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "DEPARTMENT": rng.choice(["HR", "IT"], n),
+        "VENDORNAME": rng.choice(["V1", "V2", "V3"], n),
+        "BILLTYPE": rng.choice(["Service", "Goods"], n),
+        "RECVDATE": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 200, n), unit="D"),
+    })
+    return sample_data.workflow_dates(df, rng.random(n) < 0.3)
+
+
+def test_open_bills_are_scored():
+    df = _bills()
+    scored = forecast.predictions(df)
+    is_open = df["PAYMENT_DONE"].isna() & df[[c for c, _ in stages.PIPELINE[:-1]]].notna().any(axis=1)
+    assert scored.loc[is_open, "REMAINING_DAYS"].notna().all()
+    assert scored.loc[~is_open, "REMAINING_DAYS"].isna().all()
+    assert scored.attrs["unmapped"] == 0
+
+
+def test_free_text_pendingfor_does_not_change_the_forecast():
+    df = _bills()
+    plain = forecast.predictions(df)
+    labelled = forecast.predictions(df.assign(PENDINGFOR=np.where(df["PAYMENT_DONE"].isna(), "With HOD for sign-off", None)))
+    assert labelled["REMAINING_DAYS"].notna().sum() > 0
+    pd.testing.assert_series_equal(plain["REMAINING_DAYS"], labelled["REMAINING_DAYS"])
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import benchmark
+import calendar_dim
+import data_service
+import parallel
+import sample_data
+
+
+@pytest.fixture(scope="module")
+def bills():
+    df = sample_data.generate(n=3000, vendors=60)
+    return calendar_dim.join(data_service.canonical(df), data_service.CALENDAR_COLUMNS)
+
+
+@pytest.fixture(params=[(1, "thread"), (3, "thread"), (3, "process")])
+def workers(request, monkeypatch):
+    count, mode = request.param
+    monkeypatch.setattr(parallel, "WORKERS", count)
+    return mode
+
+
+def _numbers(frame):
+    return frame.select_dtypes("number").to_numpy(dtype=float)
+
+
+@pytest.mark.parametrize("by", ["row", "fy"])
+def test_department_table_matches_pandas(bills, workers, by):
+    expected = benchmark.pandas_departments(bills)
+    result = parallel.department_table(bills, by=by, mode=workers)
+    assert list(result["DEPARTMENT"]) == list(expected["DEPARTMENT"])
+    assert np.allclose(_numbers(result), _numbers(expected), equal_nan=True)
+
+
+def test_vendor_table_matches_pandas(bills, workers):
+    expected = benchmark.pandas_vendors(bills)
+    result = parallel.vendor_table(bills, mode=workers).loc[expected.index]
+    assert np.allclose(_numbers(result), _numbers(expected), equal_nan=True)
+
+
+def test_stage_means_match_pandas(bills, workers):
+    expected = benchmark.pandas_stage_means(bills)
+    result = parallel.stage_means(bills, by="fy", mode=workers)
+    assert list(result.index) == list(expected.index)
+    assert np.allclose(result.to_numpy(), expected.to_numpy())
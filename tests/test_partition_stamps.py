@@ -0,0 +1,83 @@
+import threading
+import pandas as pd
+import pytest
+import calendar_dim
+import data_service
+import sample_data
+
+
+@pytest.fixture(autouse=True)
+def history(monkeypatch):
+    # A fresh load history for every test
+    fresh = {"lock": threading.Lock(), "version": 0, "hashes": {}, "stamps": {}}
+    monkeypatch.setattr(data_service, "_history", lambda: fresh)
+    return fresh
+
+
+def _bills():
+    df = data_service.canonical(sample_data.generate(n=2000, vendors=40))
+    return calendar_dim.join(df, data_service.CALENDAR_COLUMNS)
+
+
+def _load(df):
+    df = df.copy()
+    df.attrs["version"] = data_service._record(df)
+    return df
+
+
+def _partition(df):
+    # A (fy, department) partition with rows, and the mask of its rows
+    fy, dim = data_service.partition_ids(df)
+    key = (int(fy[0]), dim[0])
+    return key, (fy == key[0]) & (dim == key[1])
+
+
+def test_first_load_stamps_every_partition():
+    first = _load(_bills())
+    stamps = data_service.stamps(first)
+    fy, dim = data_service.partition_ids(first)
+    assert set(stamps) == set(zip(fy.tolist(), dim.tolist()))
+    assert set(stamps.values()) == {1}
+
+
+def test_refresh_restamps_only_changed_partitions():
+    df = _bills()
+    first = _load(df)
+    key, rows = _partition(df)
+    changed = df.copy()
+    changed.loc[rows, "BILLVALUE"] = changed.loc[rows, "BILLVALUE"] + 1
+    second = _load(changed)
+
+    stamps = data_service.stamps(second)
+    assert stamps[key] == 2
+    assert {k: s for k, s in stamps.items() if k != key} == {k: s for k, s in data_service.stamps(first).items() if k != key}
+
+
+def test_reordered_rows_keep_their_stamps():
+    df = _bills()
+    _load(df)
+    second = _load(df.sample(frac=1, random_state=1))
+    assert set(data_service.stamps(second).values()) == {1}
+
+
+def test_depends_follows_only_the_partitions_read():
+    df = _bills()
+    first = _load(df)
+    key, rows = _partition(df)
+    other = next(d for d in df["DEPARTMENT"].unique() if d != key[1])
+    changed = df.copy()
+    changed.loc[rows, "BILLVALUE"] = 0
+    second = _load(changed)
+
+    assert data_service.depends(second, departments=[other]) == data_service.depends(first, departments=[other])
+    assert data_service.depends(second, departments=[key[1]]) != data_service.depends(first, departments=[key[1]])
+    assert data_service.depends(second, departments=[key[1]], fy_from=key[0] + 1) == \
+        data_service.depends(first, departments=[key[1]], fy_from=key[0] + 1)
+    assert data_service.depends(second) != data_service.depends(first)
+
+
+def test_slices_read_their_parents_stamps():
+    first = _load(_bills())
+    part = first[first["DEPARTMENT"] == first["DEPARTMENT"].iloc[0]]
+    part.attrs = dict(first.attrs, version=f"{first.attrs['version']}/abc", parent=first.attrs["version"])
+    assert data_service.stamps(part) == data_service.stamps(first)
@@ -0,0 +1,61 @@
+import threading
+import time
+import singleflight
+
+
+class Stopped(BaseException):
+    # Like Streamlit's StopException: not an Exception
+    pass
+
+
+def _leader_and_waiter(key, leader_fn, waiter_fn):
+    # Runs leader_fn as the first caller and waiter_fn as a caller arriving
+    # while it runs; returns what each of them got
+    started, release = threading.Event(), threading.Event()
+    results = {}
+
+    def lead():
+        started.set()
+        release.wait(5)
+        return leader_fn()
+
+    def call(name, fn):
+        try:
+            results[name] = singleflight.do(key, fn, ttl=60)
+        except BaseException as e:
+            results[name] = e
+
+    leader = threading.Thread(target=call, args=("leader", lead))
+    leader.start()
+    started.wait(5)
+    shared = singleflight.stats["shared"]
+    waiter = threading.Thread(target=call, args=("waiter", waiter_fn))
+    waiter.start()
+    while singleflight.stats["shared"] == shared:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+    return results
+
+
+def _stop():
+    raise Stopped()
+
+
+def _fail():
+    raise ValueError("bad bills")
+
+
+def test_waiters_recompute_when_the_leader_is_interrupted():
+    results = _leader_and_waiter(("k", "interrupted"), _stop, lambda: 42)
+    assert isinstance(results["leader"], Stopped)
+    assert results["waiter"] == 42
+    assert singleflight.do(("k", "interrupted"), _fail) == 42
+
+
+def test_errors_are_shared_but_not_kept():
+    results = _leader_and_waiter(("k", "failed"), _fail, lambda: 42)
+    assert isinstance(results["leader"], ValueError)
+    assert results["waiter"] is results["leader"]
+    assert singleflight.do(("k", "failed"), lambda: 7) == 7
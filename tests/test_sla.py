@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import sla
+
+
+def _bills(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    recv = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 120, n), unit="D")
+    paid = recv + pd.to_timedelta(rng.integers(5, 100, n), unit="D")
+    return pd.DataFrame({
+        "TRACKINGNO": [f"T{i}" for i in range(n)],
+        "DEPARTMENT": rng.choice(["HR", "IT", "Finance"], n),
+        "VENDORNAME": rng.choice([f"V{i}" for i in range(30)], n),
+        "MSME_VENDOR": rng.choice(["Yes", "No"], n),
+        "BILLVALUE": rng.integers(1, 100, n).astype(float),
+        "RECVDATE": recv,
+        "PAYMENT_DONE": paid.where(rng.random(n) < 0.6),
+        "CANCELDATE": pd.NaT,
+    })
+
+
+def _nonzero(counts):
+    counts = counts[(counts != 0).any(axis=1)].astype(float)
+    return counts.sort_index()
+
+
+def test_counts_cover_only_present_combinations():
+    df = _bills()
+    bills = sla.classify(df, sla.as_of_day(df))
+    counts = sla._count(bills)
+    assert len(counts) == len(bills.groupby(sla.GROUPS + ["rule"]).size())
+    assert counts[sla.STATUSES].to_numpy().sum() == (bills["status"] >= 0).sum()
+    expected = bills[bills["status"] == sla.BREACHING].groupby("DEPARTMENT").size()
+    got = counts["Breaching"].groupby(level="DEPARTMENT").sum()
+    assert got[got > 0].to_dict() == expected.to_dict()
+
+
+def test_incremental_refresh_matches_a_full_recount():
+    df = _bills()
+    state = sla.refresh(sla.new_state(), df)
+
+    later = df.copy()
+    later.loc[:19, "PAYMENT_DONE"] = later.loc[:19, "RECVDATE"] + pd.Timedelta(days=3)
+    later.loc[20:29, "DEPARTMENT"] = "Legal"
+    later = pd.concat([later.iloc[40:], _bills(50, seed=1).assign(TRACKINGNO=lambda d: "N" + d["TRACKINGNO"])],
+                      ignore_index=True)
+    sla.refresh(state, later, as_of="2024-06-30")
+
+    full = sla.refresh(sla.new_state(), later, as_of="2024-06-30")
+    pd.testing.assert_frame_equal(_nonzero(state["counts"]), _nonzero(full["counts"]))
+
+
+def test_at_risk_days_are_not_negative():
+    df = _bills()
+    state = sla.refresh(sla.new_state(), df)
+    table = sla.at_risk(state, n=1000)
+    assert (table["Days Overdue"] >= 0).all() and (table["Days Left"] >= 0).all()
+    at_risk = table[table["Status"] == "At risk"]
+    assert (at_risk["Days Overdue"] == 0).all()
+    breaching = table[table["Status"] == "Breaching"]
+    assert (breaching["Days Overdue"] > 0).all()
+
+
+def test_restrict_counts_only_the_filtered_bills():
+    df = _bills()
+    state = sla.refresh(sla.new_state(), df)
+    part = df[df["MSME_VENDOR"] == "Yes"]
+    restricted = sla.restrict(state, part)
+    assert restricted["counts"][sla.STATUSES].to_numpy().sum() == len(part)
+    assert set(restricted["bills"].index) == set(part["TRACKINGNO"])
@@ -0,0 +1,31 @@
+import pandas as pd
+import fmt
+import versions
+
+
+def _frame(version):
+    df = pd.DataFrame({"BILLVALUE": [1.0, 2.0]})
+    df.attrs["version"] = version
+    return df
+
+
+def test_drop_versions_frees_formatted_columns_of_older_versions():
+    fmt._cache.clear()
+    fmt.column(_frame(1), "BILLVALUE", fmt.inr)
+    fmt.column(_frame("1/abc"), "BILLVALUE", fmt.inr)
+    fmt.column(_frame(2), "BILLVALUE", fmt.inr)
+    fmt.column(_frame("2/abc"), "BILLVALUE", fmt.inr)
+    versions.drop_versions(2)
+    assert sorted(str(key[0]) for key in fmt._cache) == ["2", "2/abc"]
+
+
+def test_drop_versions_clears_registered_caches():
+    cleared = []
+
+    class Cached:
+        def clear(self):
+            cleared.append(True)
+
+    versions.per_version(Cached())
+    versions.drop_versions(3)
+    assert cleared == [True]
@@ -0,0 +1,76 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import binning
+import versions
+
+
+# Top-N vendor rankings without aggregating and sorting every vendor per rerun.
+# At load time the bills are reduced once to per (filter cell, vendor) partial
+# totals. The default "everything selected" view is ranked up front; any other
+# selection adds up the partials of the selected cells with one bincount and
+# picks the N largest with argpartition, so only N vendors are ever sorted.
+
+TOP_K = 50
+
+
+def build_index(df, vendor="VENDORNAME", value="BILLVALUE", dims=binning.FILTER_DIMS):
+    dims = [d for d in dims if d in df.columns]
+    cell, keys = binning.cells(df, dims)
+    code, vendors = pd.factorize(df[vendor], sort=False)
+    nvendors = len(vendors)
+
+    values = pd.to_numeric(df[value], errors="coerce").fillna(0).to_numpy(dtype=float)
+    valid = code >= 0
+    pair = cell[valid].astype(np.int64) * nvendors + code[valid]
+    pairs, inverse = np.unique(pair, return_inverse=True)
+
+    index = {
+        "name": vendor,
+        "dims": dims,
+        "keys": keys,
+        "vendors": np.asarray(vendors),
+        "cell": pairs // nvendors,
+        "vendor": pairs % nvendors,
+        "count": np.bincount(inverse, minlength=len(pairs)).astype(np.int64),
+        "value": np.bincount(inverse, weights=values[valid], minlength=len(pairs)),
+    }
+
+    # Precomputed ranking for the unfiltered view
+    index["all"] = {by: _rank(index, np.ones(len(pairs), dtype=bool), by, TOP_K) for by in ("count", "value")}
+    return index
+
+
+@versions.per_version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached_index(_df, version, vendor, value, dims):
+    return build_index(_df, vendor, value, list(dims))
+
+
+def index(df, vendor="VENDORNAME", value="BILLVALUE", dims=binning.FILTER_DIMS):
+    version = versions.dataset_version(df)
+    if version is None:
+        return build_index(df, vendor, value, dims)
+    return _cached_index(df, version, vendor, value, tuple(dims))
+
+
+def _rank(index, rows, by, n):
+    totals = np.bincount(index["vendor"][rows], weights=index[by][rows], minlength=len(index["vendors"]))
+    present = np.bincount(index["vendor"][rows], minlength=len(index["vendors"])) > 0
+    candidates = np.flatnonzero(present)
+    if len(candidates) > n:
+        candidates = candidates[np.argpartition(-totals[candidates], n - 1)[:n]]
+    # Ties broken by vendor name so the order is stable across reruns
+    order = np.lexsort((index["vendors"][candidates].astype(str), -totals[candidates]))
+    top = candidates[order]
+    return pd.Series(totals[top], index=pd.Index(index["vendors"][top], name=index["name"]))
+
+
+def top(index, filters=None, n=10, by="value"):
+    # Series of the n largest vendors (by "value" sum or bill "count"), descending
+    mask = binning.cell_mask(index, filters or {})
+    if mask.all() and n <= TOP_K:
+        result = index["all"][by].head(n)
+    else:
+        result = _rank(index, mask[index["cell"]], by, n)
+    return result.astype(np.int64) if by == "count" else result
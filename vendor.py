@@ -1,9 +1,15 @@
+import time
 import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import plotly.express as px
 import f
+import grid
+import fmt
+import access
+import data_service
+import telemetry
 
 # Set page config
 st.set_page_config(
@@ -13,24 +19,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Fixed data loading function
-@st.cache_data
-def load_data():
-    excel_path = "E:\internship work\Bill Analytics\DUMP_FE_OVERVIEW.pkl"  # Replace with your file path
-    df = pd.read_pickle(excel_path)
-
-    # 2. Randomly sample 20% of the data
-    sampled_df = df.sample(frac=0.2, random_state=42)  #
-    return sampled_df
-
-
 try:
-    df = load_data()
+    # Bills shared by every page, as far as the user may see them; dump path from
+    # BILLS_DUMP, calendar offsets already joined
+    df = access.bills()
     st.success("Data loaded successfully!")
 except Exception as e:
     st.error(f"Error loading data: {str(e)}")
     st.stop()
-filtered_df=df.copy()
+filtered_df=df
 # Sidebar filters 
 
 # Main dashboard
@@ -42,10 +39,10 @@ st.title("Department-wise Vendor Payment Analytics")
 #     st.metric("Total Vendors", filtered_df['VENDORNAME'].nunique())
 # with col2:
 #     total_payment = filtered_df['BILLVALUE'].sum()
-#     st.metric("Total Payments", f"₹{total_payment:,.2f}")
+#     st.metric("Total Payments", fmt.inr(total_payment))
 # with col3:
 #     avg_days = filtered_df['TOTAL_DAYS_for_PAYMENT'].mean()
-#     st.metric("Avg Payment Days", f"{avg_days:.1f} days")
+#     st.metric("Avg Payment Days", fmt.days(avg_days))
 
 # Tabs
 
@@ -63,6 +60,7 @@ with tab1:
             all_departments, 
             key='dept_select'
         )
+    dept_started = time.perf_counter()
     
     if selected_dept == 'All Departments':
         st.subheader("Summary Across All Departments")
@@ -78,10 +76,10 @@ with tab1:
             st.metric("Total Vendors", filtered_df['VENDORNAME'].nunique())
         with col2:
             total_payment = filtered_df['BILLVALUE'].sum()
-            st.metric("Total Payments", f"₹{total_payment:,.2f}")
+            st.metric("Total Payments", fmt.inr(total_payment))
         with col3:
             avg_days = filtered_df['TOTAL_DAYS_for_PAYMENT'].mean()
-            st.metric("Avg Payment Days", f"{avg_days:.1f} days")
+            st.metric("Avg Payment Days", fmt.days(avg_days))
         
         # Charts with consistent colors
         col1, col2 = st.columns(2)
@@ -105,7 +103,7 @@ with tab1:
         with col2:
             try:
                 payment_sum = filtered_df.groupby('DEPARTMENT')['BILLVALUE'].sum().reset_index()
-                payment_sum['Amount'] = payment_sum['BILLVALUE'].apply(lambda x: f"₹{x:,.2f}")
+                payment_sum['Amount'] = fmt.inr(payment_sum['BILLVALUE'])
                 
                 fig2 = px.pie(
                     payment_sum,
@@ -140,14 +138,14 @@ with tab1:
         with col1:
             st.metric("Total Vendors", dept_df['VENDORNAME'].nunique())
         with col2:
-            st.metric("Total Payments", f"₹{dept_df['BILLVALUE'].sum():,.2f}")
+            st.metric("Total Payments", fmt.inr(dept_df['BILLVALUE'].sum()))
         with col3:
-            st.metric("Avg Payment Days", f"{dept_df['TOTAL_DAYS_for_PAYMENT'].mean():.1f} days")
+            st.metric("Avg Payment Days", fmt.days(dept_df['TOTAL_DAYS_for_PAYMENT'].mean()))
         
         # Vendor Payment Distribution Pie Chart
         st.subheader(f"Payment Distribution by Vendor in {selected_dept}")
         vendor_payments = dept_df.groupby('VENDORNAME')['BILLVALUE'].sum().reset_index()
-        vendor_payments['Amount'] = vendor_payments['BILLVALUE'].apply(lambda x: f"₹{x:,.2f}")
+        vendor_payments['Amount'] = fmt.inr(vendor_payments['BILLVALUE'])
         
         fig3 = px.pie(
             vendor_payments,
@@ -183,15 +181,17 @@ with tab1:
         }).sort_values('Total Amount', ascending=False)
         
         st.dataframe(
-            all_vendors.style.format({
-                'Total Amount': '₹{:,.2f}',
-                'Avg Payment Days': '{:.1f} days',
-                'Bill Count': '{:,.0f}',
-                'Payment Done Count': '{:,.0f} times'
+            fmt.format_frame(all_vendors, {
+                'Total Amount': fmt.inr,
+                'Avg Payment Days': fmt.days,
+                'Bill Count': fmt.count,
+                'Payment Done Count': lambda s: fmt.count(s, unit=' times')
             }),
             use_container_width=True,
             height=min(600, 35 * len(all_vendors))
         )
+    telemetry.record("vendor", "department_view", ms=(time.perf_counter() - dept_started) * 1000,
+                     rows=len(filtered_df), department=selected_dept)
         
 with tab2:
     st.subheader("Vendor Performance Analysis")
@@ -204,6 +204,7 @@ with tab2:
             options=sorted(filtered_df['VENDORNAME'].unique()),
             key='vendor_select'
         )
+    vendor_started = time.perf_counter()
     
     vendor_data = filtered_df[filtered_df['VENDORNAME'] == selected_vendor]
     
@@ -228,30 +229,35 @@ with tab2:
         # Vendor payment history
         with st.expander("Payment History", expanded=False):
         
-            vendor_history = vendor_data[[
-                'BILLNO', 'BILLDATE', 'PAYMENT_DONE', 'BILLVALUE', 
-                'TOTAL_DAYS_for_PAYMENT', 'DEPARTMENT', 'BILLTYPE', 'STATUS'
-            ]].sort_values('PAYMENT_DONE', ascending=False)
-            
-            st.dataframe(
-                vendor_history.style.format({
-                    'BILLVALUE': '₹{:,.2f}',
-                    'TOTAL_DAYS_for_PAYMENT': '{:.1f} days',
-                    'BILLDATE': lambda x: x.strftime('%Y-%m-%d'),
-                    'PAYMENT_DONE': lambda x: x.strftime('%Y-%m-%d')
-                }),
-                use_container_width=True,
+            grid.render_grid(
+                vendor_data,
+                key="vendor_history",
+                columns=[
+                    'BILLNO', 'BILLDATE', 'PAYMENT_DONE', 'BILLVALUE',
+                    'TOTAL_DAYS_for_PAYMENT', 'DEPARTMENT', 'BILLTYPE', 'STATUS'
+                ],
+                formats={
+                    'BILLVALUE': fmt.inr,
+                    'TOTAL_DAYS_for_PAYMENT': fmt.days,
+                    'BILLDATE': fmt.dates,
+                    'PAYMENT_DONE': fmt.dates
+                },
+                search_columns=['BILLNO', 'DEPARTMENT', 'BILLTYPE', 'STATUS'],
+                default_sort='PAYMENT_DONE',
+                page_size=25,
                 height=300
             )
         
     else:
         st.warning("No data available for selected vendor")
+    telemetry.record("vendor", "vendor_view", ms=(time.perf_counter() - vendor_started) * 1000,
+                     rows=len(filtered_df), result_rows=len(vendor_data), vendor=selected_vendor)
 
 # Add download button
 st.sidebar.markdown("---")
 st.sidebar.download_button(
     label="Download Filtered Data",
-    data=filtered_df.to_csv(index=False).encode('utf-8'),
+    data=filtered_df[data_service.source_columns(filtered_df)].to_csv(index=False).encode('utf-8'),
     file_name=f"vendor_payments_{datetime.now().strftime('%Y%m%d')}.csv",
     mime="text/csv"
 )
@@ -0,0 +1,37 @@
+# Dataset versions and the caches keyed on them.
+# The loader stamps every load with df.attrs["version"] (access slices carry
+# "<version>/<grant>"). Caches of per-version indexes register here and are
+# emptied when a newer version loads, so superseded frames, their indexes and
+# anything derived from them can be freed.
+
+_caches = []
+_hooks = []
+
+
+def dataset_version(df):
+    return df.attrs.get("version")
+
+
+def per_version(cached):
+    # Decorator for a cached function keyed on the dataset version
+    _caches.append(cached)
+    return cached
+
+
+def on_drop(hook):
+    # Decorator for hook(current): drops what it holds for other versions
+    _hooks.append(hook)
+    return hook
+
+
+def drop_versions(current=None):
+    # After loading version `current`: nothing older is needed any more
+    for cached in _caches:
+        cached.clear()
+    for hook in _hooks:
+        hook(current)
+
+
+def of_version(version, current):
+    # Whether a version stamp is `current` or one of its access slices
+    return version == current or str(version).startswith(f"{current}/")